@@ -15,10 +15,13 @@ import sys
 import threading
 import time
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from services import ComputerUsageService, NodeConverterService
 from services.http_collections import HttpCollectionsService
+from services.http_client import HttpClientService
+from services.http_history import HttpHistoryService
+from services.http_runner import HttpCollectionRunner
 from services.ai_manager import AIManager
 from services.chat_history import ChatHistoryService
 from services.prompt_template import PromptTemplateService
@@ -35,6 +38,12 @@ class Api:
     - AI 流式聊天这类跨多层的能力，也会在这里保存少量运行时状态。"""
     # 流式聊天会话超时时间（秒）
     CHAT_SESSION_TTL_SECONDS = 300  # 5 分钟
+    # 后台任务（订阅批量导入等）未被轮询的保留时间（秒）
+    BACKGROUND_TASK_TTL_SECONDS = 300
+    # 后台任务事件队列的默认上限
+    MAX_TASK_EVENTS = 1000
+    # SQLite WAL 定期 checkpoint 间隔（秒）
+    DB_CHECKPOINT_INTERVAL_SECONDS = 120
     WEB_WATCH_SUFFIXES = {".html", ".css", ".js"}
 
     def __init__(
@@ -55,11 +64,15 @@ class Api:
         self._frontend_reload_version = str(time.time_ns())
         self._frontend_reload_lock = threading.Lock()
         self._web_watcher_started = False
+        # 后台任务表：task_id -> {events, done, result, error, last_access}
+        self._tasks = {}
+        self._tasks_lock = threading.Lock()
 
         # 统一数据库初始化（必须最先完成）
         from services.db_manager import DatabaseManager
         db_path = self.data_dir / "doggy_toolbox.db"
-        self.db = DatabaseManager(db_path)
+        # WAL 模式下由后台线程定期 checkpoint，防止聊天流式写入期间 -wal 文件无限增长
+        self.db = DatabaseManager(db_path, checkpoint_interval=self.DB_CHECKPOINT_INTERVAL_SECONDS)
         logger.info(f"数据库初始化完成: {db_path}")
 
         # 数据布局兼容策略（A 方案）：旧版与新版都能读
@@ -80,11 +93,17 @@ class Api:
         self.node_converter = NodeConverterService(
             data_dir=self.data_dir,
             nodes_file=paths["nodes_file"],
+            db=self.db,
         )
         self.http_collections = HttpCollectionsService(
             data_dir=self.data_dir,
             db=self.db,
         )
+        # HTTP 调试请求客户端（进程内连接池，替代逐次调用 curl）
+        self.http_client = HttpClientService()
+        self.http_runner = HttpCollectionRunner(self.http_collections, self.http_client)
+        # HTTP 请求/响应历史（压缩存储，按条数与天数淘汰）
+        self.http_history = HttpHistoryService(self.db)
 
         # AI Manager - 迁移后使用根目录
         self.ai_manager = AIManager(self.data_dir, db=self.db)
@@ -275,6 +294,17 @@ class Api:
         except Exception as e:
             logger.debug(f"推送前端刷新事件失败（通常发生在页面重载瞬间）: {e}")
 
+    def shutdown(self):
+        """释放后端资源（数据库连接池等），窗口关闭或进程退出前调用。"""
+        try:
+            self.http_client.close()
+        except Exception as e:
+            logger.warning(f"关闭 HTTP 连接池失败: {e}")
+        try:
+            self.db.close()
+        except Exception as e:
+            logger.warning(f"关闭数据库连接池失败: {e}")
+
     def window_close(self):
         """关闭窗口"""
         import os
@@ -282,6 +312,7 @@ class Api:
         def force_exit():
             """延迟强制退出，给 destroy 一点时间清理"""
             time.sleep(0.5)
+            self.shutdown()
             os._exit(0)
 
         # 启动强制退出线程作为保底
@@ -333,6 +364,10 @@ class Api:
     def get_commands_by_tab(self, tab_id: str):
         return self.computer_usage.get_commands_by_tab(tab_id)
 
+    def search_commands(self, query: str, limit: int = 50, tab_id: str = None):
+        """全文搜索命令块（标题/描述/命令/标签），按相关度排序"""
+        return self.computer_usage.search_commands(query, limit, tab_id)
+
     def add_command(self, title: str, description: str, commands: List[str], tab_id: str = "0", tags: List[str] = None):
         return self.computer_usage.add_command(title, description, commands, tab_id, tags)
 
@@ -374,12 +409,41 @@ class Api:
 
     def fetch_subscription(self, url: str):
         return self.node_converter.fetch_subscription(url)
+
+    def start_fetch_subscription(self, url: str):
+        """后台流式拉取订阅：下载过程中每批节点作为一个进度事件
+        （{"nodes": [...], "yaml": "该批节点的 proxies 片段"}），前端用 get_task_progress 轮询"""
+        converter = self.node_converter
+
+        def worker(report):
+            return converter.fetch_subscription(
+                url,
+                on_nodes=lambda batch: report({
+                    'nodes': batch,
+                    'yaml': ''.join(converter.iter_proxy_yaml(batch)),
+                }),
+            )
+
+        # 每个事件都是一批节点数据，不能丢弃
+        return self._start_background_task(worker, max_events=None)
+    def clear_subscription_cache(self, url: str = None):
+        """清空订阅缓存（条件请求校验头与解析结果），下次拉取将完整重新下载"""
+        return self.node_converter.clear_subscription_cache(url)
+
     def get_nodes(self):
         return self.node_converter.get_nodes()
 
     def save_node(self, name: str, node_type: str, server: str, port: int, raw_link: str, yaml_config: str, tags: list = None):
         return self.node_converter.save_node(name, node_type, server, port, raw_link, yaml_config, tags)
 
+    def save_nodes(self, nodes: list, tags: list = None):
+        """批量保存转换结果中的节点，重复节点（同协议指纹）会被跳过并在结果中列出"""
+        return self.node_converter.save_nodes(nodes, tags)
+
+    def find_duplicate_nodes(self):
+        """列出已保存节点中的重复分组"""
+        return self.node_converter.find_duplicate_nodes()
+
     def delete_node(self, id: str):
         return self.node_converter.delete_node(id)
 
@@ -395,9 +459,40 @@ class Api:
         """获取所有节点标签"""
         return self.node_converter.get_all_tags()
 
-    def batch_import_subscriptions(self, urls: list):
-        """批量导入订阅链接"""
-        return self.node_converter.batch_import_subscriptions(urls)
+    def batch_import_subscriptions(self, urls: list, concurrency: int = None,
+                                   per_host_limit: int = None, deadline: float = None,
+                                   save: bool = False):
+        """批量导入订阅链接（并发拉取，阻塞直到整批完成或超出总时限）；save=True 时按指纹去重后保存节点"""
+        return self.node_converter.batch_import_subscriptions(
+            urls, concurrency=concurrency, per_host_limit=per_host_limit, deadline=deadline, save=save
+        )
+
+    def start_batch_import_subscriptions(self, urls: list, concurrency: int = None,
+                                         per_host_limit: int = None, deadline: float = None,
+                                         save: bool = False):
+        """后台批量导入订阅链接，前端用 get_task_progress(task_id) 轮询逐条进度和最终结果"""
+        return self._start_background_task(
+            lambda report: self.node_converter.batch_import_subscriptions(
+                urls,
+                concurrency=concurrency,
+                per_host_limit=per_host_limit,
+                deadline=deadline,
+                progress_callback=report,
+                save=save,
+            )
+        )
+
+    def probe_nodes(self, node_ids: list = None, concurrency: int = None, timeout: float = None):
+        """后台并发探测节点连通性与延迟，前端用 get_task_progress(task_id) 轮询逐个节点的结果"""
+        return self._start_background_task(
+            lambda report: self.node_converter.probe_nodes(
+                node_ids, concurrency=concurrency, timeout=timeout, progress_callback=report
+            )
+        )
+
+    def get_node_probe_results(self):
+        """获取各节点最近一次探测结果"""
+        return self.node_converter.get_probe_results()
 
     def validate_node(self, node: dict):
         """验证节点配置"""
@@ -407,14 +502,126 @@ class Api:
         """批量验证节点"""
         return self.node_converter.validate_all_nodes(nodes)
 
+    def generate_clash_profile(self, node_ids: list = None, group_by: list = None, rules: list = None):
+        """生成完整 Clash 配置（proxies、地区/标签分组、url-test 自动选择与规则）"""
+        return self.node_converter.build_profile(node_ids, group_by=group_by, rules=rules)
+
+    def export_nodes_markdown(self):
+        """把节点列表导出为 nodes.md（可选的人工查看/备份格式）"""
+        return self.node_converter.export_nodes_md()
+
     def generate_node_share_link(self, node: dict):
         """生成节点分享链接"""
         link = self.node_converter.generate_share_link(node)
         return {"success": True, "link": link} if link else {"success": False, "error": "不支持的节点类型"}
+
+    # ==================== 后台任务与进度轮询 ====================
+    def _cleanup_background_tasks(self):
+        """清理超时未被轮询的后台任务，防止内存泄漏"""
+        now = time.monotonic()
+        with self._tasks_lock:
+            expired_ids = [
+                task_id for task_id, task in self._tasks.items()
+                if now - task['last_access'] > self.BACKGROUND_TASK_TTL_SECONDS
+            ]
+            for task_id in expired_ids:
+                del self._tasks[task_id]
+        if expired_ids:
+            logger.info(f"清理了 {len(expired_ids)} 个超时的后台任务")
+
+    def _start_background_task(self, worker, max_events: Optional[int] = MAX_TASK_EVENTS):
+        """在守护线程中执行耗时任务。
+
+        worker(report) 的返回值作为最终结果；report(event) 可多次调用，
+        事件会进入队列，由 get_task_progress 增量取走（与流式聊天的轮询方式一致）。
+        队列最多保留 max_events 个事件，前端长时间不轮询时丢弃最旧的；
+        事件本身承载数据（而非进度）时传 None 不设上限。
+        """
+        import uuid
+        from collections import deque
+
+        self._cleanup_background_tasks()
+        task_id = str(uuid.uuid4())
+        with self._tasks_lock:
+            self._tasks[task_id] = {
+                'events': deque(maxlen=max_events),
+                'done': False,
+                'result': None,
+                'error': None,
+                'last_access': time.monotonic(),
+            }
+
+        def report(event):
+            with self._tasks_lock:
+                task = self._tasks.get(task_id)
+                if task is not None:
+                    task['events'].append(event)
+
+        def run():
+            result, error = None, None
+            try:
+                result = worker(report)
+            except Exception as e:
+                logger.error(f"后台任务失败: {e}")
+                error = str(e) or type(e).__name__
+            with self._tasks_lock:
+                task = self._tasks.get(task_id)
+                if task is not None:
+                    task['result'] = result
+                    task['error'] = error
+                    task['done'] = True
+
+        threading.Thread(target=run, daemon=True).start()
+        return {'success': True, 'task_id': task_id}
+
+    def get_task_progress(self, task_id: str):
+        """
+        获取后台任务的增量进度（轮询接口）
+
+        Returns:
+            {
+                "success": True,
+                "events": [...],  # 本次获取的所有进度事件
+                "done": False,    # 是否完成
+                "result": None,   # 完成后的最终结果
+                "error": None     # 错误信息
+            }
+        """
+        self._cleanup_background_tasks()
+        with self._tasks_lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return {'success': False, 'error': '无效的 task_id'}
+            task['last_access'] = time.monotonic()
+            events = list(task['events'])
+            task['events'].clear()
+            done = task['done']
+            if done:
+                del self._tasks[task_id]
+        return {
+            'success': True,
+            'events': events,
+            'done': done,
+            'result': task['result'] if done else None,
+            'error': task['error'],
+        }
+
     # ==================== HTTP 请求集合与环境变量 ====================
     def get_http_collections(self):
         return self.http_collections.get_collections()
 
+    def get_http_collections_skeleton(self):
+        """集合树骨架（请求只含 id/名称/方法），首屏用它代替 get_http_collections 减少桥接数据量"""
+        return self.http_collections.get_collections_skeleton()
+
+    def get_http_request(self, request_id: str):
+        """按需获取单个请求的完整数据"""
+        return self.http_collections.get_request(request_id)
+
+    def get_http_subtree(self, item_id: str):
+        """按需获取某个集合/文件夹下的完整子树"""
+        return self.http_collections.get_subtree(item_id)
+
     def add_http_collection(self, name: str, description: str = ""):
         return self.http_collections.add_collection(name, description)
 
@@ -463,6 +670,46 @@ class Api:
         except Exception as e:
             logger.error(f"导出 Postman 失败: {e}")
             return {"success": False, "error": str(e)}
+
+    def start_export_http_collection(self, export_format: str, collection_id: str = None,
+                                     default_filename: str = None, file_path: str = None):
+        """
+        后台把 HTTP 集合流式导出到用户选择的文件（OpenAPI 3.0 / Postman v2.1）。
+
+        未给出 file_path 时弹出保存对话框；扩展名为 .yaml/.yml 时写 YAML，否则写 JSON。
+        直接从数据库分批读取请求边转换边写盘，适合很大的工作区；
+        进度事件为 {done, total}，前端用 get_task_progress(task_id) 轮询。
+        """
+        if export_format not in ("openapi", "postman"):
+            return {"success": False, "error": f"不支持的导出格式: {export_format}"}
+
+        if not file_path:
+            import webview
+
+            if not self._window:
+                return {"success": False, "error": "窗口未初始化"}
+            try:
+                result = self._window.create_file_dialog(
+                    webview.SAVE_DIALOG,
+                    save_filename=default_filename or f"api_{export_format}.json",
+                    file_types=("JSON 文件 (*.json)", "YAML 文件 (*.yaml;*.yml)", "所有文件 (*.*)"),
+                )
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            if not result:
+                return {"success": False, "error": "用户取消了保存"}
+            file_path = str(result[0] if isinstance(result, (tuple, list)) else result)
+
+        logger.info(f"Export HTTP collection ({export_format}) to {file_path}")
+        started = self._start_background_task(
+            lambda report: self.http_collections.export_to_file(
+                export_format, file_path, collection_id, progress_callback=report
+            )
+        )
+        if started.get("success"):
+            started["path"] = file_path
+        return started
+
     def get_http_environments(self):
         """获取所有 HTTP 环境变量"""
         return self.http_collections.get_environments()
@@ -491,6 +738,10 @@ class Api:
         """替换文本中的环境变量"""
         return self.http_collections.replace_variables(text, env_id)
 
+    def replace_http_variables_many(self, texts: list, env_id: str = None):
+        """批量替换多段文本中的环境变量（URL、各请求头、请求体等一次完成）"""
+        return self.http_collections.replace_variables_many(texts, env_id)
+
     def open_collection_file_dialog(self):
         """打开文件选择对话框，选择集合 JSON 文件"""
         import webview
@@ -623,87 +874,89 @@ class Api:
             data = json_data["data"]
             imported = {"tabs": 0, "commands": 0, "credentials": 0, "nodes": 0}
 
-            # 导入页签（使用数据库）
-            tab_id_map = {}  # 旧 id → 新 id 映射
-            if "tabs" in data and isinstance(data["tabs"], list):
-                # 先清空现有页签（保留默认页签）
-                existing_tabs = self.computer_usage.get_tabs()
-                for tab in existing_tabs:
-                    if tab.get('id') != '0':  # 保留默认页签
-                        self.computer_usage.delete_tab(tab['id'])
-                # 导入新页签并建立映射
-                for tab in data["tabs"]:
-                    if isinstance(tab, dict):
-                        old_id = tab.get('id', '0')
-                        if old_id == '0':
-                            tab_id_map[old_id] = '0'  # 默认页签直接映射
-                        else:
-                            new_tab = self.computer_usage.add_tab(tab.get('name', '未命名'))
-                            tab_id_map[old_id] = new_tab['id']  # 记录新 id
-                imported["tabs"] = len(data["tabs"])
-
-            # 导入命令（使用数据库）
-            if "commands" in data and isinstance(data["commands"], list):
-                # 先清空现有命令
-                existing_cmds = self.computer_usage.get_commands()
-                for cmd in existing_cmds:
-                    self.computer_usage.delete_command(cmd['id'])
-                # 导入新命令（使用映射后的 tab_id）
-                for cmd in data["commands"]:
-                    if isinstance(cmd, dict):
-                        old_tab_id = cmd.get('tab_id', '0')
-                        new_tab_id = tab_id_map.get(old_tab_id, '0')  # 使用映射，默认回退到 '0'
-                        self.computer_usage.add_command(
-                            title=cmd.get('title', ''),
-                            description=cmd.get('description', ''),
-                            commands=cmd.get('commands', []),
-                            tab_id=new_tab_id,
-                            tags=cmd.get('tags', [])
-                        )
-                imported["commands"] = len(data["commands"])
-
-            # 导入凭证（使用数据库）
-            if "credentials" in data and isinstance(data["credentials"], list):
-                # 先清空现有凭证
-                existing_creds = self.computer_usage.get_credentials()
-                for cred in existing_creds:
-                    self.computer_usage.delete_credential(cred['id'])
-                # 导入新凭证
-                for cred in data["credentials"]:
-                    if isinstance(cred, dict):
-                        self.computer_usage.add_credential(
-                            service=cred.get('service', ''),
-                            url=cred.get('url', ''),
-                            account=cred.get('account', ''),
-                            password=cred.get('password', ''),
-                            extra=cred.get('extra', [])
-                        )
-                imported["credentials"] = len(data["credentials"])
-
-            # 导入节点（使用数据库）
-            if "nodes" in data and isinstance(data["nodes"], list):
-                # 先清空现有节点
-                existing_nodes = self.node_converter.get_nodes()
-                for node in existing_nodes:
-                    self.node_converter.delete_node(node['id'])
-                # 导入新节点
-                for node in data["nodes"]:
-                    if isinstance(node, dict):
-                        config = node.get('config', {})
-                        yaml_config = config.get('yaml', '') if isinstance(config, dict) else ''
-                        self.node_converter.save_node(
-                            name=node.get('name', 'Unknown'),
-                            node_type=node.get('type', ''),
-                            server=node.get('server', ''),
-                            port=node.get('port', 0),
-                            raw_link=node.get('raw_link', ''),
-                            yaml_config=yaml_config
-                        )
-                imported["nodes"] = len([n for n in data["nodes"] if isinstance(n, dict)])
-
-            # 导入主题
-            if "theme" in data:
-                self.save_theme(data["theme"])
+            # 覆盖导入涉及大量删除与插入，放在同一事务中：只提交一次，失败时保留原数据
+            with self.db.transaction():
+                # 导入页签（使用数据库）
+                tab_id_map = {}  # 旧 id → 新 id 映射
+                if "tabs" in data and isinstance(data["tabs"], list):
+                    # 先清空现有页签（保留默认页签）
+                    existing_tabs = self.computer_usage.get_tabs()
+                    for tab in existing_tabs:
+                        if tab.get('id') != '0':  # 保留默认页签
+                            self.computer_usage.delete_tab(tab['id'])
+                    # 导入新页签并建立映射
+                    for tab in data["tabs"]:
+                        if isinstance(tab, dict):
+                            old_id = tab.get('id', '0')
+                            if old_id == '0':
+                                tab_id_map[old_id] = '0'  # 默认页签直接映射
+                            else:
+                                new_tab = self.computer_usage.add_tab(tab.get('name', '未命名'))
+                                tab_id_map[old_id] = new_tab['id']  # 记录新 id
+                    imported["tabs"] = len(data["tabs"])
+
+                # 导入命令（使用数据库）
+                if "commands" in data and isinstance(data["commands"], list):
+                    # 先清空现有命令
+                    existing_cmds = self.computer_usage.get_commands()
+                    for cmd in existing_cmds:
+                        self.computer_usage.delete_command(cmd['id'])
+                    # 导入新命令（使用映射后的 tab_id）
+                    for cmd in data["commands"]:
+                        if isinstance(cmd, dict):
+                            old_tab_id = cmd.get('tab_id', '0')
+                            new_tab_id = tab_id_map.get(old_tab_id, '0')  # 使用映射，默认回退到 '0'
+                            self.computer_usage.add_command(
+                                title=cmd.get('title', ''),
+                                description=cmd.get('description', ''),
+                                commands=cmd.get('commands', []),
+                                tab_id=new_tab_id,
+                                tags=cmd.get('tags', [])
+                            )
+                    imported["commands"] = len(data["commands"])
+
+                # 导入凭证（使用数据库）
+                if "credentials" in data and isinstance(data["credentials"], list):
+                    # 先清空现有凭证
+                    existing_creds = self.computer_usage.get_credentials()
+                    for cred in existing_creds:
+                        self.computer_usage.delete_credential(cred['id'])
+                    # 导入新凭证
+                    for cred in data["credentials"]:
+                        if isinstance(cred, dict):
+                            self.computer_usage.add_credential(
+                                service=cred.get('service', ''),
+                                url=cred.get('url', ''),
+                                account=cred.get('account', ''),
+                                password=cred.get('password', ''),
+                                extra=cred.get('extra', [])
+                            )
+                    imported["credentials"] = len(data["credentials"])
+
+                # 导入节点（使用数据库）
+                if "nodes" in data and isinstance(data["nodes"], list):
+                    # 先清空现有节点
+                    existing_nodes = self.node_converter.get_nodes()
+                    for node in existing_nodes:
+                        self.node_converter.delete_node(node['id'])
+                    # 导入新节点
+                    for node in data["nodes"]:
+                        if isinstance(node, dict):
+                            config = node.get('config', {})
+                            yaml_config = config.get('yaml', '') if isinstance(config, dict) else ''
+                            self.node_converter.save_node(
+                                name=node.get('name', 'Unknown'),
+                                node_type=node.get('type', ''),
+                                server=node.get('server', ''),
+                                port=node.get('port', 0),
+                                raw_link=node.get('raw_link', ''),
+                                yaml_config=yaml_config
+                            )
+                    imported["nodes"] = len([n for n in data["nodes"] if isinstance(n, dict)])
+
+                # 导入主题
+                if "theme" in data:
+                    self.save_theme(data["theme"])
 
             return {"success": True, "imported": imported}
         except Exception as e:
@@ -711,14 +964,12 @@ class Api:
 
     def get_data_stats(self):
         """获取数据统计信息"""
-        return {
-            "tabs": len(self.computer_usage.get_tabs()),
-            "commands": len(self.computer_usage.get_commands()),
-            "credentials": len(self.computer_usage.get_credentials()),
-            "nodes": len(self.node_converter.get_nodes())
-        }
+        stats = self.computer_usage.get_stats()
+        stats["nodes"] = self.node_converter.count_nodes()
+        return stats
     def http_request(self, method: str, url: str, headers: dict = None, body: str = None,
-                     timeout: int = 30, verify_ssl: bool = True):
+                     timeout: int = 30, verify_ssl: bool = True, http2: bool = False,
+                     record_history: bool = True, stream_threshold: int = None):
         """
         代理 HTTP 请求，解决前端 CORS 限制。
 
@@ -729,128 +980,70 @@ class Api:
             body: 请求体字符串
             timeout: 超时时间（秒）
             verify_ssl: 是否验证 SSL 证书（默认 True）
+            http2: 是否尝试 HTTP/2（需要安装 h2，否则退回 HTTP/1.1）
+            record_history: 是否写入服务端请求历史（http_history 表）
+            stream_threshold: 响应体超过该字节数时落盘，只返回预览与 bodyHandle（默认 1MB，0 表示不落盘）
 
         Returns:
-            dict: {success, status, statusText, headers, body, duration, error_type?}
+            dict: {success, status, statusText, headers, body, duration, size, bodyEncoding, httpVersion,
+            contentType, streamed, bodyHandle?, timings: {dns, connect, tls, ttfb, download, total, reused},
+            bytes: {sent, received}, history_id?, error_type?}
         """
-        import subprocess
-        import json
-        import time
-
         logger.info(f"HTTP Request: {method} {url} (verify_ssl={verify_ssl})")
+        result = self.http_client.request(
+            method, url, headers=headers, body=body, timeout=timeout, verify_ssl=verify_ssl, http2=http2,
+            stream_threshold=stream_threshold,
+        )
+        if record_history:
+            result["history_id"] = self.http_history.record(method, url, headers, body, result)
+        return result
+
+    def read_http_response_body(self, handle: str, offset: int = 0, length: int = None):
+        """分段读取已落盘的大响应体（offset/length 以字节计）"""
+        return self.http_client.read_body(handle, offset, length)
+
+    def release_http_response_body(self, handle: str):
+        """释放已落盘的大响应体（删除临时文件）"""
+        return self.http_client.release_body(handle)
+
+    def get_http_history(self, page: int = 1, page_size: int = 50, keyword: str = None):
+        """分页获取服务端请求历史（只含元信息，不含请求体/响应体）"""
+        return self.http_history.list_entries(page, page_size, keyword)
+
+    def get_http_history_entry(self, entry_id: str):
+        """获取单条请求历史的完整请求与响应"""
+        entry = self.http_history.get_entry(entry_id)
+        if entry is None:
+            return {"success": False, "error": "历史记录不存在"}
+        return {"success": True, "entry": entry}
+
+    def delete_http_history_entry(self, entry_id: str):
+        return self.http_history.delete_entry(entry_id)
+
+    def clear_http_history(self):
+        """清空服务端请求历史"""
+        return self.http_history.clear()
+
+    def run_http_collection(self, collection_id: str, concurrency: int = None, iterations: int = 1,
+                            env_id: str = None, verify_ssl: bool = True):
+        """
+        后台运行集合/文件夹下的全部请求（批量测试 / 压测），共用 HTTP 连接池。
 
-        try:
-            start_time = time.time()
-
-            # 构建 curl 命令
-            cmd = ['curl', '-s', '-X', method.upper()]
-
-            # SSL 验证
-            if not verify_ssl:
-                cmd.append('-k')
-
-            # 添加请求头
-            if headers:
-                for key, value in headers.items():
-                    cmd.extend(['-H', f'{key}: {value}'])
-
-            # 添加请求体
-            if body and method.upper() in ('POST', 'PUT', 'PATCH'):
-                cmd.extend(['-d', body])
-
-            # 超时设置
-            cmd.extend(['--connect-timeout', str(timeout), '--max-time', str(timeout)])
-
-            # 包含响应头
-            cmd.append('-i')
-
-            # URL
-            cmd.append(url)
-
-            logger.info(f"Executing curl command")
-
-            # 执行 curl
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout + 5)
-
-            end_time = time.time()
-            duration = int((end_time - start_time) * 1000)
-
-            if result.returncode != 0:
-                error_msg = result.stderr or f"curl 返回错误码: {result.returncode}"
-                logger.error(f"curl error: {error_msg}")
-                if 'SSL' in error_msg.upper() or 'certificate' in error_msg.lower():
-                    return {
-                        "success": False,
-                        "error": f"SSL 错误: {error_msg}\n💡 提示：可以尝试取消勾选「验证 SSL 证书」选项",
-                        "error_type": "SSLError"
-                    }
-                return {
-                    "success": False,
-                    "error": error_msg,
-                    "error_type": "CurlError"
-                }
-
-            # 解析 curl 输出（包含响应头和响应体）
-            output = result.stdout
-            lines = output.split('\n')
-
-            # 分离响应头和响应体
-            response_headers = {}
-            response_body = ""
-            header_end = False
-            body_lines = []
-            http_code = 200
-
-            for line in lines:
-                if not header_end:
-                    if line.startswith('HTTP/'):
-                        # 解析状态码
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            try:
-                                http_code = int(parts[1])
-                            except ValueError:
-                                pass
-                    elif line.strip() == '' or line.strip() == '\r':
-                        header_end = True
-                    elif ':' in line:
-                        key, value = line.split(':', 1)
-                        response_headers[key.strip()] = value.strip()
-                else:
-                    body_lines.append(line)
-
-            response_body = '\n'.join(body_lines).strip()
-
-            # 获取状态文本
-            status_text = {
-                200: 'OK', 201: 'Created', 204: 'No Content',
-                400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden',
-                404: 'Not Found', 500: 'Internal Server Error'
-            }.get(http_code, 'Unknown')
-
-            return {
-                "success": True,
-                "status": http_code,
-                "statusText": status_text,
-                "headers": response_headers,
-                "body": response_body,
-                "duration": duration
-            }
-
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "error": "请求超时",
-                "error_type": "TimeoutError"
-            }
+        每完成一次请求产生一个进度事件，前端用 get_task_progress(task_id) 轮询；
+        最终结果含整体与逐请求的 p50/p95/p99 延迟、吞吐量和错误率。
+        """
+        logger.info(f"Run HTTP collection: {collection_id} (concurrency={concurrency}, iterations={iterations})")
+        return self._start_background_task(
+            lambda report: self.http_runner.run(
+                collection_id,
+                concurrency=concurrency,
+                iterations=iterations,
+                env_id=env_id,
+                verify_ssl=verify_ssl,
+                progress_callback=report,
+            )
+        )
 
-        except Exception as e:
-            logger.error(f"HTTP Request Exception: {type(e).__name__}: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "error_type": type(e).__name__
-            }
     def save_file_dialog(self, *args, **kwargs):
         """
         打开保存文件对话框，让用户选择保存位置。
@@ -75,6 +75,7 @@ def main():
 
     # 初始化数据库并执行迁移
     db_path = data_dir / "doggy_toolbox.db"
+    db_manager = None
     try:
         db_manager = DatabaseManager(db_path)
         migration = DataMigration(data_dir, db_manager)
@@ -91,6 +92,10 @@ def main():
                 logger.error(f"数据迁移失败: {result.get('message')}")
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
+    finally:
+        # 迁移专用实例用完即关，运行期由 Api 持有自己的连接池
+        if db_manager is not None:
+            db_manager.close()
 
     # 创建前后端桥接对象：后续页面里的 window.pywebview.api.xxx() 都从这里进 Python。
     api = Api(
@@ -119,6 +124,7 @@ def main():
     # - 允许前端通过 fetch()/XHR 加载 web/pages/* 等静态资源（避免 file:// 限制）
     # - 对"index.html 拆分为页面片段按需注入"的架构是必要条件
     webview.start(debug=debug_mode, http_server=True)
+    api.shutdown()
     sys.exit()
 
 
@@ -13,10 +13,11 @@ import re
 import json
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, asdict, field
+from datetime import datetime
 
-from services.db_manager import DatabaseManager
+from services.db_manager import DatabaseManager, VersionedCache
 
 logger = logging.getLogger(__name__)
 
@@ -80,8 +81,27 @@ class ComputerUsageService:
             self.db_path = data_dir / "doggy_toolbox.db"
             self.db = DatabaseManager(self.db_path)
             logger.info(f"ComputerUsageService 使用独立数据库: {self.db_path}")
+
+        # 读穿缓存（页签、命令、凭证列表），写操作后按 key 失效
+        self._cache = VersionedCache(self.db)
+
         self._ensure_default_tab()
 
+    def get_stats(self) -> Dict[str, int]:
+        """用 COUNT(*) 统计页签、命令与凭证数量"""
+        rows = self.db.execute_query("""
+            SELECT
+                (SELECT COUNT(*) FROM command_tabs) AS tabs,
+                (SELECT COUNT(*) FROM computer_commands) AS commands,
+                (SELECT COUNT(*) FROM credentials) AS credentials
+        """)
+        row = rows[0] if rows else {}
+        return {
+            "tabs": row.get("tabs", 0) or 0,
+            "commands": row.get("commands", 0) or 0,
+            "credentials": row.get("credentials", 0) or 0,
+        }
+
     # ========== 初始化与页签管理 ==========
     def _ensure_default_tab(self):
         """确保数据库中有默认标签页"""
@@ -96,75 +116,111 @@ class ComputerUsageService:
             rows = self.db.get_all("command_tabs", order_by="order_index ASC")
         return [CommandTab(id=r.get("id", ""), name=r.get("name", ""), order=r.get("order_index", 0) or 0) for r in rows]
 
-    def _save_tabs(self, tabs: List[CommandTab]):
-        existing = self.db.get_all("command_tabs", order_by="")
-        existing_ids = {r.get("id") for r in existing}
-        new_ids = {t.id for t in tabs}
+    # ========== 单行写入辅助 ==========
+    def _next_numeric_id(self, table: str) -> str:
+        """取表中数字 ID 的最大值 + 1（ID 以字符串存储）"""
+        rows = self.db.execute_query(f"SELECT MAX(CAST(id AS INTEGER)) AS max_id FROM {table}")
+        max_id = rows[0]["max_id"] if rows else None
+        return str((max_id if max_id is not None else 0) + 1)
+
+    def _next_order(self, table: str, where: str = "", params: tuple = ()) -> int:
+        """取指定范围内 order_index 的最大值 + 1"""
+        query = f"SELECT MAX(order_index) AS max_order FROM {table}"
+        if where:
+            query += f" WHERE {where}"
+        rows = self.db.execute_query(query, params)
+        max_order = rows[0]["max_order"] if rows else None
+        return (max_order if max_order is not None else -1) + 1
+
+    def _apply_order(self, table: str, current: List[tuple], ordered_ids: List[str]) -> int:
+        """
+        按前端传入的 ID 顺序重排，未出现在列表中的记录保持原相对顺序排在后面。
+        只有排序值真正变化的行才会写入，用 executemany 在同一事务中批量执行
+        （每行绑定参数个数固定，不受 SQLite 单条语句变量数上限的限制）。
 
-        for removed_id in existing_ids - new_ids:
-            if removed_id:
-                self.db.delete("command_tabs", "id = ?", (removed_id,))
+        Args:
+            table: 表名
+            current: [(id, order_index), ...]，已按当前顺序排列
+            ordered_ids: 前端传入的新顺序
 
-        for tab in tabs:
-            data = {"id": tab.id, "name": tab.name, "order_index": tab.order}
-            if tab.id in existing_ids:
-                self.db.update("command_tabs", data, "id = ?", (tab.id,))
-            else:
-                self.db.insert("command_tabs", data)
+        Returns:
+            实际更新的行数
+        """
+        current_map = dict(current)
+        new_order: Dict[str, int] = {}
+        for order, item_id in enumerate(ordered_ids):
+            if item_id in current_map:
+                new_order[item_id] = order
+
+        next_order = len(ordered_ids)
+        listed = set(ordered_ids)
+        for item_id, _ in sorted(current, key=lambda r: r[1]):
+            if item_id not in listed:
+                new_order[item_id] = next_order
+                next_order += 1
+
+        changed = [(item_id, order) for item_id, order in new_order.items() if current_map.get(item_id) != order]
+        if not changed:
+            return 0
+
+        now = datetime.now().isoformat()
+        return self.db.execute_many(
+            f"UPDATE {table} SET order_index = ?, updated_at = ? WHERE id = ?",
+            [(order, now, item_id) for item_id, order in changed],
+        )
 
     def get_tabs(self) -> List[Dict]:
-        tabs = self._load_tabs()
-        return sorted([asdict(t) for t in tabs], key=lambda x: x['order'])
+        def load():
+            tabs = self._load_tabs()
+            return sorted([asdict(t) for t in tabs], key=lambda x: x['order'])
+        return list(self._cache.get("tabs", load))
 
     def add_tab(self, name: str) -> Dict:
-        tabs = self._load_tabs()
-        new_id = str(max((int(t.id) for t in tabs), default=0) + 1)
-        max_order = max((t.order for t in tabs), default=-1) + 1
-        new_tab = CommandTab(id=new_id, name=name, order=max_order)
-        tabs.append(new_tab)
-        self._save_tabs(tabs)
+        with self.db.transaction():
+            new_id = self._next_numeric_id("command_tabs")
+            max_order = self._next_order("command_tabs")
+            new_tab = CommandTab(id=new_id, name=name, order=max_order)
+            self.db.insert("command_tabs", {"id": new_tab.id, "name": new_tab.name, "order_index": new_tab.order})
+            self._cache.invalidate("tabs")
         return asdict(new_tab)
 
     def update_tab(self, id: str, name: str) -> Optional[Dict]:
-        tabs = self._load_tabs()
-        for i, tab in enumerate(tabs):
-            if tab.id == id:
-                tabs[i] = CommandTab(id=id, name=name, order=tab.order)
-                self._save_tabs(tabs)
-                return asdict(tabs[i])
-        return None
+        row = self.db.get_by_id("command_tabs", id)
+        if not row:
+            return None
+        self.db.update("command_tabs", {"name": name}, "id = ?", (id,))
+        self._cache.invalidate("tabs")
+        return asdict(CommandTab(id=id, name=name, order=row.get("order_index", 0) or 0))
 
     def delete_tab(self, id: str) -> bool:
         if id == "0":  # 不能删除"未分类"
             return False
-        tabs = self._load_tabs()
-        new_tabs = [t for t in tabs if t.id != id]
-        if len(new_tabs) < len(tabs):
-            self._save_tabs(new_tabs)
+        with self.db.transaction():
+            deleted = self.db.execute_update("DELETE FROM command_tabs WHERE id = ?", (id,))
+            if not deleted:
+                return False
             # 将该页签下的命令移到"未分类"
-            cmds = self._load_commands()
-            for cmd in cmds:
-                if cmd.tab_id == id:
-                    cmd.tab_id = "0"
-            self._save_commands(cmds)
-            return True
-        return False
+            self.db.execute_update(
+                "UPDATE computer_commands SET tab_id = '0', updated_at = ? WHERE tab_id = ?",
+                (datetime.now().isoformat(), id),
+            )
+            self._cache.invalidate("tabs", "commands")
+        return True
 
     def reorder_tabs(self, tab_ids: List[str]) -> bool:
         """重新排序页签"""
-        tabs = self._load_tabs()
-        tab_map = {t.id: t for t in tabs}
-        for i, tid in enumerate(tab_ids):
-            if tid in tab_map:
-                tab_map[tid].order = i
-        self._save_tabs(list(tab_map.values()))
+        with self.db.transaction():
+            rows = self.db.execute_query("SELECT id, order_index FROM command_tabs ORDER BY order_index ASC")
+            current = [(r["id"], r["order_index"] or 0) for r in rows]
+            self._apply_order("command_tabs", current, tab_ids)
+            self._cache.invalidate("tabs")
         return True
 
     # ========== 命令块管理 ==========
     # ========== 命令卡片管理 ==========
-    def _load_commands(self) -> List[CommandBlock]:
-        rows = self.db.get_all("computer_commands", order_by="tab_id ASC, order_index ASC")
-        return [CommandBlock(
+    @staticmethod
+    def _row_to_command(r: Dict) -> CommandBlock:
+        return CommandBlock(
             id=r.get("id", ""),
             title=r.get("title", ""),
             description=r.get("description", ""),
@@ -172,100 +228,159 @@ class ComputerUsageService:
             tab_id=r.get("tab_id", "0") or "0",
             order=r.get("order_index", 0) or 0,
             tags=r.get("tags") or []
-        ) for r in rows]
+        )
 
-    def _save_commands(self, commands: List[CommandBlock]):
-        existing = self.db.get_all("computer_commands", order_by="")
-        existing_ids = {r.get("id") for r in existing}
-        new_ids = {c.id for c in commands}
+    def _load_commands(self) -> List[CommandBlock]:
+        rows = self.db.get_all("computer_commands", order_by="tab_id ASC, order_index ASC")
+        return [self._row_to_command(r) for r in rows]
 
-        for removed_id in existing_ids - new_ids:
-            if removed_id:
-                self.db.delete("computer_commands", "id = ?", (removed_id,))
+    def _get_command(self, id: str) -> Optional[CommandBlock]:
+        row = self.db.get_by_id("computer_commands", id)
+        return self._row_to_command(row) if row else None
 
-        for cmd in commands:
-            data = {
-                "id": cmd.id,
-                "title": cmd.title,
-                "description": cmd.description,
-                "commands": cmd.commands,
-                "tab_id": cmd.tab_id or "0",
-                "order_index": cmd.order,
-                "tags": cmd.tags or []
-            }
-            if cmd.id in existing_ids:
-                self.db.update("computer_commands", data, "id = ?", (cmd.id,))
-            else:
-                self.db.insert("computer_commands", data)
+    def _commands_snapshot(self) -> Dict[str, Any]:
+        """命令缓存快照：全量列表 + 按页签分组"""
+        def load():
+            cmds = sorted([asdict(c) for c in self._load_commands()], key=lambda x: (x['tab_id'], x['order']))
+            by_tab: Dict[str, List[Dict]] = {}
+            for cmd in cmds:
+                by_tab.setdefault(cmd['tab_id'], []).append(cmd)
+            return {"all": cmds, "by_tab": by_tab}
+        return self._cache.get("commands", load)
 
     def get_commands(self) -> List[Dict]:
-        cmds = self._load_commands()
-        return sorted([asdict(c) for c in cmds], key=lambda x: (x['tab_id'], x['order']))
+        return list(self._commands_snapshot()["all"])
 
     def get_commands_by_tab(self, tab_id: str) -> List[Dict]:
-        cmds = self._load_commands()
-        filtered = [asdict(c) for c in cmds if c.tab_id == tab_id]
-        return sorted(filtered, key=lambda x: x['order'])
+        return list(self._commands_snapshot()["by_tab"].get(tab_id, []))
+
+    # ========== 命令搜索 ==========
+    @staticmethod
+    def _build_fts_query(query: str) -> str:
+        """把用户输入转成 FTS5 查询：每个词做前缀匹配，多个词之间为 AND"""
+        terms = re.findall(r"\w+", query or "")
+        return " ".join(f'"{t}"*' for t in terms)
+
+    def search_commands(self, query: str, limit: int = 50, tab_id: Optional[str] = None) -> List[Dict]:
+        """
+        搜索命令块（标题、描述、命令正文、标签）
+
+        优先使用 FTS5 索引按 bm25 排序（标题权重最高）；FTS5 不可用或无结果时
+        （例如中文词落在长词中间）回退到 LIKE 子串匹配。
+
+        Args:
+            query: 搜索关键字
+            limit: 最多返回条数
+            tab_id: 仅在指定页签内搜索（可选）
+
+        Returns:
+            命令块列表，按相关度排序
+        """
+        query = (query or "").strip()
+        if not query:
+            return []
+        limit = max(1, min(int(limit or 50), 500))
+
+        rows: List[Dict] = []
+        fts_query = self._build_fts_query(query)
+        if self.db.fts_enabled and fts_query:
+            sql = """
+                SELECT c.* FROM computer_commands_fts f
+                JOIN computer_commands c ON c.rowid = f.rowid
+                WHERE computer_commands_fts MATCH ?
+            """
+            params: List[Any] = [fts_query]
+            if tab_id is not None:
+                sql += " AND c.tab_id = ?"
+                params.append(tab_id)
+            sql += " ORDER BY bm25(computer_commands_fts, 10.0, 4.0, 1.0, 6.0) LIMIT ?"
+            params.append(limit)
+            try:
+                rows = self.db.execute_query(sql, tuple(params))
+            except Exception as e:
+                logger.warning(f"FTS 搜索失败，回退到 LIKE 查询: {e}")
+                rows = []
+
+        if not rows:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql = """
+                SELECT * FROM computer_commands
+                WHERE (title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\'
+                       OR commands LIKE ? ESCAPE '\\' OR tags LIKE ? ESCAPE '\\')
+            """
+            params = [pattern] * 4
+            if tab_id is not None:
+                sql += " AND tab_id = ?"
+                params.append(tab_id)
+            sql += " ORDER BY (title LIKE ? ESCAPE '\\') DESC, tab_id ASC, order_index ASC LIMIT ?"
+            params.extend([pattern, limit])
+            rows = self.db.execute_query(sql, tuple(params))
+
+        return [asdict(self._row_to_command(self.db._deserialize_json_fields(r))) for r in rows]
 
     def add_command(self, title: str, description: str, commands: List[str], tab_id: str = "0", tags: List[str] = None) -> Dict:
-        all_cmds = self._load_commands()
-        new_id = str(max((int(c.id) for c in all_cmds), default=0) + 1)
-        # 计算该页签下的最大order
-        tab_cmds = [c for c in all_cmds if c.tab_id == tab_id]
-        max_order = max((c.order for c in tab_cmds), default=-1) + 1
-        new_cmd = CommandBlock(id=new_id, title=title, description=description, commands=commands, tab_id=tab_id, order=max_order, tags=tags or [])
-        all_cmds.append(new_cmd)
-        self._save_commands(all_cmds)
+        with self.db.transaction():
+            new_id = self._next_numeric_id("computer_commands")
+            # 计算该页签下的最大order
+            max_order = self._next_order("computer_commands", "tab_id = ?", (tab_id,))
+            new_cmd = CommandBlock(id=new_id, title=title, description=description, commands=commands, tab_id=tab_id, order=max_order, tags=tags or [])
+            self.db.insert("computer_commands", {
+                "id": new_cmd.id,
+                "title": new_cmd.title,
+                "description": new_cmd.description,
+                "commands": new_cmd.commands,
+                "tab_id": new_cmd.tab_id or "0",
+                "order_index": new_cmd.order,
+                "tags": new_cmd.tags,
+            })
+            self._cache.invalidate("commands")
         return asdict(new_cmd)
 
     def update_command(self, id: str, title: str, description: str, commands: List[str], tab_id: str = None, tags: List[str] = None) -> Optional[Dict]:
-        all_cmds = self._load_commands()
-        for i, cmd in enumerate(all_cmds):
-            if cmd.id == id:
-                new_tab_id = tab_id if tab_id is not None else cmd.tab_id
-                all_cmds[i] = CommandBlock(id=id, title=title, description=description, commands=commands, tab_id=new_tab_id, order=cmd.order, tags=tags or [])
-                self._save_commands(all_cmds)
-                return asdict(all_cmds[i])
-        return None
+        cmd = self._get_command(id)
+        if cmd is None:
+            return None
+        new_tab_id = tab_id if tab_id is not None else cmd.tab_id
+        updated = CommandBlock(id=id, title=title, description=description, commands=commands, tab_id=new_tab_id, order=cmd.order, tags=tags or [])
+        self.db.update("computer_commands", {
+            "title": updated.title,
+            "description": updated.description,
+            "commands": updated.commands,
+            "tab_id": updated.tab_id or "0",
+            "tags": updated.tags,
+        }, "id = ?", (id,))
+        self._cache.invalidate("commands")
+        return asdict(updated)
 
     def move_command_to_tab(self, cmd_id: str, target_tab_id: str) -> Optional[Dict]:
         """移动命令到指定页签"""
-        all_cmds = self._load_commands()
-        for cmd in all_cmds:
-            if cmd.id == cmd_id:
-                cmd.tab_id = target_tab_id
-                # 放到目标页签的最后
-                tab_cmds = [c for c in all_cmds if c.tab_id == target_tab_id and c.id != cmd_id]
-                cmd.order = max((c.order for c in tab_cmds), default=-1) + 1
-                self._save_commands(all_cmds)
-                return asdict(cmd)
-        return None
+        with self.db.transaction():
+            cmd = self._get_command(cmd_id)
+            if cmd is None:
+                return None
+            cmd.tab_id = target_tab_id
+            # 放到目标页签的最后
+            cmd.order = self._next_order("computer_commands", "tab_id = ? AND id != ?", (target_tab_id, cmd_id))
+            self.db.update("computer_commands", {"tab_id": cmd.tab_id, "order_index": cmd.order}, "id = ?", (cmd_id,))
+            self._cache.invalidate("commands")
+        return asdict(cmd)
 
     def delete_command(self, id: str) -> bool:
-        all_cmds = self._load_commands()
-        new_cmds = [c for c in all_cmds if c.id != id]
-        if len(new_cmds) < len(all_cmds):
-            self._save_commands(new_cmds)
-            return True
-        return False
+        deleted = self.db.execute_update("DELETE FROM computer_commands WHERE id = ?", (id,)) > 0
+        if deleted:
+            self._cache.invalidate("commands")
+        return deleted
 
     def reorder_commands(self, tab_id: str, command_ids: List[str]) -> bool:
         """根据前端传入的ID顺序重排指定页签下的命令块"""
-        all_cmds = self._load_commands()
-        tab_cmds = [c for c in all_cmds if c.tab_id == tab_id]
-        cmd_map = {c.id: c for c in tab_cmds}
-
-        for order, cid in enumerate(command_ids):
-            if cid in cmd_map:
-                cmd_map[cid].order = order
-
-        current_order = len(command_ids)
-        for cmd in sorted(tab_cmds, key=lambda c: c.order):
-            if cmd.id not in command_ids:
-                cmd.order = current_order
-                current_order += 1
-
-        self._save_commands(all_cmds)
+        with self.db.transaction():
+            rows = self.db.execute_query(
+                "SELECT id, order_index FROM computer_commands WHERE tab_id = ? ORDER BY order_index ASC",
+                (tab_id,),
+            )
+            current = [(r["id"], r["order_index"] or 0) for r in rows]
+            self._apply_order("computer_commands", current, command_ids)
+            self._cache.invalidate("commands")
         return True
 
     def import_commands_txt(self, text: str) -> Dict:
@@ -312,11 +427,24 @@ class ComputerUsageService:
         if current_title and current_cmds:
             blocks.append({"title": current_title, "description": current_desc, "commands": current_cmds})
 
-        # 保存
-        imported = 0
-        for block in blocks:
-            self.add_command(block["title"], block["description"], block["commands"])
-            imported += 1
+        # 保存：ID 与排序的计算和批量写入放在同一事务中（与 add_command 一致），避免并发新增取到相同 ID
+        with self.db.transaction():
+            next_id = int(self._next_numeric_id("computer_commands"))
+            next_order = self._next_order("computer_commands", "tab_id = ?", ("0",))
+            rows = []
+            for offset, block in enumerate(blocks):
+                rows.append({
+                    "id": str(next_id + offset),
+                    "title": block["title"],
+                    "description": block["description"],
+                    "commands": block["commands"],
+                    "tab_id": "0",
+                    "order_index": next_order + offset,
+                    "tags": [],
+                })
+            imported = self.db.insert_many("computer_commands", rows) if rows else 0
+            if imported:
+                self._cache.invalidate("commands")
 
         return {"imported": imported, "blocks": blocks}
 
@@ -357,10 +485,13 @@ class ComputerUsageService:
                 self.db.update("credentials", data, "id = ?", (cred.id,))
             else:
                 self.db.insert("credentials", data)
+        self._cache.invalidate("credentials")
 
     def get_credentials(self) -> List[Dict]:
-        creds = self._load_credentials()
-        return sorted([asdict(c) for c in creds], key=lambda x: x["order"])
+        def load():
+            creds = self._load_credentials()
+            return sorted([asdict(c) for c in creds], key=lambda x: x["order"])
+        return list(self._cache.get("credentials", load))
 
     def add_credential(self, service: str, url: str, account: str, password: str, extra: List[str] = None) -> Dict:
         all_creds = self._load_credentials()
@@ -422,11 +553,12 @@ class ComputerUsageService:
             if cred:
                 credentials.append(cred)
 
-        # 保存
+        # 保存（单事务）
         imported = 0
-        for cred in credentials:
-            self.add_credential(cred["service"], cred["url"], cred["account"], cred["password"], cred.get("extra", []))
-            imported += 1
+        with self.db.transaction():
+            for cred in credentials:
+                self.add_credential(cred["service"], cred["url"], cred["account"], cred["password"], cred.get("extra", []))
+                imported += 1
 
         return {"imported": imported, "credentials": credentials}
 
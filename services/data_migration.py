@@ -6,6 +6,7 @@
 
 import json
 import logging
+import sqlite3
 from pathlib import Path
 from typing import Dict, List, Any
 from datetime import datetime
@@ -80,35 +81,38 @@ class DataMigration:
         self.migration_log = []
 
         try:
-            # 1. 迁移应用配置
-            self._migrate_app_config()
+            # 所有迁移步骤在同一事务中执行：只提交一次，中途异常则整体回滚；
+            # 各步骤只吞掉读取旧文件的错误，写库失败（sqlite3.Error）一律抛到这里
+            with self.db.transaction():
+                # 1. 迁移应用配置
+                self._migrate_app_config()
 
-            # 2. 迁移 AI Provider
-            self._migrate_ai_providers()
+                # 2. 迁移 AI Provider
+                self._migrate_ai_providers()
 
-            # 3. 迁移工具 AI 配置
-            self._migrate_tool_ai_config()
+                # 3. 迁移工具 AI 配置
+                self._migrate_tool_ai_config()
 
-            # 4. 迁移 HTTP 请求集合
-            self._migrate_http_collections()
+                # 4. 迁移 HTTP 请求集合
+                self._migrate_http_collections()
 
-            # 5. 迁移电脑使用命令
-            self._migrate_computer_commands()
+                # 5. 迁移电脑使用命令
+                self._migrate_computer_commands()
 
-            # 6. 迁移命令标签页
-            self._migrate_command_tabs()
+                # 6. 迁移命令标签页
+                self._migrate_command_tabs()
 
-            # 7. 迁移凭据
-            self._migrate_credentials()
+                # 7. 迁移凭据
+                self._migrate_credentials()
 
-            # 8. 迁移转化节点
-            self._migrate_conversion_nodes()
+                # 8. 迁移转化节点
+                self._migrate_conversion_nodes()
 
-            # 标记迁移完成
-            self.db.insert('db_metadata', {
-                'key': 'migrated',
-                'value': 'true'
-            })
+                # 标记迁移完成
+                self.db.insert('db_metadata', {
+                    'key': 'migrated',
+                    'value': 'true'
+                })
 
             logger.info("数据迁移完成")
             return {
@@ -147,6 +151,8 @@ class DataMigration:
             self.migration_log.append('应用配置')
             logger.info("应用配置迁移完成")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"应用配置迁移失败: {e}")
 
@@ -185,6 +191,8 @@ class DataMigration:
             self.migration_log.append('AI Provider')
             logger.info(f"AI Provider 迁移完成 ({len(providers)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"AI Provider 迁移失败: {e}")
 
@@ -218,6 +226,8 @@ class DataMigration:
             self.migration_log.append('工具 AI 配置')
             logger.info(f"工具 AI 配置迁移完成 ({len(tools)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"工具 AI 配置迁移失败: {e}")
 
@@ -238,6 +248,8 @@ class DataMigration:
             self.migration_log.append('HTTP 请求集合')
             logger.info(f"HTTP 请求集合迁移完成 ({len(collections)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"HTTP 请求集合迁移失败: {e}")
 
@@ -315,6 +327,8 @@ class DataMigration:
             self.migration_log.append('电脑使用命令')
             logger.info(f"电脑使用命令迁移完成 ({len(commands)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"电脑使用命令迁移失败: {e}")
 
@@ -339,6 +353,8 @@ class DataMigration:
             self.migration_log.append('命令标签页')
             logger.info(f"命令标签页迁移完成 ({len(tabs)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"命令标签页迁移失败: {e}")
 
@@ -367,6 +383,8 @@ class DataMigration:
             self.migration_log.append('凭据')
             logger.info(f"凭据迁移完成 ({len(credentials)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"凭据迁移失败: {e}")
 
@@ -397,6 +415,8 @@ class DataMigration:
             self.migration_log.append('转化节点')
             logger.info(f"转化节点迁移完成 ({len(sections)} 条)")
 
+        except sqlite3.Error:
+            raise
         except Exception as e:
             logger.error(f"转化节点迁移失败: {e}")
 
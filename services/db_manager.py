@@ -6,8 +6,12 @@
 
 import sqlite3
 import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
 import logging
 import shutil
@@ -22,28 +26,360 @@ class DatabaseManager:
 
     VERSION = "1.0.0"
 
-    def __init__(self, db_path: Path):
+    # 连接池默认大小：pywebview 每次 JS 调用都可能落在新线程上，
+    # 因此不按线程常驻连接，而是维护一个小的有界池，线程用完即归还。
+    DEFAULT_POOL_SIZE = 4
+    # 每个新连接只执行一次的 PRAGMA
+    DEFAULT_PRAGMAS = {
+        "foreign_keys": "ON",  # 启用外键约束
+    }
+
+    # 存储配置档：journal_mode 作用于整个数据库文件，只在初始化时设置一次；
+    # 其余 PRAGMA 是连接级的，会随连接池中的每个新连接一起应用。
+    # - balanced：WAL + synchronous=NORMAL，读写互不阻塞，断电最多丢失最近一次提交
+    # - durable：WAL + synchronous=FULL，每次提交都落盘
+    # - legacy：SQLite 默认的回滚日志模式（升级前的行为）
+    STORAGE_PROFILES = {
+        "balanced": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 64 * 1024 * 1024,
+            "cache_size": -16000,  # 负数单位为 KiB，约 16MB
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+        "durable": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "cache_size": -8000,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+        "legacy": {
+            "journal_mode": "DELETE",
+            "synchronous": "FULL",
+        },
+    }
+    DEFAULT_STORAGE_PROFILE = "balanced"
+
+    def __init__(self, db_path: Path, pool_size: int = DEFAULT_POOL_SIZE,
+                 pragmas: Optional[Dict[str, Any]] = None, pool_timeout: float = 30.0,
+                 storage_profile: Any = DEFAULT_STORAGE_PROFILE,
+                 checkpoint_interval: float = 0):
         """
         初始化数据库管理器
 
         Args:
             db_path: 数据库文件路径
+            pool_size: 连接池最大连接数
+            pragmas: 额外的连接级 PRAGMA（会覆盖默认值）
+            pool_timeout: 连接池耗尽时等待空闲连接的秒数
+            storage_profile: 存储配置档名称（见 STORAGE_PROFILES），或直接传入 PRAGMA 字典
+            checkpoint_interval: WAL 定期 checkpoint 间隔（秒），0 表示不启动后台 checkpoint
         """
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        profile = self._resolve_storage_profile(storage_profile)
+        self.journal_mode = str(profile.pop("journal_mode", "DELETE")).upper()
+        self.storage_profile = storage_profile if isinstance(storage_profile, str) else "custom"
+
+        self.pool_size = max(1, int(pool_size))
+        self.pool_timeout = pool_timeout
+        self.pragmas = {**self.DEFAULT_PRAGMAS, **profile, **(pragmas or {})}
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._pool_cond = threading.Condition(self._pool_lock)
+        # 已打开的连接 -> 所属代数；替换数据库文件时代数加一，旧一代的连接归还时直接关闭
+        self._all_connections: Dict[sqlite3.Connection, int] = {}
+        self._generation = 0
+        self._paused = False
+        self._local = threading.local()
+        self._closed = False
+        self.fts_enabled = False
+        self._pool_stats = {"created": 0, "acquired": 0, "reused": 0, "waits": 0}
+
+        self._checkpoint_stop = threading.Event()
+        self._checkpoint_thread: Optional[threading.Thread] = None
+        self._checkpoint_interval = 0.0
+
+        # 表结构缓存：table -> 列名集合，初始化时一次性填充，迁移加列时失效
+        self._schema_cache: Dict[str, frozenset] = {}
+
         self._init_database()
 
-    def _get_connection(self) -> sqlite3.Connection:
-        """获取数据库连接"""
-        conn = sqlite3.connect(str(self.db_path))
+        if checkpoint_interval and checkpoint_interval > 0:
+            self.start_checkpoint_timer(checkpoint_interval)
+
+    @classmethod
+    def _resolve_storage_profile(cls, storage_profile: Any) -> Dict[str, Any]:
+        """把配置档名称或字典展开为 PRAGMA 字典（返回副本）"""
+        if isinstance(storage_profile, dict):
+            return dict(storage_profile)
+        name = storage_profile or cls.DEFAULT_STORAGE_PROFILE
+        if name not in cls.STORAGE_PROFILES:
+            raise ValueError(f"未知的存储配置档: {name}")
+        return dict(cls.STORAGE_PROFILES[name])
+
+    # ========== 连接池 ==========
+    def _create_connection(self) -> sqlite3.Connection:
+        """新建一个连接并应用 PRAGMA（每个连接只执行一次）"""
+        # 连接会在池内被不同线程轮流使用，但同一时刻只归属一个线程
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
         conn.row_factory = sqlite3.Row  # 返回字典格式
-        conn.execute("PRAGMA foreign_keys = ON")  # 启用外键约束
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
         return conn
 
+    def _acquire_connection(self) -> sqlite3.Connection:
+        """从池中取出连接；同一线程嵌套调用时复用已持有的连接"""
+        local = self._local
+        if getattr(local, "conn", None) is not None:
+            local.depth += 1
+            return local.conn
+
+        deadline = time.monotonic() + self.pool_timeout
+        waited = False
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+                reused = True
+                break
+            except queue.Empty:
+                pass
+            with self._pool_lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("数据库连接池已关闭")
+                # 暂停期间（数据库文件替换中）不新建连接
+                if not self._paused and len(self._all_connections) < self.pool_size:
+                    conn = self._create_connection()
+                    self._all_connections[conn] = self._generation
+                    self._pool_stats["created"] += 1
+                    reused = False
+                    break
+                if not waited:
+                    self._pool_stats["waits"] += 1
+                    waited = True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise sqlite3.OperationalError("等待数据库连接超时")
+            # 分段等待：旧一代连接被关闭后腾出的名额不会出现在队列里，需要回到上面重新尝试新建
+            try:
+                conn = self._pool.get(timeout=min(remaining, 0.1))
+                reused = True
+                break
+            except queue.Empty:
+                continue
+
+        with self._pool_lock:
+            self._pool_stats["acquired"] += 1
+            if reused:
+                self._pool_stats["reused"] += 1
+
+        local.conn = conn
+        local.depth = 1
+        return conn
+
+    def _release_connection(self, conn: sqlite3.Connection):
+        """归还连接；最外层释放时才放回池中"""
+        local = self._local
+        local.depth -= 1
+        if local.depth > 0:
+            return
+        local.conn = None
+
+        if conn.in_transaction:
+            # 调用方异常退出时可能残留未提交事务，归还前回滚，避免污染下一个使用者
+            conn.rollback()
+
+        with self._pool_cond:
+            if not self._closed and self._all_connections.get(conn) == self._generation:
+                self._pool.put(conn)
+                return
+        # 连接池已关闭或已换代：这个连接只有当前线程在用，由归还方关闭；
+        # 关闭（WAL 模式下可能触发 checkpoint 写回文件）完成后才注销，替换数据库文件的一方以此为准
+        try:
+            conn.close()
+        finally:
+            with self._pool_cond:
+                self._all_connections.pop(conn, None)
+                self._pool_cond.notify_all()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """借用一个池化连接，用完自动归还"""
+        conn = self._acquire_connection()
+        try:
+            yield conn
+        finally:
+            self._release_connection(conn)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        with self._pool_lock:
+            stats = dict(self._pool_stats)
+            total = len(self._all_connections)
+        idle = self._pool.qsize()
+        stats.update({
+            "pool_size": self.pool_size,
+            "open": total,
+            "idle": idle,
+            "in_use": max(0, total - idle),
+            "closed": self._closed,
+        })
+        return stats
+
+    def close(self):
+        """关闭连接池中的所有连接（应用退出时调用）"""
+        self.stop_checkpoint_timer()
+        if self.journal_mode == "WAL" and not self._closed:
+            # 退出前把 WAL 合并回主库并截断，避免留下大体积的 -wal 文件
+            self.checkpoint("TRUNCATE")
+
+        with self._pool_lock:
+            self._closed = True
+            self._generation += 1
+            idle = self._drain_idle_locked()
+        # 仍被其它线程借出的连接不在这里关闭，归还时由归还方关闭
+        self._close_connections(idle)
+        logger.info(f"数据库连接池已关闭: {self.db_path}")
+
+    def _drain_idle_locked(self) -> List[sqlite3.Connection]:
+        """取出池中全部空闲连接并移出登记表（调用方需持有 _pool_lock）"""
+        idle = []
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._all_connections.pop(conn, None)
+            idle.append(conn)
+        return idle
+
+    @staticmethod
+    def _close_connections(connections: List[sqlite3.Connection]):
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"关闭数据库连接失败: {e}")
+
+    @contextmanager
+    def _pool_paused(self) -> Iterator[None]:
+        """
+        暂停连接池并淘汰当前一代连接（数据库文件被替换时使用）
+
+        空闲连接立即关闭；其它线程借出的连接不去碰它，等它们归还（归还时被关闭）后才进入 with 块，
+        期间新的借用请求等待，直到退出 with 块后用新一代连接访问新文件。
+        """
+        own = getattr(self._local, "conn", None)
+        with self._pool_lock:
+            if self._paused:
+                raise sqlite3.OperationalError("数据库正在被替换")
+            self._paused = True
+            self._generation += 1
+            idle = self._drain_idle_locked()
+        try:
+            self._close_connections(idle)
+            with self._pool_cond:
+                returned = self._pool_cond.wait_for(
+                    lambda: all(conn is own for conn in self._all_connections), timeout=self.pool_timeout
+                )
+            if not returned:
+                raise sqlite3.OperationalError("等待借出的数据库连接归还超时")
+            yield
+        finally:
+            with self._pool_cond:
+                self._paused = False
+                self._pool_cond.notify_all()
+
+    # ========== WAL checkpoint ==========
+    def checkpoint(self, mode: str = "PASSIVE") -> Optional[Dict[str, int]]:
+        """
+        执行一次 WAL checkpoint
+
+        Args:
+            mode: PASSIVE / FULL / RESTART / TRUNCATE
+
+        Returns:
+            {"busy", "log_frames", "checkpointed_frames"}；非 WAL 模式或失败时返回 None
+        """
+        if self.journal_mode != "WAL":
+            return None
+        mode = mode.upper()
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"无效的 checkpoint 模式: {mode}")
+        try:
+            with self._connection() as conn:
+                row = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            return {"busy": row[0], "log_frames": row[1], "checkpointed_frames": row[2]}
+        except sqlite3.Error as e:
+            logger.warning(f"WAL checkpoint 失败 (mode={mode}): {e}")
+            return None
+
+    def start_checkpoint_timer(self, interval: float):
+        """启动后台线程，按固定间隔执行 PASSIVE checkpoint"""
+        if self.journal_mode != "WAL" or self._checkpoint_thread is not None:
+            return
+        self._checkpoint_interval = interval
+        self._checkpoint_stop.clear()
+
+        def worker():
+            while not self._checkpoint_stop.wait(interval):
+                if self._closed:
+                    break
+                self.checkpoint("PASSIVE")
+
+        self._checkpoint_thread = threading.Thread(
+            target=worker,
+            daemon=True,
+            name="sqlite-wal-checkpoint",
+        )
+        self._checkpoint_thread.start()
+
+    def stop_checkpoint_timer(self):
+        """停止后台 checkpoint 线程"""
+        thread = self._checkpoint_thread
+        if thread is None:
+            return
+        self._checkpoint_stop.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+        self._checkpoint_thread = None
+
+    def get_storage_info(self) -> Dict[str, Any]:
+        """获取当前数据库实际生效的存储参数"""
+        with self._connection() as conn:
+            info = {"profile": self.storage_profile}
+            for name in ("journal_mode", "synchronous", "cache_size", "mmap_size",
+                         "temp_store", "busy_timeout"):
+                row = conn.execute(f"PRAGMA {name}").fetchone()
+                info[name] = row[0] if row else None
+        return info
+
     # ========== 数据库连接与表结构初始化 ==========
     def _init_database(self):
         """初始化数据库表结构"""
-        conn = self._get_connection()
+        with self._connection() as conn:
+            self._apply_journal_mode(conn)
+            self._create_schema(conn)
+            self._load_schema_cache(conn)
+
+    def _apply_journal_mode(self, conn: sqlite3.Connection):
+        """设置数据库级日志模式（WAL 设置会持久化到数据库文件中）"""
+        try:
+            row = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()
+            actual = str(row[0]).upper() if row else ""
+        except sqlite3.Error as e:
+            logger.warning(f"设置 journal_mode={self.journal_mode} 失败: {e}")
+            actual = ""
+        if actual != self.journal_mode:
+            # 例如网络文件系统不支持 WAL，此时沿用 SQLite 返回的实际模式
+            logger.warning(f"journal_mode 未生效，期望 {self.journal_mode}，实际 {actual or '未知'}")
+            self.journal_mode = actual or "DELETE"
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        """在给定连接上建表、建索引并执行迁移"""
         cursor = conn.cursor()
 
         try:
@@ -318,14 +654,105 @@ class DatabaseManager:
                 ON prompt_templates(is_favorite)
             """)
 
+            # 5.1 命令块全文索引（FTS5 外部内容表，由触发器与 computer_commands 保持同步）
+            self._create_command_fts(cursor)
+
             # 数据库迁移：为现有表添加新列
             self._migrate_add_column(cursor, 'conversion_nodes', 'tags', 'TEXT')
 
+            # 代理节点结构化字段（节点列表从 nodes.md 迁入本表）
+            self._migrate_add_column(cursor, 'conversion_nodes', 'node_type', 'TEXT')
+            self._migrate_add_column(cursor, 'conversion_nodes', 'server', 'TEXT')
+            self._migrate_add_column(cursor, 'conversion_nodes', 'port', 'INTEGER')
+            self._migrate_add_column(cursor, 'conversion_nodes', 'raw_link', 'TEXT')
+            # 节点去重指纹：(type, server, port, uuid/password, sni) 的哈希
+            self._migrate_add_column(cursor, 'conversion_nodes', 'fingerprint', 'TEXT')
+
             # 迁移后建索引（确保列存在后再建索引）
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_conversion_nodes_tags
                 ON conversion_nodes(tags)
             """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conversion_nodes_type
+                ON conversion_nodes(node_type, order_index)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conversion_nodes_fingerprint
+                ON conversion_nodes(fingerprint)
+            """)
+
+            # 8.1 节点标签索引表（一行一个标签，按标签筛选时走索引）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS conversion_node_tags (
+                    node_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY(node_id, tag),
+                    FOREIGN KEY(node_id) REFERENCES conversion_nodes(id) ON DELETE CASCADE
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conversion_node_tags_tag
+                ON conversion_node_tags(tag)
+            """)
+
+            # 节点探测结果表（每个节点保留最近一次结果）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS node_probe_results (
+                    node_id TEXT PRIMARY KEY,
+                    reachable INTEGER DEFAULT 0,
+                    median_ms REAL,
+                    jitter_ms REAL,
+                    min_ms REAL,
+                    failures INTEGER DEFAULT 0,
+                    attempts INTEGER DEFAULT 0,
+                    tls INTEGER DEFAULT 0,
+                    error TEXT,
+                    probed_at TEXT,
+                    FOREIGN KEY(node_id) REFERENCES conversion_nodes(id) ON DELETE CASCADE
+                )
+            """)
+
+            # 订阅缓存表（条件请求校验头 + 内容哈希 + 解析结果）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS subscription_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    data TEXT,
+                    fetched_at TEXT,
+                    updated_at TEXT
+                )
+            """)
+
+            # HTTP 请求/响应历史表（请求体与响应体以 zlib 压缩后存为 BLOB）
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS http_history (
+                    id TEXT PRIMARY KEY,
+                    method TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    success INTEGER DEFAULT 0,
+                    status INTEGER,
+                    status_text TEXT,
+                    error TEXT,
+                    duration INTEGER,
+                    request_headers TEXT,
+                    request_body BLOB,
+                    response_headers TEXT,
+                    body BLOB,
+                    body_encoding TEXT DEFAULT 'text',
+                    body_size INTEGER DEFAULT 0,
+                    stored_size INTEGER DEFAULT 0,
+                    truncated INTEGER DEFAULT 0,
+                    meta TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_http_history_created
+                ON http_history(created_at)
+            """)
 
             # 设置数据库版本
             cursor.execute("""
@@ -340,8 +767,53 @@ class DatabaseManager:
             conn.rollback()
             logger.error(f"数据库初始化失败: {e}")
             raise
-        finally:
-            conn.close()
+
+    def _create_command_fts(self, cursor):
+        """创建命令块 FTS5 索引；SQLite 未编译 FTS5 时降级为 LIKE 搜索"""
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'computer_commands_fts'"
+        )
+        existed = cursor.fetchone() is not None
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS computer_commands_fts USING fts5(
+                    title, description, commands, tags,
+                    content='computer_commands', content_rowid='rowid',
+                    tokenize='unicode61', prefix='2 3'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 不可用，命令搜索将使用 LIKE 查询: {e}")
+            self.fts_enabled = False
+            return
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS computer_commands_fts_ai
+            AFTER INSERT ON computer_commands BEGIN
+                INSERT INTO computer_commands_fts(rowid, title, description, commands, tags)
+                VALUES (new.rowid, new.title, new.description, new.commands, new.tags);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS computer_commands_fts_ad
+            AFTER DELETE ON computer_commands BEGIN
+                INSERT INTO computer_commands_fts(computer_commands_fts, rowid, title, description, commands, tags)
+                VALUES ('delete', old.rowid, old.title, old.description, old.commands, old.tags);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS computer_commands_fts_au
+            AFTER UPDATE OF title, description, commands, tags ON computer_commands BEGIN
+                INSERT INTO computer_commands_fts(computer_commands_fts, rowid, title, description, commands, tags)
+                VALUES ('delete', old.rowid, old.title, old.description, old.commands, old.tags);
+                INSERT INTO computer_commands_fts(rowid, title, description, commands, tags)
+                VALUES (new.rowid, new.title, new.description, new.commands, new.tags);
+            END
+        """)
+        if not existed:
+            # 老库首次建索引：用已有数据重建
+            cursor.execute("INSERT INTO computer_commands_fts(computer_commands_fts) VALUES ('rebuild')")
+        self.fts_enabled = True
 
     def _migrate_add_column(self, cursor, table: str, column: str, col_type: str):
         """安全地为表添加新列（如果不存在）"""
@@ -350,6 +822,37 @@ class DatabaseManager:
         if column not in columns:
             cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
             logger.info(f"迁移：为 {table} 表添加 {column} 列")
+            self.invalidate_schema_cache(table)
+
+    # ========== 表结构缓存 ==========
+    def _load_schema_cache(self, conn: sqlite3.Connection):
+        """一次性读取所有表的列信息"""
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()]
+        cache = {}
+        for table in tables:
+            cache[table] = frozenset(row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall())
+        self._schema_cache = cache
+
+    def _get_table_columns(self, table: str) -> frozenset:
+        """获取表的列名集合（优先读缓存，未命中时才查询 PRAGMA table_info）"""
+        columns = self._schema_cache.get(table)
+        if columns is None:
+            with self._connection() as conn:
+                rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            columns = frozenset(row[1] for row in rows)
+            if columns:
+                # 表不存在时不缓存，避免建表后仍命中空结果
+                self._schema_cache[table] = columns
+        return columns
+
+    def invalidate_schema_cache(self, table: Optional[str] = None):
+        """使表结构缓存失效（table 为空时清空全部）"""
+        if table is None:
+            self._schema_cache = {}
+        else:
+            self._schema_cache.pop(table, None)
 
     # ========== 通用增删改查方法 ==========
 
@@ -365,14 +868,11 @@ class DatabaseManager:
         Returns:
             查询结果列表
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        try:
+        with self._connection() as conn:
+            cursor = conn.cursor()
             cursor.execute(query, params)
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
-        finally:
-            conn.close()
 
     def execute_update(self, query: str, params: tuple = ()) -> int:
         """
@@ -385,18 +885,100 @@ class DatabaseManager:
         Returns:
             影响的行数
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.rowcount
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"执行更新失败: {e}")
-            raise
-        finally:
-            conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                if not self.in_transaction():
+                    conn.commit()
+                return cursor.rowcount
+            except Exception as e:
+                # 处于 transaction() 内时由外层统一回滚
+                if not self.in_transaction():
+                    conn.rollback()
+                logger.error(f"执行更新失败: {e}")
+                raise
+
+    def execute_many(self, query: str, params_seq: Iterable[Sequence[Any]]) -> int:
+        """
+        批量执行同一条更新语句（executemany），整体在一个事务中提交
+
+        Args:
+            query: SQL 更新语句
+            params_seq: 参数序列
+
+        Returns:
+            影响的行数
+        """
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(query, params_seq)
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"批量执行失败: {e}")
+                raise
+
+    # ========== 事务（Unit of Work） ==========
+    def in_transaction(self) -> bool:
+        """当前线程是否处于 transaction() 块内"""
+        return getattr(self._local, "tx_depth", 0) > 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        开启一个写事务：块内所有 execute_update / insert / update / delete 共用同一连接，
+        正常退出时一次性提交，抛出异常时整体回滚。
+
+        嵌套调用（例如 service 方法内部再开事务）会直接加入最外层事务，
+        只有最外层负责提交或回滚。
+
+        用法:
+            with db.transaction():
+                db.insert(...)
+                db.update(...)
+        """
+        local = self._local
+        with self._connection() as conn:
+            depth = getattr(local, "tx_depth", 0)
+            if depth:
+                local.tx_depth = depth + 1
+                try:
+                    yield conn
+                finally:
+                    local.tx_depth = depth
+                return
+
+            # IMMEDIATE：开始即获取写锁，避免事务中途升级写锁时与其它写者死锁
+            conn.execute("BEGIN IMMEDIATE")
+            local.tx_depth = 1
+            local.tx_callbacks = []
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                local.tx_depth = 0
+                callbacks, local.tx_callbacks = local.tx_callbacks, []
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.warning(f"事务结束回调执行失败: {e}")
+
+    def after_transaction(self, callback: Callable[[], None]):
+        """
+        在当前事务结束（提交或回滚）后执行回调；不在事务中时立即执行。
+
+        主要用于 service 层的内存缓存失效：事务未结束前其它线程仍可能读到旧数据。
+        """
+        if self.in_transaction():
+            self._local.tx_callbacks.append(callback)
+        else:
+            callback()
 
     # ========== 面向业务层的通用 CRUD 封装 ==========
     def insert(self, table: str, data: Dict[str, Any]) -> bool:
@@ -408,14 +990,10 @@ class DatabaseManager:
             data: 数据字典
 
         Returns:
-            是否成功
+            是否成功；处于 transaction() 内时失败直接抛出异常，由外层整体回滚
         """
-        # 获取表的列信息
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table})")
-        columns = {row[1] for row in cursor.fetchall()}
-        conn.close()
+        # 获取表的列信息（来自表结构缓存）
+        columns = self._get_table_columns(table)
 
         # 只在表有时间戳字段时才添加
         if 'created_at' in columns and 'created_at' not in data:
@@ -435,8 +1013,88 @@ class DatabaseManager:
             return True
         except Exception as e:
             logger.error(f"插入数据失败 (table={table}): {e}")
+            if self.in_transaction():
+                # 事务内不能吞掉失败，否则外层会把前面的写入当作成功提交
+                raise
             return False
 
+    def _prepare_insert_row(self, columns: frozenset, data: Dict[str, Any], now: str) -> Dict[str, Any]:
+        """补齐时间戳并序列化 JSON 字段"""
+        row = dict(data)
+        if 'created_at' in columns and 'created_at' not in row:
+            row['created_at'] = now
+        if 'updated_at' in columns and 'updated_at' not in row:
+            row['updated_at'] = now
+        return self._serialize_json_fields(row)
+
+    def _group_rows(self, table: str, rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[tuple]]:
+        """按列集合分组，保证同一条 executemany 语句的参数结构一致"""
+        columns = self._get_table_columns(table)
+        now = datetime.now().isoformat()
+        groups: Dict[Tuple[str, ...], List[tuple]] = {}
+        for data in rows:
+            row = self._prepare_insert_row(columns, data, now)
+            groups.setdefault(tuple(row.keys()), []).append(tuple(row.values()))
+        return groups
+
+    def insert_many(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        批量插入数据（executemany，单事务）
+
+        Args:
+            table: 表名
+            rows: 数据字典序列
+
+        Returns:
+            插入的行数；任一行失败会抛出异常并整体回滚
+        """
+        total = 0
+        with self.transaction() as conn:
+            for keys, values in self._group_rows(table, rows).items():
+                placeholders = ', '.join(['?' for _ in keys])
+                query = f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({placeholders})"
+                try:
+                    conn.executemany(query, values)
+                except Exception as e:
+                    logger.error(f"批量插入失败 (table={table}): {e}")
+                    raise
+                total += len(values)
+        return total
+
+    def upsert_many(self, table: str, rows: Iterable[Dict[str, Any]],
+                    conflict_columns: Sequence[str] = ('id',)) -> int:
+        """
+        批量插入或更新（INSERT ... ON CONFLICT DO UPDATE，单事务）
+
+        Args:
+            table: 表名
+            rows: 数据字典序列
+            conflict_columns: 冲突判定列（需有主键或唯一索引）
+
+        Returns:
+            写入的行数；任一行失败会抛出异常并整体回滚
+        """
+        conflict = tuple(conflict_columns)
+        total = 0
+        with self.transaction() as conn:
+            for keys, values in self._group_rows(table, rows).items():
+                placeholders = ', '.join(['?' for _ in keys])
+                # created_at 只在首次插入时写入
+                updates = [k for k in keys if k not in conflict and k != 'created_at']
+                query = f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({placeholders})"
+                if updates:
+                    set_clause = ', '.join(f"{k} = excluded.{k}" for k in updates)
+                    query += f" ON CONFLICT({', '.join(conflict)}) DO UPDATE SET {set_clause}"
+                else:
+                    query += f" ON CONFLICT({', '.join(conflict)}) DO NOTHING"
+                try:
+                    conn.executemany(query, values)
+                except Exception as e:
+                    logger.error(f"批量写入失败 (table={table}): {e}")
+                    raise
+                total += len(values)
+        return total
+
     def update(self, table: str, data: Dict[str, Any], where: str, params: tuple = ()) -> bool:
         """
         更新数据
@@ -448,7 +1106,7 @@ class DatabaseManager:
             params: WHERE 参数
 
         Returns:
-            是否成功
+            是否成功；处于 transaction() 内时失败直接抛出异常
         """
         # 自动更新时间戳
         data['updated_at'] = datetime.now().isoformat()
@@ -464,6 +1122,9 @@ class DatabaseManager:
             return True
         except Exception as e:
             logger.error(f"更新数据失败 (table={table}): {e}")
+            if self.in_transaction():
+                # 事务内不能吞掉失败，否则外层会把前面的写入当作成功提交
+                raise
             return False
 
     def delete(self, table: str, where: str, params: tuple = ()) -> bool:
@@ -476,7 +1137,7 @@ class DatabaseManager:
             params: WHERE 参数
 
         Returns:
-            是否成功
+            是否成功；处于 transaction() 内时失败直接抛出异常
         """
         query = f"DELETE FROM {table} WHERE {where}"
 
@@ -485,6 +1146,9 @@ class DatabaseManager:
             return True
         except Exception as e:
             logger.error(f"删除数据失败 (table={table}): {e}")
+            if self.in_transaction():
+                # 事务内不能吞掉失败，否则外层会把前面的写入当作成功提交
+                raise
             return False
 
     def get_by_id(self, table: str, id_value: str, id_column: str = 'id') -> Optional[Dict[str, Any]]:
@@ -522,11 +1186,7 @@ class DatabaseManager:
         """
         # 自动检测排序字段
         if order_by is None:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f"PRAGMA table_info({table})")
-            columns = {row[1] for row in cursor.fetchall()}
-            conn.close()
+            columns = self._get_table_columns(table)
 
             if 'order_index' in columns:
                 order_by = "order_index ASC"
@@ -585,13 +1245,24 @@ class DatabaseManager:
         """
         try:
             backup_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(self.db_path, backup_path)
+            self._backup_to(backup_path)
             logger.info(f"数据库备份成功: {backup_path}")
             return True
         except Exception as e:
             logger.error(f"数据库备份失败: {e}")
             return False
 
+    def _backup_to(self, target_path: Path):
+        """使用 SQLite 在线备份 API 复制数据库（WAL 中尚未 checkpoint 的内容也会包含在内）"""
+        if target_path.exists():
+            target_path.unlink()
+        dest = sqlite3.connect(str(target_path))
+        try:
+            with self._connection() as conn:
+                conn.backup(dest)
+        finally:
+            dest.close()
+
     def restore(self, backup_path: Path) -> bool:
         """
         从备份恢复数据库
@@ -608,10 +1279,23 @@ class DatabaseManager:
 
             # 先备份当前数据库
             current_backup = self.db_path.parent / f"{self.db_path.stem}_before_restore.db"
-            shutil.copy2(self.db_path, current_backup)
-
-            # 恢复备份
-            shutil.copy2(backup_path, self.db_path)
+            self._backup_to(current_backup)
+
+            # 替换文件期间暂停连接池，并等所有旧连接关闭，避免旧连接继续读写被替换的文件
+            with self._pool_paused():
+                # 残留的 -wal/-shm 属于旧库，必须删除，否则会被当作新库的日志重放
+                for suffix in ("-wal", "-shm"):
+                    stale = self.db_path.with_name(self.db_path.name + suffix)
+                    if stale.exists():
+                        stale.unlink()
+
+                # 恢复备份
+                shutil.copy2(backup_path, self.db_path)
+            with self._connection() as conn:
+                self._apply_journal_mode(conn)
+                # 备份可能来自旧版本，表结构需重新建立/迁移后再缓存
+                self._create_schema(conn)
+                self._load_schema_cache(conn)
             logger.info(f"数据库恢复成功: {backup_path}")
             return True
         except Exception as e:
@@ -629,14 +1313,11 @@ class DatabaseManager:
             是否成功
         """
         try:
-            conn = self._get_connection()
             export_path.parent.mkdir(parents=True, exist_ok=True)
 
-            with open(export_path, 'w', encoding='utf-8') as f:
+            with self._connection() as conn, open(export_path, 'w', encoding='utf-8') as f:
                 for line in conn.iterdump():
                     f.write(f"{line}\n")
-
-            conn.close()
             logger.info(f"数据库导出成功: {export_path}")
             return True
         except Exception as e:
@@ -690,18 +1371,58 @@ class DatabaseManager:
 
         # 使用 UPSERT 避免并发问题
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
+            self.execute_update("""
                 INSERT INTO app_config (key, value, updated_at)
                 VALUES (?, ?, CURRENT_TIMESTAMP)
                 ON CONFLICT(key) DO UPDATE SET
                     value = excluded.value,
                     updated_at = CURRENT_TIMESTAMP
             """, (key, json_value))
-            conn.commit()
-            conn.close()
             return True
         except Exception as e:
             logger.error(f"配置写入失败 (key={key}): {e}")
             return False
+
+
+class VersionedCache:
+    """service 层共用的带版本号读穿缓存。
+
+    key -> (版本号, 数据)；写操作调用 invalidate 递增版本号使其失效。
+    缓存的是共享对象，调用方需要修改时应先复制。
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self._entries: Dict[str, tuple] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """读穿缓存：命中直接返回，未命中则加载并按加载前的版本号写入"""
+        with self._lock:
+            version = self._versions.get(key, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+
+        value = loader()
+
+        # 事务内可能读到尚未提交的数据，不写入缓存
+        if not self.db.in_transaction():
+            with self._lock:
+                # 加载期间如有写入，版本号已变化，丢弃本次结果
+                if self._versions.get(key, 0) == version:
+                    self._entries[key] = (version, value)
+        return value
+
+    def invalidate(self, *keys: str):
+        """使指定缓存失效；处于事务中时，事务结束后会再失效一次"""
+        def bump():
+            with self._lock:
+                for key in keys:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                    self._entries.pop(key, None)
+
+        bump()
+        # 事务提交前其它线程仍可能把旧数据写回缓存，提交后再失效一次
+        self.db.after_transaction(bump)
@@ -0,0 +1,535 @@
+"""HTTP 调试请求客户端。
+
+对应 HTTP 工具页与 HTTP 请求集合页的“发送”按钮：前端经 Api.http_request 进入这里，
+由进程内复用连接池的 httpx.Client 发出请求，避免前端 CORS 限制，也避免每次请求都拉起 curl 子进程。
+"""
+
+import base64
+import codecs
+import importlib.util
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http import HTTPStatus
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpcore
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 这些 Content-Type 一律按文本返回（解码失败的字节用替换字符代替）
+TEXT_CONTENT_TYPES = ("text/", "json", "xml", "javascript", "x-www-form-urlencoded", "yaml", "csv")
+
+
+class TimedNetworkBackend(httpcore.NetworkBackend):
+    """在 httpcore 默认同步网络层外包一层：先单独计时 DNS 解析，再按解析出的地址逐个尝试 TCP 连接。
+
+    连接发生在发起请求的线程里，计时结果写入线程局部的 timings 字典，由 HttpClientService 读取。"""
+
+    def __init__(self):
+        self._backend = httpcore.SyncBackend()
+        self._local = threading.local()
+
+    def begin(self, timings: Dict[str, Any]):
+        self._local.timings = timings
+
+    def end(self):
+        self._local.timings = None
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        timings = getattr(self._local, "timings", None)
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(str(e)) from e
+        if timings is not None:
+            timings["dns"] = (time.perf_counter() - start) * 1000
+        last_error: Optional[Exception] = None
+        for *_, sockaddr in infos:
+            try:
+                return self._backend.connect_tcp(sockaddr[0], port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        raise last_error or httpcore.ConnectError(f"无法连接 {host}:{port}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+
+# httpcore 异常 -> httpx 异常（按从具体到宽泛排列，取第一个匹配项）
+_HTTPCORE_EXCEPTIONS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.ProxyError, httpx.ProxyError),
+)
+
+
+@contextmanager
+def _map_httpcore_exceptions() -> Iterator[None]:
+    try:
+        yield
+    except Exception as exc:
+        for source, target in _HTTPCORE_EXCEPTIONS:
+            if isinstance(exc, source):
+                raise target(str(exc)) from exc
+        raise
+
+
+class _PoolResponseStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self) -> Iterator[bytes]:
+        with _map_httpcore_exceptions():
+            for part in self._stream:
+                yield part
+
+    def close(self):
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class TimedTransport(httpx.BaseTransport):
+    """直接持有 httpcore.ConnectionPool 的传输层，连接池使用 TimedNetworkBackend 建立 TCP 连接。
+
+    httpx.HTTPTransport 不接受自定义网络层，这里按它的公开接口重新组装：
+    httpx.Request -> httpcore.Request，响应流与异常再转换回 httpx 的类型。"""
+
+    def __init__(self, network_backend: httpcore.NetworkBackend, verify: bool = True, http2: bool = False,
+                 limits: httpx.Limits = httpx.Limits()):
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=network_backend,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_httpcore_exceptions():
+            response = self._pool.handle_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_PoolResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    def close(self):
+        self._pool.close()
+
+
+class HttpClientService:
+    """持有按 (verify_ssl, http2) 区分的长连接 httpx.Client。
+
+    httpx 内部按 origin（scheme + host + port）维护连接池，
+    对同一主机的重复调试请求会复用 keep-alive 连接，省去 TCP/TLS 握手。"""
+    MAX_CONNECTIONS = 100
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    KEEPALIVE_EXPIRY = 30.0
+    # 请求体只在这些方法上发送（与原 curl 实现保持一致）
+    BODY_METHODS = ("POST", "PUT", "PATCH")
+    # 响应体超过该字节数时边下载边写入临时文件，桥接层只返回预览和句柄
+    STREAM_THRESHOLD = 1024 * 1024
+    PREVIEW_BYTES = 64 * 1024
+    MAX_RANGE_BYTES = 1024 * 1024
+    # 临时文件句柄的保留数量与时长，超出后删除最旧的文件
+    MAX_SPOOLED_BODIES = 20
+    SPOOLED_BODY_TTL_SECONDS = 1800
+
+    def __init__(self):
+        self._clients: Dict[Tuple[bool, bool], httpx.Client] = {}
+        self._lock = threading.Lock()
+        self._network = TimedNetworkBackend()
+        self._spooled: Dict[str, Dict[str, Any]] = {}
+        self._spool_dir: Optional[str] = None
+        # HTTP/2 依赖可选的 h2 包，未安装时自动退回 HTTP/1.1
+        self.http2_available = importlib.util.find_spec("h2") is not None
+
+    def _get_client(self, verify_ssl: bool, http2: bool) -> httpx.Client:
+        key = (bool(verify_ssl), bool(http2 and self.http2_available))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = TimedTransport(
+                    self._network,
+                    verify=key[0],
+                    http2=key[1],
+                    limits=httpx.Limits(
+                        max_connections=self.MAX_CONNECTIONS,
+                        max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                    ),
+                )
+                client = httpx.Client(transport=transport, follow_redirects=False)
+                self._clients[key] = client
+            return client
+
+    def close(self):
+        """关闭所有连接池并删除临时响应体文件"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            handles = list(self._spooled)
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 连接池失败: {e}")
+        for handle in handles:
+            self.release_body(handle)
+
+    # ========== 发送请求 ==========
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, body: Optional[str] = None,
+                timeout: float = 30, verify_ssl: bool = True, http2: bool = False,
+                stream_threshold: Optional[int] = None) -> Dict:
+        """
+        发送一次 HTTP 请求。
+
+        响应体超过 stream_threshold（默认 STREAM_THRESHOLD，传 0 表示总是内联返回）时写入临时文件，
+        返回的 body 只是前 PREVIEW_BYTES 字节的预览，streamed 为 True，
+        其余内容用 bodyHandle 调 read_body 分段读取，用完后 release_body。
+
+        Returns:
+            dict: {success, status, statusText, headers, body, duration, size, bodyEncoding, httpVersion,
+            contentType, streamed, bodyHandle?, timings: {dns, connect, tls, ttfb, download, total, reused},
+            bytes: {sent, received}}；失败时为 {success: False, error, error_type}
+        """
+        threshold = self.STREAM_THRESHOLD if stream_threshold is None else int(stream_threshold)
+        method = (method or "GET").upper()
+        content = None
+        if body and method in self.BODY_METHODS:
+            content = body.encode("utf-8") if isinstance(body, str) else body
+
+        timings: Dict[str, Any] = {}
+        marks: Dict[str, float] = {}
+
+        def trace(event_name: str, info: Dict):
+            # 事件名形如 connection.connect_tcp.started / http11.receive_response_headers.complete
+            marks[event_name.split(".", 1)[-1]] = time.perf_counter()
+
+        try:
+            client = self._get_client(verify_ssl, http2)
+            self._network.begin(timings)
+            start_time = time.perf_counter()
+            try:
+                with client.stream(
+                    method, url,
+                    headers={str(k): str(v) for k, v in (headers or {}).items()},
+                    content=content,
+                    timeout=httpx.Timeout(timeout),
+                    extensions={"trace": trace},
+                ) as resp:
+                    data, spooled = self._read_body(resp, threshold)
+            finally:
+                self._network.end()
+            end_time = time.perf_counter()
+            duration = int((end_time - start_time) * 1000)
+        except httpx.TimeoutException:
+            return {"success": False, "error": "请求超时", "error_type": "TimeoutError"}
+        except httpx.ConnectError as e:
+            error_msg = str(e) or type(e).__name__
+            if "SSL" in error_msg.upper() or "certificate" in error_msg.lower():
+                return {
+                    "success": False,
+                    "error": f"SSL 错误: {error_msg}\n💡 提示：可以尝试取消勾选「验证 SSL 证书」选项",
+                    "error_type": "SSLError"
+                }
+            return {"success": False, "error": error_msg, "error_type": "ConnectError"}
+        except Exception as e:
+            logger.error(f"HTTP Request Exception: {type(e).__name__}: {str(e)}")
+            return {"success": False, "error": str(e), "error_type": type(e).__name__}
+
+        content_type = resp.headers.get("content-type", "")
+        charset = resp.charset_encoding or "utf-8"
+        result = {
+            "success": True,
+            "status": resp.status_code,
+            "statusText": resp.reason_phrase or self._status_text(resp.status_code),
+            "headers": self._flatten_headers(resp),
+            "contentType": content_type,
+            "streamed": spooled is not None,
+            "duration": duration,
+            "httpVersion": resp.http_version,
+            "timings": self._build_timings(marks, timings, start_time, end_time),
+            "bytes": {
+                "sent": len(content or b""),
+                "received": resp.num_bytes_downloaded,
+            },
+        }
+        if spooled is None:
+            text, encoding = self._decode_body(data, content_type, charset)
+            result.update({"body": text, "bodyEncoding": encoding, "size": len(data)})
+            return result
+
+        # 预览截在完整字符边界，编码方式以预览能否按字符集解码为准
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            charset = "utf-8"
+        encoding = "text" if self._is_text(data, content_type, charset) else "base64"
+        # 预览末尾被舍弃的不完整字符 / base64 余数留给后续分段读取，previewBytes 必须是实际消费的字节数
+        preview, consumed = self._decode_range(data, encoding, charset, final=False)
+        handle = self._register_spooled(spooled, content_type, charset, encoding)
+        result.update({
+            "body": preview,
+            "bodyEncoding": encoding,
+            "size": spooled["size"],
+            "bodyHandle": handle,
+            "previewBytes": consumed,
+        })
+        return result
+
+    # ========== 大响应体落盘与分段读取 ==========
+    def _read_body(self, resp: httpx.Response, threshold: int) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+        """读取响应体：未超过阈值时整体返回字节；超过后转写临时文件，只在内存保留预览
+
+        Returns:
+            (data, spooled)：内联时 spooled 为 None；落盘时 data 为预览字节，spooled 为 {path, size}
+        """
+        buffer = bytearray()
+        spool = None
+        size = 0
+        try:
+            for chunk in resp.iter_bytes():
+                size += len(chunk)
+                if spool is not None:
+                    spool.write(chunk)
+                    continue
+                buffer += chunk
+                if threshold and len(buffer) > threshold:
+                    spool = tempfile.NamedTemporaryFile(dir=self._get_spool_dir(), suffix=".body", delete=False)
+                    spool.write(buffer)
+                    del buffer[self.PREVIEW_BYTES:]
+        except BaseException:
+            if spool is not None:
+                spool.close()
+                os.unlink(spool.name)
+            raise
+        if spool is None:
+            return bytes(buffer), None
+        spool.close()
+        return bytes(buffer), {"path": spool.name, "size": size}
+
+    def _get_spool_dir(self) -> str:
+        with self._lock:
+            if self._spool_dir is None:
+                self._spool_dir = tempfile.mkdtemp(prefix="doggy-http-")
+            return self._spool_dir
+
+    def _register_spooled(self, spooled: Dict[str, Any], content_type: str, charset: str, encoding: str) -> str:
+        handle = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            self._spooled[handle] = {
+                **spooled,
+                "content_type": content_type,
+                "charset": charset,
+                "encoding": encoding,
+                "created": now,
+            }
+            expired = [
+                h for h, info in self._spooled.items()
+                if now - info["created"] > self.SPOOLED_BODY_TTL_SECONDS
+            ]
+            overflow = len(self._spooled) - len(expired) - self.MAX_SPOOLED_BODIES
+            if overflow > 0:
+                # 字典按插入顺序排列，最前面的就是最旧的
+                expired += [h for h in self._spooled if h not in expired][:overflow]
+        for h in expired:
+            self.release_body(h)
+        return handle
+
+    def read_body(self, handle: str, offset: int = 0, length: Optional[int] = None) -> Dict:
+        """
+        分段读取落盘的响应体。
+
+        offset/length 以字节计；文本内容会在字符边界处收尾，实际读取的字节数见返回的 length，
+        下一段从 offset + length 继续。
+
+        Returns:
+            dict: {success, data, encoding, offset, length, size, eof}
+        """
+        with self._lock:
+            info = self._spooled.get(handle)
+        if info is None:
+            return {"success": False, "error": "响应体已过期或不存在"}
+        offset = max(0, int(offset or 0))
+        length = max(1, min(int(length or self.MAX_RANGE_BYTES), self.MAX_RANGE_BYTES))
+        try:
+            with open(info["path"], "rb") as f:
+                f.seek(offset)
+                raw = f.read(length)
+        except OSError as e:
+            return {"success": False, "error": str(e)}
+        eof = offset + len(raw) >= info["size"]
+        data, consumed = self._decode_range(raw, info["encoding"], info["charset"], final=eof)
+        return {
+            "success": True,
+            "data": data,
+            "encoding": info["encoding"],
+            "offset": offset,
+            "length": consumed,
+            "size": info["size"],
+            "eof": offset + consumed >= info["size"],
+        }
+
+    def release_body(self, handle: str) -> Dict:
+        """删除落盘的响应体"""
+        with self._lock:
+            info = self._spooled.pop(handle, None)
+        if info is None:
+            return {"success": False, "error": "响应体已过期或不存在"}
+        try:
+            os.unlink(info["path"])
+        except OSError as e:
+            logger.warning(f"删除临时响应体失败: {e}")
+        return {"success": True}
+
+    @staticmethod
+    def _decode_range(raw: bytes, encoding: str, charset: str, final: bool) -> Tuple[str, int]:
+        """解码一段字节，返回 (内容, 实际消费的字节数)
+
+        文本按字符集解码，非末段时舍弃末尾不完整的多字节字符；base64 段截到 3 字节的整数倍，
+        保证各段 base64 可以独立解码后直接拼接。
+        """
+        if encoding == "base64":
+            if not final:
+                raw = raw[:len(raw) - len(raw) % 3] or raw
+            return base64.b64encode(raw).decode("ascii"), len(raw)
+        if final:
+            return raw.decode(charset, errors="replace"), len(raw)
+        # 多字节字符最多被截断 3 个字节，逐个回退尝试
+        for cut in range(0, min(4, len(raw))):
+            end = len(raw) - cut
+            try:
+                return raw[:end].decode(charset), end
+            except UnicodeDecodeError:
+                continue
+        return raw.decode(charset, errors="replace"), len(raw)
+
+    # ========== 响应处理 ==========
+    @staticmethod
+    def _build_timings(marks: Dict[str, float], timings: Dict[str, Any],
+                       start_time: float, end_time: float) -> Dict[str, Optional[float]]:
+        """把 httpcore trace 事件时间点换算为各阶段耗时（毫秒）
+
+        复用 keep-alive 连接时没有 DNS/连接/TLS 阶段，对应值为 None，reused 为 True。
+        ttfb 从开始发送请求头算到收到完整响应头，download 为读取响应体的耗时。
+        """
+        def span(name: str) -> Optional[float]:
+            started = marks.get(f"{name}.started")
+            completed = marks.get(f"{name}.complete")
+            if started is None or completed is None:
+                return None
+            return round((completed - started) * 1000, 2)
+
+        def first(*names: str) -> Optional[float]:
+            for name in names:
+                if name in marks:
+                    return marks[name]
+            return None
+
+        connect_total = span("connect_tcp")
+        dns = timings.get("dns")
+        connect = None if connect_total is None else round(max(connect_total - (dns or 0), 0), 2)
+        request_start = first("send_request_headers.started", "send_connection_init.started")
+        headers_done = first("receive_response_headers.complete")
+        body_start = first("receive_response_body.started")
+        body_done = first("receive_response_body.complete", "response_closed.started")
+        return {
+            "dns": None if dns is None else round(dns, 2),
+            "connect": connect,
+            "tls": span("start_tls"),
+            "ttfb": None if request_start is None or headers_done is None
+            else round((headers_done - request_start) * 1000, 2),
+            "download": None if body_start is None or body_done is None
+            else round((body_done - body_start) * 1000, 2),
+            "total": round((end_time - start_time) * 1000, 2),
+            "reused": connect_total is None,
+        }
+
+    @staticmethod
+    def _status_text(status: int) -> str:
+        try:
+            return HTTPStatus(status).phrase
+        except ValueError:
+            return "Unknown"
+
+    @staticmethod
+    def _flatten_headers(resp: httpx.Response) -> Dict[str, str]:
+        """保留服务端原始大小写；同名响应头按出现顺序用 ", " 合并"""
+        result: Dict[str, str] = {}
+        for raw_key, raw_value in resp.headers.raw:
+            key = raw_key.decode("latin-1")
+            value = raw_value.decode("latin-1")
+            result[key] = f"{result[key]}, {value}" if key in result else value
+        return result
+
+    @staticmethod
+    def _is_text(data: bytes, content_type: str, charset: str) -> bool:
+        """按声明的 Content-Type 与能否按字符集解码判断响应体是否为文本"""
+        content_type = content_type.lower()
+        if any(marker in content_type for marker in TEXT_CONTENT_TYPES):
+            return True
+        try:
+            # 预览可能截断在多字节字符中间，容忍末尾 3 个字节
+            data.decode(charset)
+            return True
+        except UnicodeDecodeError as e:
+            return e.start >= len(data) - 3
+        except LookupError:
+            return False
+
+    @staticmethod
+    def _decode_body(data: bytes, content_type: str, charset: str) -> Tuple[str, str]:
+        """按字节解码响应体：文本按声明的字符集（默认 UTF-8）解码，二进制内容以 base64 返回
+
+        Returns:
+            (body, bodyEncoding)，bodyEncoding 为 "text" 或 "base64"
+        """
+        if not data:
+            return "", "text"
+        content_type = content_type.lower()
+        try:
+            return data.decode(charset), "text"
+        except (UnicodeDecodeError, LookupError):
+            pass
+        if any(marker in content_type for marker in TEXT_CONTENT_TYPES):
+            return data.decode("utf-8", errors="replace"), "text"
+        return base64.b64encode(data).decode("ascii"), "base64"
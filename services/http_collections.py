@@ -5,17 +5,33 @@
 """
 
 import json
+import re
+import threading
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 import logging
 
-from services.db_manager import DatabaseManager
+from services.db_manager import DatabaseManager, VersionedCache
+from services.http_export import StreamWriter
 
 logger = logging.getLogger(__name__)
 
+# 环境变量占位符 {{name}}：变量名可以是除花括号外的任意字符（api-key、base.url 等），
+# 与前端 replaceVariablesInText 使用同一字符类，编辑器预览与实际发送的结果一致
+VARIABLE_PATTERN = re.compile(r'\{\{([^{}]+)\}\}')
+# 变量值中嵌套引用其它变量时的最大展开深度
+MAX_VARIABLE_DEPTH = 10
+
+# 导出时脱敏的请求头
+SENSITIVE_HEADERS = {'authorization', 'x-api-key', 'api-key', 'token', 'x-token', 'bearer', 'cookie',
+                     'set-cookie', 'proxy-authorization', 'x-auth-token'}
+POSTMAN_SCHEMA_URL = "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+# 流式导出时每批从数据库读取的请求数
+EXPORT_BATCH_SIZE = 500
+
 
 # ========== 集合/文件夹/请求/环境的数据结构 ==========
 
@@ -99,27 +115,49 @@ class HttpCollectionsService:
             self.db = DatabaseManager(self.db_path)
             logger.info("HttpCollectionsService 使用独立数据库")
 
+        # 读穿缓存（集合树、环境快照等），写操作后按 key 失效
+        self._cache = VersionedCache(self.db)
 
     # ========== 集合树构建与读取 ==========
-    def _build_tree_from_db(self) -> List[Dict]:
-        """从数据库构建集合树形结构"""
-        all_items = self.db.get_all("http_collections", order_by="order_index ASC")
-
-        # 构建 id -> item 映射
-        item_map = {item['id']: item for item in all_items}
+    @staticmethod
+    def _index_children(items: List[Dict]) -> Dict[Optional[str], List[Dict]]:
+        """parent_id -> 子项列表（items 需已按 order_index 排序，索引内顺序即展示顺序）"""
+        children_by_parent: Dict[Optional[str], List[Dict]] = {}
+        for item in items:
+            children_by_parent.setdefault(item['parent_id'], []).append(item)
+        return children_by_parent
 
-        # 构建树形结构
-        root_collections = []
-        for item in all_items:
-            if item['parent_id'] is None:
-                # 根节点（集合或顶级文件夹/请求）
-                collection = self._build_collection_node(item, item_map)
-                root_collections.append(collection)
-
-        return root_collections
+    def _build_tree_from_db(self) -> List[Dict]:
+        """从数据库构建集合树形结构
 
-    def _build_collection_node(self, item: Dict, item_map: Dict) -> Dict:
-        """递归构建集合节点"""
+        先按 parent_id 建一次子节点索引，再自顶向下组装，整体 O(n)。
+        """
+        all_items = self.db.get_all("http_collections", order_by="order_index ASC")
+        children_by_parent = self._index_children(all_items)
+
+        # 根节点（集合或顶级文件夹/请求）
+        return [
+            self._build_collection_node(item, children_by_parent)
+            for item in children_by_parent.get(None, [])
+        ]
+
+    def _build_skeleton_from_db(self) -> List[Dict]:
+        """只含集合/文件夹结构与请求名称、方法的轻量树（不读取请求的 data 大字段）"""
+        all_items = self.db.execute_query("""
+            SELECT id, name, description, parent_id, type,
+                   CASE WHEN type = 'request' THEN json_extract(data, '$.method') END AS method
+            FROM http_collections
+            ORDER BY order_index ASC
+        """)
+        children_by_parent = self._index_children(all_items)
+        return [
+            self._build_collection_node(item, children_by_parent, skeleton=True)
+            for item in children_by_parent.get(None, [])
+        ]
+
+    def _build_collection_node(self, item: Dict, children_by_parent: Dict[Optional[str], List[Dict]],
+                               skeleton: bool = False, level: int = 0) -> Dict:
+        """递归构建集合节点；skeleton=True 时请求节点只保留名称和方法，文件夹附带层级"""
         node = {
             'id': item['id'],
             'name': item['name'],
@@ -128,39 +166,77 @@ class HttpCollectionsService:
         }
 
         if item['type'] == 'request':
-            # 请求节点，包含完整数据
-            node.update(item.get('data', {}))
+            if skeleton:
+                node.pop('description')
+                node['method'] = item.get('method') or 'GET'
+            else:
+                # 请求节点，包含完整数据
+                node.update(item.get('data') or {})
         else:
             # 文件夹节点，递归构建子节点
             node['folders'] = []
             node['requests'] = []
-
-            # 收集所有子节点并按 order_index 排序
-            children = []
-            for child_id, child_item in item_map.items():
-                if child_item.get('parent_id') == item['id']:
-                    children.append(child_item)
-
-            # 按 order_index 排序
-            children.sort(key=lambda x: x.get('order_index', 0))
+            if skeleton and level:
+                node['level'] = level
 
             # 分类添加到 folders 或 requests
-            for child_item in children:
+            for child_item in children_by_parent.get(item['id'], []):
                 if child_item['type'] == 'folder':
-                    node['folders'].append(self._build_collection_node(child_item, item_map))
+                    node['folders'].append(
+                        self._build_collection_node(child_item, children_by_parent, skeleton, level + 1))
                 elif child_item['type'] == 'request':
-                    node['requests'].append(self._build_collection_node(child_item, item_map))
+                    node['requests'].append(
+                        self._build_collection_node(child_item, children_by_parent, skeleton, level + 1))
 
         return node
 
     def get_collections(self) -> List[Dict]:
-        """获取所有集合"""
+        """获取所有集合
+
+        返回缓存中的共享集合树（增删改后失效重建），不做拷贝：桥接层会把它序列化为 JSON，
+        而逐次深拷贝一棵上万节点的树比从数据库重建还慢。调用方只能读取，需要修改时自行复制。
+        """
         try:
-            return self._build_tree_from_db()
+            return self._cache.get("tree", self._build_tree_from_db)
         except Exception as e:
             logger.error(f"从数据库获取集合失败: {e}")
             return []
 
+    def get_collections_skeleton(self) -> List[Dict]:
+        """获取集合骨架：文件夹结构 + 请求的 id/名称/方法，详情用 get_request / get_subtree 按需加载
+
+        与 get_collections 一样返回缓存中的共享对象，调用方只能读取。
+        """
+        try:
+            return self._cache.get("skeleton", self._build_skeleton_from_db)
+        except Exception as e:
+            logger.error(f"从数据库获取集合骨架失败: {e}")
+            return []
+
+    def get_request(self, request_id: str) -> Optional[Dict]:
+        """获取单个请求的完整数据（与集合树中的请求节点结构一致）"""
+        item = self.db.get_by_id("http_collections", request_id)
+        if not item or item.get('type') != 'request':
+            return None
+        return self._build_collection_node(item, {})
+
+    def get_subtree(self, item_id: str) -> Optional[Dict]:
+        """获取某个集合/文件夹及其全部子孙的完整数据"""
+        items = self.db.execute_query("""
+            WITH RECURSIVE subtree(id) AS (
+                SELECT id FROM http_collections WHERE id = ?
+                UNION ALL
+                SELECT c.id FROM http_collections c JOIN subtree s ON c.parent_id = s.id
+            )
+            SELECT h.* FROM http_collections h JOIN subtree USING (id)
+            ORDER BY h.order_index ASC
+        """, (item_id,))
+        items = [self.db._deserialize_json_fields(i) for i in items]
+        root = next((i for i in items if i['id'] == item_id), None)
+        if root is None:
+            return None
+        return self._build_collection_node(root, self._index_children(items))
+
     # ========== 集合 / 文件夹 / 请求 CRUD ==========
     def add_collection(self, name: str, description: str = "") -> Dict:
         """新建集合"""
@@ -187,6 +263,7 @@ class HttpCollectionsService:
                 "data": None,
                 "order_index": max_order + 1
             })
+            self._cache.invalidate("tree", "skeleton")
             return new_collection
         except Exception as e:
             logger.error(f"新建集合失败: {e}")
@@ -195,24 +272,25 @@ class HttpCollectionsService:
     def delete_collection(self, collection_id: str):
         """删除集合"""
         try:
-            # 递归删除所有子项
+            # 一条递归 CTE 语句删除集合及其所有子项
             self._delete_collection_recursive(collection_id)
+            self._cache.invalidate("tree", "skeleton")
             return
         except Exception as e:
             logger.error(f"删除集合失败: {e}")
             raise
 
-    def _delete_collection_recursive(self, parent_id: str):
-        """递归删除集合及其所有子项"""
-        # 查找所有子项
-        children = self.db.get_all("http_collections", where="parent_id = ?", params=(parent_id,))
-
-        # 递归删除子项
-        for child in children:
-            self._delete_collection_recursive(child['id'])
-
-        # 删除当前项
-        self.db.delete("http_collections", where="id = ?", params=(parent_id,))
+    def _delete_collection_recursive(self, parent_id: str) -> int:
+        """用递归 CTE 在单个事务中删除节点及其全部子孙，返回删除的行数"""
+        with self.db.transaction():
+            return self.db.execute_update("""
+                WITH RECURSIVE subtree(id) AS (
+                    SELECT id FROM http_collections WHERE id = ?
+                    UNION ALL
+                    SELECT c.id FROM http_collections c JOIN subtree s ON c.parent_id = s.id
+                )
+                DELETE FROM http_collections WHERE id IN (SELECT id FROM subtree)
+            """, (parent_id,))
 
     def add_folder(self, collection_id: str, name: str, parent_path: List[str] = None, level: int = 1) -> Dict:
         """新建文件夹（最多3级）"""
@@ -244,6 +322,7 @@ class HttpCollectionsService:
                 "data": None,
                 "order_index": max_order + 1
             })
+            self._cache.invalidate("tree", "skeleton")
             return new_folder
         except Exception as e:
             logger.error(f"新建文件夹失败: {e}")
@@ -263,9 +342,10 @@ class HttpCollectionsService:
                 return None
         return current
 
-    def add_request(self, collection_id: str, request_data: Dict, folder_path: List[str] = None) -> Dict:
-        """新建请求"""
-        new_request = {
+    @staticmethod
+    def _new_request(request_data: Dict) -> Dict:
+        """补齐默认字段并分配 id，得到存入 data 列的请求结构"""
+        return {
             "id": str(uuid.uuid4()),
             "name": request_data.get("name", "新请求"),
             "method": request_data.get("method", "GET"),
@@ -278,6 +358,10 @@ class HttpCollectionsService:
             "tags": request_data.get("tags", [])
         }
 
+    def add_request(self, collection_id: str, request_data: Dict, folder_path: List[str] = None) -> Dict:
+        """新建请求"""
+        new_request = self._new_request(request_data)
+
         try:
             # 确定父ID
             parent_id = collection_id if not folder_path else folder_path[-1]
@@ -295,6 +379,7 @@ class HttpCollectionsService:
                 "data": new_request,
                 "order_index": max_order + 1
             })
+            self._cache.invalidate("tree", "skeleton")
             return new_request
         except Exception as e:
             logger.error(f"新建请求失败: {e}")
@@ -318,6 +403,7 @@ class HttpCollectionsService:
                 "description": request_data.get("description", existing.get('description', '')),
                 "data": updated_data
             }, where="id = ?", params=(request_id,))
+            self._cache.invalidate("tree", "skeleton")
 
             return updated_data
         except Exception as e:
@@ -328,16 +414,64 @@ class HttpCollectionsService:
         """删除请求"""
         try:
             self.db.delete("http_collections", where="id = ?", params=(request_id,))
+            self._cache.invalidate("tree", "skeleton")
             return
         except Exception as e:
             logger.error(f"删除请求失败: {e}")
             raise
 
     # ========== 第三方集合导入 ==========
+    # 导入时先在内存中生成整棵树的全部行（顺序号按父级预先编好），
+    # 再用一次 executemany 在单个事务中写入，不再逐条查询兄弟节点和逐条提交。
+    @staticmethod
+    def _folder_row(name: str, parent_id: Optional[str], order_index: int) -> Dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "description": "",
+            "parent_id": parent_id,
+            "type": "folder",
+            "data": None,
+            "order_index": order_index
+        }
+
+    def _request_row(self, request_data: Dict, parent_id: str, order_index: int) -> Dict:
+        request = self._new_request(request_data)
+        return {
+            "id": request["id"],
+            "name": request["name"],
+            "description": request.get("description", ""),
+            "parent_id": parent_id,
+            "type": "request",
+            "data": request,
+            "order_index": order_index
+        }
+
+    def _write_imported_collection(self, name: str, build_rows: Callable[[str], List[Dict]]) -> Dict:
+        """新建集合并批量写入 build_rows(collection_id) 生成的子项行，整体在一个事务中完成"""
+        new_collection = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "description": "",
+            "folders": [],
+            "requests": [],
+            "environments": []
+        }
+        rows = build_rows(new_collection["id"])
+        with self.db.transaction():
+            max_order = self.db.execute_query(
+                "SELECT COALESCE(MAX(order_index), -1) AS max_order FROM http_collections WHERE parent_id IS NULL"
+            )[0]["max_order"]
+            collection_row = self._folder_row(name, None, max_order + 1)
+            collection_row["id"] = new_collection["id"]
+            self.db.insert_many("http_collections", [collection_row] + rows)
+            self._cache.invalidate("tree", "skeleton")
+        logger.info(f"导入集合 {name}: {len(rows)} 个子项")
+        return new_collection
+
     def import_postman(self, postman_data: Dict) -> Dict:
         """导入 Postman 集合"""
         collection_name = postman_data.get("info", {}).get("name", "导入的集合")
-        new_collection = self.add_collection(collection_name)
 
         def convert_item(item, level=1):
             """转换 Postman item"""
@@ -394,109 +528,51 @@ class HttpCollectionsService:
                 }
             return None
 
-        def process_converted_items(items, parent_folders_list):
-            """递归处理转换后的项目"""
-            folders = []
-            requests = []
-
-            for item in items:
-                if not item:
-                    continue
-
-                if "items" in item:
-                    # 这是文件夹
-                    folder_data = {
-                        "id": str(uuid.uuid4()),
-                        "name": item["name"],
-                        "level": item["level"],
-                        "folders": [],
-                        "requests": []
-                    }
-
-                    # 递归处理子项
-                    sub_folders, sub_requests = process_converted_items(item["items"], parent_folders_list + [folder_data["id"]])
-                    folder_data["folders"] = sub_folders
-                    folder_data["requests"] = sub_requests
-
-                    folders.append(folder_data)
-                elif "method" in item:
-                    # 这是请求
-                    requests.append({
-                        "id": str(uuid.uuid4()),
-                        **item
-                    })
-
-            return folders, requests
-
-        # 转换所有 items
-        converted_items = [convert_item(item) for item in postman_data.get("item", [])]
-        converted_items = [item for item in converted_items if item]
-
-        # 处理转换后的项目
-        folders, requests = process_converted_items(converted_items, [])
-
-        # 递归插入文件夹和请求到数据库
-        def insert_items_to_db(folders_list, requests_list, parent_id):
-            """递归插入文件夹和请求到数据库"""
-            # 获取当前父级下已有项目的最大 order_index
-            existing = self.db.get_all("http_collections", where="parent_id = ?", params=(parent_id,))
-            max_order = max([item.get('order_index', 0) for item in existing], default=-1)
-            current_order = max_order + 1
-
-            # 插入文件夹
-            for folder in folders_list:
-                folder_id = folder["id"]
-                self.db.insert("http_collections", {
-                    "id": folder_id,
-                    "name": folder["name"],
-                    "description": "",
-                    "parent_id": parent_id,
-                    "type": "folder",
-                    "data": None,
-                    "order_index": current_order
-                })
-                current_order += 1
-
-                # 递归插入子文件夹和请求
-                insert_items_to_db(folder.get("folders", []), folder.get("requests", []), folder_id)
-
-            # 插入请求
-            for request in requests_list:
-                request_id = request["id"]
-                self.db.insert("http_collections", {
-                    "id": request_id,
-                    "name": request.get("name", ""),
-                    "description": request.get("description", ""),
-                    "parent_id": parent_id,
-                    "type": "request",
-                    "data": request,
-                    "order_index": current_order
-                })
-                current_order += 1
-
-        # 插入所有文件夹和请求到集合下
+        def append_rows(items, parent_id, rows):
+            """同一父级下文件夹排在请求之前，顺序号从 0 连续递增"""
+            items = [item for item in items if item]
+            folders = [item for item in items if "items" in item]
+            requests = [item for item in items if "items" not in item and "method" in item]
+            order = 0
+            for folder in folders:
+                folder_row = self._folder_row(folder["name"], parent_id, order)
+                rows.append(folder_row)
+                order += 1
+                append_rows(folder["items"], folder_row["id"], rows)
+            for request in requests:
+                rows.append(self._request_row(request, parent_id, order))
+                order += 1
+
+        def build_rows(collection_id):
+            rows: List[Dict] = []
+            append_rows([convert_item(item) for item in postman_data.get("item", [])], collection_id, rows)
+            return rows
+
+        # 集合与全部子项在同一事务中写入，失败时不会留下半个集合
         try:
-            insert_items_to_db(folders, requests, new_collection["id"])
+            return self._write_imported_collection(collection_name, build_rows)
         except Exception as e:
             logger.error(f"导入 Postman 集合失败: {e}")
             raise
 
-        return new_collection
-
     def import_apifox(self, apifox_data: Dict) -> Dict:
         """导入 Apifox 集合"""
         collection_name = apifox_data.get("info", {}).get("name", "导入的集合")
-        new_collection = self.add_collection(collection_name)
 
-        # 处理 apiCollection
-        for api_folder in apifox_data.get("apiCollection", []):
-            self._process_apifox_folder(new_collection["id"], api_folder, [])
+        def build_rows(collection_id):
+            # 各文件夹中的请求依次平铺到集合根下
+            requests = [
+                request_data
+                for api_folder in apifox_data.get("apiCollection", [])
+                for request_data in self._convert_apifox_folder(api_folder)
+            ]
+            return [self._request_row(data, collection_id, order) for order, data in enumerate(requests)]
 
-        return new_collection
+        return self._write_imported_collection(collection_name, build_rows)
 
-    def _process_apifox_folder(self, collection_id: str, folder_data: Dict, parent_path: List[str]):
-        """递归处理 Apifox 文件夹"""
-        # 处理当前文件夹中的请求
+    def _convert_apifox_folder(self, folder_data: Dict) -> List[Dict]:
+        """把 Apifox 文件夹中的接口转换为请求数据"""
+        requests = []
         for item in folder_data.get("items", []):
             if "api" in item:
                 api = item["api"]
@@ -535,58 +611,198 @@ class HttpCollectionsService:
                                 "content": examples[0].get("value", "")
                             }
 
-                self.add_request(collection_id, request_data, parent_path)
+                requests.append(request_data)
+        return requests
 
     def import_openapi(self, openapi_data: Dict) -> Dict:
         """导入 OpenAPI 文档"""
         collection_name = openapi_data.get("info", {}).get("title", "导入的集合")
-        new_collection = self.add_collection(collection_name)
-
-        # 处理 paths
-        for path, methods in openapi_data.get("paths", {}).items():
-            for method, operation in methods.items():
-                if method.lower() in ["get", "post", "put", "delete", "patch", "head", "options"]:
-                    request_data = {
-                        "name": operation.get("summary", path),
-                        "method": method.upper(),
-                        "url": path,
-                        "headers": [],
-                        "params": [],
-                        "body": {"type": "none", "content": ""},
-                        "auth": {"type": "none"},
-                        "description": operation.get("description", ""),
-                        "tags": operation.get("tags", [])
-                    }
 
-                    # 处理 parameters
-                    for param in operation.get("parameters", []):
-                        param_in = param.get("in", "")
-                        if param_in == "path" or param_in == "query":
-                            request_data["params"].append({
-                                "key": param.get("name", ""),
-                                "value": "",
-                                "enabled": True,
-                                "type": param_in
-                            })
-
-                    # 处理 requestBody
-                    if "requestBody" in operation:
-                        content = operation["requestBody"].get("content", {})
-                        if "application/json" in content:
-                            schema = content["application/json"].get("schema", {})
-                            example = content["application/json"].get("example", {})
-                            if example:
-                                request_data["body"] = {
-                                    "type": "json",
-                                    "content": json.dumps(example, ensure_ascii=False, indent=2)
-                                }
-
-                    self.add_request(new_collection["id"], request_data)
+        def convert_operations():
+            for path, methods in openapi_data.get("paths", {}).items():
+                for method, operation in methods.items():
+                    if method.lower() in ["get", "post", "put", "delete", "patch", "head", "options"]:
+                        request_data = {
+                            "name": operation.get("summary", path),
+                            "method": method.upper(),
+                            "url": path,
+                            "headers": [],
+                            "params": [],
+                            "body": {"type": "none", "content": ""},
+                            "auth": {"type": "none"},
+                            "description": operation.get("description", ""),
+                            "tags": operation.get("tags", [])
+                        }
 
-        return new_collection
+                        # 处理 parameters
+                        for param in operation.get("parameters", []):
+                            param_in = param.get("in", "")
+                            if param_in == "path" or param_in == "query":
+                                request_data["params"].append({
+                                    "key": param.get("name", ""),
+                                    "value": "",
+                                    "enabled": True,
+                                    "type": param_in
+                                })
+
+                        # 处理 requestBody
+                        if "requestBody" in operation:
+                            content = operation["requestBody"].get("content", {})
+                            if "application/json" in content:
+                                example = content["application/json"].get("example", {})
+                                if example:
+                                    request_data["body"] = {
+                                        "type": "json",
+                                        "content": json.dumps(example, ensure_ascii=False, indent=2)
+                                    }
+
+                        yield request_data
+
+        def build_rows(collection_id):
+            return [self._request_row(data, collection_id, order)
+                    for order, data in enumerate(convert_operations())]
+
+        return self._write_imported_collection(collection_name, build_rows)
 
     # ==================== 导出功能 ====================
 
+    # ========== 单个请求的格式转换 ==========
+    def _openapi_path(self, url: str) -> Tuple[str, Optional[str]]:
+        """URL -> (OpenAPI 路径, 服务器地址)"""
+        parsed = self._parse_url(url or '')
+        server = f"{parsed['scheme']}://{parsed['host']}" if parsed['host'] else None
+        path = parsed['path'] or '/'
+        # 移除查询参数
+        if '?' in path:
+            path = path.split('?')[0]
+        return path, server
+
+    def _openapi_operation(self, data: Dict, request_id: str, tag: Optional[str] = None) -> Dict:
+        """请求数据 -> OpenAPI operation 对象"""
+        method = data.get('method', 'GET').lower()
+        operation = {
+            "summary": data.get('name', ''),
+            "description": data.get('description', ''),
+            "operationId": f"{method}_{request_id}",
+            "parameters": [],
+            "responses": {
+                "200": {"description": "成功响应"}
+            }
+        }
+
+        if tag:
+            operation["tags"] = [tag]
+
+        # 处理 Query 参数
+        for param in data.get('params', []):
+            if param.get('enabled', True) and param.get('key'):
+                operation["parameters"].append({
+                    "name": param.get('key', ''),
+                    "in": param.get('type', 'query'),
+                    "required": False,
+                    "schema": {"type": "string"},
+                    "example": param.get('value', '')
+                })
+
+        # 处理 Headers（敏感信息脱敏）
+        for header in data.get('headers', []):
+            if header.get('enabled', True) and header.get('key'):
+                header_key = header.get('key', '')
+                header_value = header.get('value', '')
+                if header_key.lower().strip() in SENSITIVE_HEADERS:
+                    header_value = '***REDACTED***'
+                operation["parameters"].append({
+                    "name": header_key,
+                    "in": "header",
+                    "required": False,
+                    "schema": {"type": "string"},
+                    "example": header_value
+                })
+
+        # 处理 Body
+        body = data.get('body', {})
+        if body.get('type') not in ['none', None, '']:
+            content_type = "application/json"
+            if body.get('type') == 'form':
+                content_type = "application/x-www-form-urlencoded"
+            elif body.get('type') == 'raw':
+                content_type = "text/plain"
+
+            example_content = body.get('content', '')
+            try:
+                example_content = json.loads(example_content)
+            except (json.JSONDecodeError, TypeError):
+                pass
+
+            operation["requestBody"] = {
+                "content": {
+                    content_type: {
+                        "schema": {"type": "object"},
+                        "example": example_content
+                    }
+                }
+            }
+        return operation
+
+    def _postman_item(self, data: Dict) -> Dict:
+        """请求数据 -> Postman item 对象"""
+        url = data.get('url', '')
+        parsed = self._parse_url(url)
+
+        url_obj = {
+            "raw": url,
+            "protocol": parsed['scheme'],
+            "host": parsed['host'].split('.') if parsed['host'] else [],
+            "path": [p for p in parsed['path'].split('/') if p]
+        }
+
+        # 添加查询参数
+        if data.get('params'):
+            url_obj["query"] = [
+                {"key": p.get('key', ''), "value": p.get('value', ''), "disabled": not p.get('enabled', True)}
+                for p in data.get('params', []) if p.get('key')
+            ]
+
+        # Headers（敏感信息脱敏）
+        headers = []
+        for h in data.get('headers', []):
+            if h.get('key'):
+                header_key = h.get('key', '')
+                header_value = h.get('value', '')
+                if header_key.lower().strip() in SENSITIVE_HEADERS:
+                    header_value = '***REDACTED***'
+                headers.append({
+                    "key": header_key,
+                    "value": header_value,
+                    "type": "text",
+                    "disabled": not h.get('enabled', True)
+                })
+
+        body = None
+        req_body = data.get('body', {})
+        if req_body.get('type') not in ['none', None, '']:
+            if req_body.get('type') == 'json':
+                body = {
+                    "mode": "raw",
+                    "raw": req_body.get('content', ''),
+                    "options": {"raw": {"language": "json"}}
+                }
+            elif req_body.get('type') == 'form':
+                body = {"mode": "formdata", "formdata": []}
+            else:
+                body = {"mode": "raw", "raw": req_body.get('content', '')}
+
+        return {
+            "name": data.get('name', ''),
+            "request": {
+                "method": data.get('method', 'GET'),
+                "header": headers,
+                "body": body,
+                "url": url_obj,
+                "description": data.get('description', '')
+            }
+        }
+
     # ========== 导出为标准格式 ==========
     def export_openapi(self, collection_id: str = None) -> Dict:
         """
@@ -621,92 +837,18 @@ class HttpCollectionsService:
             }
         }
 
-        servers_set = set()
+        servers = {}
 
         def process_request(req: Dict, tag: str = None):
             if req.get('type') != 'request':
                 return
 
             data = req.get('data', req)
-            url = data.get('url', '')
+            path, server = self._openapi_path(data.get('url', ''))
+            if server:
+                servers[server] = None
             method = data.get('method', 'GET').lower()
-
-            parsed = self._parse_url(url)
-            if parsed['host']:
-                servers_set.add(f"{parsed['scheme']}://{parsed['host']}")
-
-            path = parsed['path'] or '/'
-            # 移除查询参数
-            if '?' in path:
-                path = path.split('?')[0]
-
-            operation = {
-                "summary": data.get('name', ''),
-                "description": data.get('description', ''),
-                "operationId": f"{method}_{req.get('id', '')}",
-                "parameters": [],
-                "responses": {
-                    "200": {"description": "成功响应"}
-                }
-            }
-
-            if tag:
-                operation["tags"] = [tag]
-
-            # 处理 Query 参数
-            for param in data.get('params', []):
-                if param.get('enabled', True) and param.get('key'):
-                    operation["parameters"].append({
-                        "name": param.get('key', ''),
-                        "in": param.get('type', 'query'),
-                        "required": False,
-                        "schema": {"type": "string"},
-                        "example": param.get('value', '')
-                    })
-
-            # 处理 Headers（敏感信息脱敏）
-            SENSITIVE_HEADERS = {'authorization', 'x-api-key', 'api-key', 'token', 'x-token', 'bearer', 'cookie', 'set-cookie', 'proxy-authorization', 'x-auth-token'}
-            for header in data.get('headers', []):
-                if header.get('enabled', True) and header.get('key'):
-                    header_key = header.get('key', '')
-                    header_value = header.get('value', '')
-                    if header_key.lower().strip() in SENSITIVE_HEADERS:
-                        header_value = '***REDACTED***'
-                    operation["parameters"].append({
-                        "name": header_key,
-                        "in": "header",
-                        "required": False,
-                        "schema": {"type": "string"},
-                        "example": header_value
-                    })
-
-            # 处理 Body
-            body = data.get('body', {})
-            if body.get('type') not in ['none', None, '']:
-                content_type = "application/json"
-                if body.get('type') == 'form':
-                    content_type = "application/x-www-form-urlencoded"
-                elif body.get('type') == 'raw':
-                    content_type = "text/plain"
-
-                example_content = body.get('content', '')
-                try:
-                    example_content = json.loads(example_content)
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
-                operation["requestBody"] = {
-                    "content": {
-                        content_type: {
-                            "schema": {"type": "object"},
-                            "example": example_content
-                        }
-                    }
-                }
-
-            if path not in openapi_doc["paths"]:
-                openapi_doc["paths"][path] = {}
-            openapi_doc["paths"][path][method] = operation
+            openapi_doc["paths"].setdefault(path, {})[method] = self._openapi_operation(data, req.get('id', ''), tag)
 
         def process_folder(folder: Dict, parent_tag: str = None):
             tag = folder.get('name', parent_tag)
@@ -722,7 +864,7 @@ class HttpCollectionsService:
             for folder in collection.get('folders', []):
                 process_folder(folder, tag)
 
-        openapi_doc["servers"] = [{"url": s} for s in servers_set] or [{"url": "http://localhost"}]
+        openapi_doc["servers"] = [{"url": s} for s in servers] or [{"url": "http://localhost"}]
         return openapi_doc
 
     def export_postman(self, collection_id: str = None) -> Dict:
@@ -742,92 +884,25 @@ class HttpCollectionsService:
         if not collections:
             return {"error": "未找到集合"}
 
-        def convert_request(req: Dict) -> Dict:
-            data = req.get('data', req)
-            url = data.get('url', '')
-            parsed = self._parse_url(url)
-
-            url_obj = {
-                "raw": url,
-                "protocol": parsed['scheme'],
-                "host": parsed['host'].split('.') if parsed['host'] else [],
-                "path": [p for p in parsed['path'].split('/') if p]
-            }
-
-            # 添加查询参数
-            if data.get('params'):
-                url_obj["query"] = [
-                    {"key": p.get('key', ''), "value": p.get('value', ''), "disabled": not p.get('enabled', True)}
-                    for p in data.get('params', []) if p.get('key')
-                ]
-
-            # Headers（敏感信息脱敏）
-            SENSITIVE_HEADERS = {'authorization', 'x-api-key', 'api-key', 'token', 'x-token', 'bearer', 'cookie', 'set-cookie', 'proxy-authorization', 'x-auth-token'}
-            headers = []
-            for h in data.get('headers', []):
-                if h.get('key'):
-                    header_key = h.get('key', '')
-                    header_value = h.get('value', '')
-                    if header_key.lower().strip() in SENSITIVE_HEADERS:
-                        header_value = '***REDACTED***'
-                    headers.append({
-                        "key": header_key,
-                        "value": header_value,
-                        "type": "text",
-                        "disabled": not h.get('enabled', True)
-                    })
-
-            body = None
-            req_body = data.get('body', {})
-            if req_body.get('type') not in ['none', None, '']:
-                if req_body.get('type') == 'json':
-                    body = {
-                        "mode": "raw",
-                        "raw": req_body.get('content', ''),
-                        "options": {"raw": {"language": "json"}}
-                    }
-                elif req_body.get('type') == 'form':
-                    body = {"mode": "formdata", "formdata": []}
-                else:
-                    body = {"mode": "raw", "raw": req_body.get('content', '')}
-
-            return {
-                "name": data.get('name', ''),
-                "request": {
-                    "method": data.get('method', 'GET'),
-                    "header": headers,
-                    "body": body,
-                    "url": url_obj,
-                    "description": data.get('description', '')
-                }
-            }
-
         def convert_folder(folder: Dict) -> Dict:
             items = []
             for req in folder.get('requests', []):
                 if req.get('type') == 'request':
-                    items.append(convert_request(req))
+                    items.append(self._postman_item(req.get('data', req)))
             for sub_folder in folder.get('folders', []):
                 items.append(convert_folder(sub_folder))
             return {"name": folder.get('name', ''), "item": items}
 
         if len(collections) == 1:
             collection = collections[0]
-            items = []
-            for req in collection.get('requests', []):
-                if req.get('type') == 'request':
-                    items.append(convert_request(req))
-            for folder in collection.get('folders', []):
-                items.append(convert_folder(folder))
-
             return {
                 "info": {
                     "_postman_id": collection.get('id', ''),
                     "name": collection.get('name', ''),
                     "description": collection.get('description', ''),
-                    "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+                    "schema": POSTMAN_SCHEMA_URL
                 },
-                "item": items
+                "item": convert_folder(collection)["item"]
             }
         else:
             all_items = [convert_folder(c) for c in collections]
@@ -835,11 +910,217 @@ class HttpCollectionsService:
                 "info": {
                     "_postman_id": str(uuid.uuid4()),
                     "name": "导出的 API 集合",
-                    "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+                    "schema": POSTMAN_SCHEMA_URL
                 },
                 "item": all_items
             }
 
+    # ========== 流式导出到文件 ==========
+    def _load_export_structure(self, collection_id: str = None) -> Tuple[List[Dict], Dict[Optional[str], List[Dict]]]:
+        """读取导出所需的轻量结构：不含 data 大字段，请求只带出 url/method"""
+        columns = """h.id, h.name, h.description, h.parent_id, h.type,
+                     CASE WHEN h.type = 'request' THEN json_extract(h.data, '$.url') END AS url,
+                     CASE WHEN h.type = 'request' THEN json_extract(h.data, '$.method') END AS method"""
+        if collection_id:
+            items = self.db.execute_query(f"""
+                WITH RECURSIVE subtree(id) AS (
+                    SELECT id FROM http_collections WHERE id = ?
+                    UNION ALL
+                    SELECT c.id FROM http_collections c JOIN subtree s ON c.parent_id = s.id
+                )
+                SELECT {columns} FROM http_collections h JOIN subtree USING (id)
+                ORDER BY h.order_index ASC
+            """, (collection_id,))
+            roots = [i for i in items if i['id'] == collection_id]
+        else:
+            items = self.db.execute_query(f"SELECT {columns} FROM http_collections h ORDER BY h.order_index ASC")
+            roots = [i for i in items if i['parent_id'] is None]
+        return roots, self._index_children(items)
+
+    def _iter_request_data(self, request_ids: List[str]) -> Iterator[Tuple[str, Dict]]:
+        """按给定顺序分批读取完整的请求节点，同一时刻只有一批在内存中"""
+        for start in range(0, len(request_ids), EXPORT_BATCH_SIZE):
+            batch = request_ids[start:start + EXPORT_BATCH_SIZE]
+            placeholders = ", ".join("?" for _ in batch)
+            rows = self.db.execute_query(
+                f"SELECT id, name, description, type, parent_id, data FROM http_collections WHERE id IN ({placeholders})",
+                tuple(batch)
+            )
+            rows_by_id = {row['id']: row for row in rows}
+            for request_id in batch:
+                row = rows_by_id.get(request_id)
+                if row is None:
+                    # 读取结构后该请求已被删除，跳过
+                    continue
+                # 与集合树中的请求节点结构一致（_build_collection_node）
+                yield request_id, self._build_collection_node(self.db._deserialize_json_fields(row), {})
+            del rows_by_id, rows
+
+    def export_to_file(self, export_format: str, file_path: str, collection_id: str = None,
+                       progress_callback: Callable[[Dict], None] | None = None) -> Dict:
+        """
+        把集合流式导出为 OpenAPI 3.0 或 Postman v2.1 文件
+
+        直接从数据库按批读取请求并边转换边写入，不构建完整文档；
+        文件扩展名为 .yaml/.yml 时输出 YAML，否则输出 JSON。先写入同目录临时文件，完成后再替换目标文件。
+
+        Args:
+            export_format: "openapi" 或 "postman"
+            file_path: 目标文件路径
+            collection_id: 集合 ID，为空则导出所有
+            progress_callback: 每写出一批请求回调一次 {done, total}
+
+        Returns:
+            dict: {success, path, requests, size} 或 {success: False, error}
+        """
+        if export_format not in ("openapi", "postman"):
+            return {"success": False, "error": f"不支持的导出格式: {export_format}"}
+
+        roots, children_by_parent = self._load_export_structure(collection_id)
+        if not roots:
+            return {"success": False, "error": "未找到集合"}
+
+        total = sum(len([c for c in children if c['type'] == 'request'])
+                    for children in children_by_parent.values())
+        done = 0
+
+        def report(count: int, force: bool = False):
+            nonlocal done
+            before = done
+            done += count
+            if progress_callback and (force or done // EXPORT_BATCH_SIZE != before // EXPORT_BATCH_SIZE):
+                progress_callback({"done": done, "total": total})
+
+        target = Path(file_path)
+        temp_path = target.with_name(target.name + ".part")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as fp:
+                writer = StreamWriter.for_path(fp, str(target))
+                if export_format == "openapi":
+                    self._stream_openapi(writer, roots, children_by_parent, report)
+                else:
+                    self._stream_postman(writer, roots, children_by_parent, report)
+            temp_path.replace(target)
+        except Exception as e:
+            logger.error(f"导出集合到文件失败: {e}")
+            temp_path.unlink(missing_ok=True)
+            return {"success": False, "error": str(e)}
+
+        report(0, force=True)
+        return {"success": True, "path": str(target), "requests": done, "size": target.stat().st_size}
+
+    def _stream_openapi(self, writer: StreamWriter, roots: List[Dict],
+                        children_by_parent: Dict[Optional[str], List[Dict]], report: Callable[[int], None]):
+        # 与 export_openapi 相同的遍历顺序：先本层请求、再子文件夹，tag 取最近一层文件夹名
+        ordered: List[Tuple[Dict, str]] = []
+
+        def walk(item_id: str, tag: str):
+            children = children_by_parent.get(item_id, [])
+            ordered.extend((c, tag) for c in children if c['type'] == 'request')
+            for child in children:
+                if child['type'] == 'folder':
+                    walk(child['id'], child['name'])
+
+        for root in roots:
+            walk(root['id'], root['name'])
+
+        # 先用轻量的 url/method 把请求归到各个路径下（同一路径同一方法后者覆盖前者）
+        paths: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        servers: Dict[str, None] = {}
+        for item, tag in ordered:
+            path, server = self._openapi_path(item['url'] or '')
+            if server:
+                servers[server] = None
+            paths.setdefault(path, {})[(item['method'] or 'GET').lower()] = (item['id'], tag)
+        report(len(ordered) - sum(len(m) for m in paths.values()))
+
+        single = len(roots) == 1
+        writer.begin_object()
+        writer.write_value("3.0.3", "openapi")
+        writer.write_value({
+            "title": roots[0]['name'] if single else "API 文档",
+            "description": (roots[0].get('description') or '') if single else "导出的 API 集合",
+            "version": "1.0.0"
+        }, "info")
+        writer.write_value([{"url": s} for s in servers] or [{"url": "http://localhost"}], "servers")
+        writer.begin_object("paths")
+        path_items = list(paths.items())
+        del paths
+        start = 0
+        while start < len(path_items):
+            # 凑满一批请求再读库
+            end, count = start, 0
+            while end < len(path_items) and (count == 0 or count + len(path_items[end][1]) <= EXPORT_BATCH_SIZE):
+                count += len(path_items[end][1])
+                end += 1
+            chunk = path_items[start:end]
+            data_by_id = dict(self._iter_request_data(
+                [request_id for _, methods in chunk for request_id, _ in methods.values()]
+            ))
+            for path, methods in chunk:
+                # 导出过程中被删除的请求不再输出，整个路径都被删除时跳过该路径
+                present = [(method, request_id, tag) for method, (request_id, tag) in methods.items()
+                           if request_id in data_by_id]
+                if not present:
+                    continue
+                writer.begin_object(path)
+                for method, request_id, tag in present:
+                    node = data_by_id[request_id]
+                    writer.write_value(self._openapi_operation(node, node.get('id', ''), tag), method)
+                writer.end_object()
+            report(len(data_by_id))
+            start = end
+        writer.end_object()
+        writer.write_value({"schemas": {}, "securitySchemes": {}}, "components")
+        writer.end_object()
+
+    def _stream_postman(self, writer: StreamWriter, roots: List[Dict],
+                        children_by_parent: Dict[Optional[str], List[Dict]], report: Callable[[int], None]):
+        def write_items(folder_id: str):
+            # 与 export_postman 相同：先本层请求、再子文件夹
+            children = children_by_parent.get(folder_id, [])
+            request_ids = [c['id'] for c in children if c['type'] == 'request']
+            for _, data in self._iter_request_data(request_ids):
+                writer.write_value(self._postman_item(data))
+                report(1)
+            for child in children:
+                if child['type'] == 'folder':
+                    writer.begin_object()
+                    writer.write_value(child['name'], "name")
+                    writer.begin_array("item")
+                    write_items(child['id'])
+                    writer.end_array()
+                    writer.end_object()
+
+        writer.begin_object()
+        if len(roots) == 1:
+            root = roots[0]
+            writer.write_value({
+                "_postman_id": root['id'],
+                "name": root['name'],
+                "description": root.get('description') or '',
+                "schema": POSTMAN_SCHEMA_URL
+            }, "info")
+            writer.begin_array("item")
+            write_items(root['id'])
+            writer.end_array()
+        else:
+            writer.write_value({
+                "_postman_id": str(uuid.uuid4()),
+                "name": "导出的 API 集合",
+                "schema": POSTMAN_SCHEMA_URL
+            }, "info")
+            writer.begin_array("item")
+            for root in roots:
+                writer.begin_object()
+                writer.write_value(root['name'], "name")
+                writer.begin_array("item")
+                write_items(root['id'])
+                writer.end_array()
+                writer.end_object()
+            writer.end_array()
+        writer.end_object()
+
     def _parse_url(self, url: str) -> Dict:
         """解析 URL"""
         from urllib.parse import urlparse
@@ -911,6 +1192,7 @@ class HttpCollectionsService:
                 "created_at": now,
                 "updated_at": now
             })
+            self._cache.invalidate("environments")
             return {"success": True, "id": env_id}
         except Exception as e:
             logger.error(f"创建环境失败: {e}")
@@ -926,6 +1208,7 @@ class HttpCollectionsService:
                 updates["variables"] = json.dumps(variables)
 
             self.db.update("http_environments", updates, "id = ?", (env_id,))
+            self._cache.invalidate("environments")
             return {"success": True}
         except Exception as e:
             logger.error(f"更新环境失败: {e}")
@@ -935,6 +1218,7 @@ class HttpCollectionsService:
         """删除环境"""
         try:
             self.db.delete("http_environments", "id = ?", (env_id,))
+            self._cache.invalidate("environments")
             return {"success": True}
         except Exception as e:
             logger.error(f"删除环境失败: {e}")
@@ -943,64 +1227,101 @@ class HttpCollectionsService:
     def set_active_environment(self, env_id: str = None) -> Dict:
         """设置活跃环境"""
         try:
-            # 先清除所有活跃状态
-            self.db.execute_update("UPDATE http_environments SET is_active = 0")
+            with self.db.transaction():
+                # 先清除所有活跃状态
+                self.db.execute_update("UPDATE http_environments SET is_active = 0")
 
-            # 如果指定了环境，设置为活跃
-            if env_id:
-                self.db.update("http_environments", {"is_active": 1}, "id = ?", (env_id,))
+                # 如果指定了环境，设置为活跃
+                if env_id:
+                    self.db.update("http_environments", {"is_active": 1}, "id = ?", (env_id,))
 
+                self._cache.invalidate("environments")
             return {"success": True}
         except Exception as e:
             logger.error(f"设置活跃环境失败: {e}")
             return {"success": False, "error": str(e)}
 
     # ========== 变量替换辅助 ==========
-    def replace_variables(self, text: str, env_id: str = None) -> str:
-        """替换文本中的环境变量"""
-        import re
-
-        if not text:
-            return text
-
-        # 获取环境变量
-        env = None
-        if env_id:
-            rows = self.db.execute_query("SELECT * FROM http_environments WHERE id = ?", (env_id,))
-            if rows:
-                env = rows[0]
-        else:
-            env_data = self.get_active_environment()
-            if env_data:
-                return self._do_replace(text, env_data.get("variables", []))
-            return text
-
-        if env:
-            variables = env["variables"]
+    def _load_environment_snapshot(self) -> Dict[str, Any]:
+        """一次读出全部环境，并预先展开每个环境的变量值（含嵌套引用）"""
+        environments = {}
+        active_id = None
+        for row in self.db.execute_query("SELECT id, name, variables, is_active FROM http_environments"):
+            variables = row["variables"]
             if isinstance(variables, str):
                 variables = json.loads(variables) if variables else []
             elif not isinstance(variables, list):
                 variables = []
-            return self._do_replace(text, variables)
+            environments[row["id"]] = {
+                "name": row["name"],
+                "variables": variables,
+                "values": self._resolve_variable_map(variables),
+            }
+            if row["is_active"]:
+                active_id = row["id"]
+        return {"environments": environments, "active_id": active_id}
 
-        return text
+    def _get_environment_snapshot(self, env_id: str = None) -> Optional[Dict[str, Any]]:
+        """取指定环境（为空时取当前活跃环境）的缓存快照，环境增删改或切换活跃环境后失效"""
+        snapshot = self._cache.get("environments", self._load_environment_snapshot)
+        return snapshot["environments"].get(env_id or snapshot["active_id"])
 
-    def _do_replace(self, text: str, variables: List[Dict]) -> str:
-        """执行变量替换"""
-        import re
+    @staticmethod
+    def _resolve_variable_map(variables: List[Dict]) -> Dict[str, str]:
+        """启用的变量 -> 完全展开后的值
 
-        if not variables:
+        变量值里可以引用其它变量（如 baseUrl = {{host}}/api），按依赖递归展开；
+        循环引用或超过 MAX_VARIABLE_DEPTH 层时保留未展开的占位符。
+        """
+        raw = {}
+        for v in variables or []:
+            if v.get("enabled", True) and v.get("key"):
+                raw[v["key"]] = str(v.get("value", "") or "")
+
+        resolved: Dict[str, str] = {}
+
+        def resolve(key: str, stack: List[str]) -> str:
+            if key in resolved:
+                return resolved[key]
+            if key in stack or len(stack) >= MAX_VARIABLE_DEPTH:
+                return "{{" + key + "}}"
+            stack.append(key)
+            value = VARIABLE_PATTERN.sub(
+                lambda m: resolve(m.group(1), stack) if m.group(1) in raw else m.group(0),
+                raw[key],
+            )
+            stack.pop()
+            resolved[key] = value
+            return value
+
+        for key in raw:
+            resolve(key, [])
+        return resolved
+
+    @staticmethod
+    def substitute_variables(text: str, values: Dict[str, str]) -> str:
+        """用已展开的变量表替换 {{name}}，未定义的占位符原样保留"""
+        if not text or not values:
             return text
+        return VARIABLE_PATTERN.sub(lambda m: values.get(m.group(1), m.group(0)), text)
 
-        # 构建变量映射
-        var_map = {}
-        for v in variables:
-            if v.get("enabled", True) and v.get("key"):
-                var_map[v["key"]] = v.get("value", "")
+    def get_variable_map(self, env_id: str = None) -> Dict[str, str]:
+        """取指定环境（为空时取当前活跃环境）展开后的变量表，环境不存在时返回空表"""
+        env = self._get_environment_snapshot(env_id)
+        return env["values"] if env else {}
+
+    def resolve_environment_variables(self, env_id: str = None) -> List[Dict]:
+        """取指定环境（为空时取当前活跃环境）的变量列表，环境不存在时返回空列表"""
+        env = self._get_environment_snapshot(env_id)
+        return env["variables"] if env else []
 
-        # 替换 {{variable}} 格式
-        def replacer(match):
-            key = match.group(1)
-            return var_map.get(key, match.group(0))
+    def replace_variables(self, text: str, env_id: str = None) -> str:
+        """替换文本中的环境变量"""
+        if not text:
+            return text
+        return self.substitute_variables(text, self.get_variable_map(env_id))
 
-        return re.sub(r'\{\{(\w+)\}\}', replacer, text)
+    def replace_variables_many(self, texts: List[str], env_id: str = None) -> List[str]:
+        """批量替换环境变量：一次取环境快照，结果顺序与 texts 一致"""
+        values = self.get_variable_map(env_id)
+        return [self.substitute_variables(text, values) for text in texts or []]
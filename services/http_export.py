@@ -0,0 +1,170 @@
+"""HTTP 集合导出文件的流式写出器。
+
+HttpCollectionsService.export_to_file 按“开始对象/数组、写值、结束”的事件顺序调用这里，
+文档边生成边写入文件，内存中只保留当前的嵌套层级，不需要先拼出完整的 dict。
+支持 JSON 与 YAML 两种输出（YAML 为块格式，字符串一律用 JSON 风格的双引号，无需 PyYAML）。
+"""
+
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, TextIO
+
+# 无需加引号的 YAML 键
+_PLAIN_YAML_KEY = re.compile(r'^[A-Za-z_][\w.-]*$')
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "count", "opened")
+
+    def __init__(self, kind: str, key: Optional[str]):
+        self.kind = kind      # "object" 或 "array"
+        self.key = key
+        self.count = 0        # JSON 中已写出的子项数（决定是否需要逗号）
+        self.opened = False   # YAML 中容器的首行（键名或 "- "）是否已写出
+
+
+class StreamWriter(ABC):
+    """流式文档写出器基类：begin_object/begin_array 与 end_* 成对调用，write_value 写入完整子树"""
+
+    def __init__(self, fp: TextIO):
+        self.fp = fp
+        self._stack: List[_Frame] = []
+
+    @classmethod
+    def for_path(cls, fp: TextIO, path: str) -> "StreamWriter":
+        """按文件扩展名选择 YAML 或 JSON 写出器"""
+        if str(path).lower().endswith((".yaml", ".yml")):
+            return YamlStreamWriter(fp)
+        return JsonStreamWriter(fp)
+
+    def write_value(self, value: Any, key: Optional[str] = None):
+        if isinstance(value, dict):
+            self.begin_object(key)
+            for k, v in value.items():
+                self.write_value(v, str(k))
+            self.end_object()
+        elif isinstance(value, (list, tuple)):
+            self.begin_array(key)
+            for item in value:
+                self.write_value(item)
+            self.end_array()
+        else:
+            self._write_scalar(value, key)
+
+    def begin_object(self, key: Optional[str] = None):
+        self._begin("object", key)
+
+    def begin_array(self, key: Optional[str] = None):
+        self._begin("array", key)
+
+    def end_object(self):
+        self._end("object")
+
+    def end_array(self):
+        self._end("array")
+
+    @abstractmethod
+    def _begin(self, kind: str, key: Optional[str]):
+        """打开一个对象/数组"""
+
+    @abstractmethod
+    def _end(self, kind: str):
+        """关闭最内层的对象/数组"""
+
+    @abstractmethod
+    def _write_scalar(self, value: Any, key: Optional[str]):
+        """写入一个标量值"""
+
+
+class JsonStreamWriter(StreamWriter):
+    """缩进 2 空格的 JSON，输出与 json.dumps(indent=2, ensure_ascii=False) 一致"""
+
+    def _prefix(self, key: Optional[str]):
+        if self._stack:
+            parent = self._stack[-1]
+            self.fp.write(",\n" if parent.count else "\n")
+            self.fp.write("  " * len(self._stack))
+            parent.count += 1
+        if key is not None and self._stack and self._stack[-1].kind == "object":
+            self.fp.write(json.dumps(key, ensure_ascii=False) + ": ")
+
+    def _begin(self, kind: str, key: Optional[str]):
+        self._prefix(key)
+        self.fp.write("{" if kind == "object" else "[")
+        self._stack.append(_Frame(kind, key))
+
+    def _end(self, kind: str):
+        frame = self._stack.pop()
+        if frame.count:
+            self.fp.write("\n" + "  " * len(self._stack))
+        self.fp.write("}" if kind == "object" else "]")
+        if not self._stack:
+            self.fp.write("\n")
+
+    def _write_scalar(self, value: Any, key: Optional[str]):
+        self._prefix(key)
+        self.fp.write(json.dumps(value, ensure_ascii=False))
+        if not self._stack:
+            self.fp.write("\n")
+
+
+class YamlStreamWriter(StreamWriter):
+    """块格式 YAML：对象写成 key: value，数组项以 "- " 开头，容器的首行延迟到写出第一个子项时再输出"""
+
+    def __init__(self, fp: TextIO):
+        super().__init__(fp)
+        # 已打开但还没写出首行的数组项个数（数组嵌套数组时会连续出现多个 "- "）
+        self._pending_dashes = 0
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return key if _PLAIN_YAML_KEY.match(key) else json.dumps(key, ensure_ascii=False)
+
+    @staticmethod
+    def _scalar(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False)
+
+    def _lead(self, key: Optional[str]) -> str:
+        """当前层级下一行的前缀：父对象中为 "key: "，父数组中为 "- "，顶层为空"""
+        if not self._stack:
+            return ""
+        parent = self._stack[-1]
+        return f"{self._key(key)}: " if parent.kind == "object" else "- "
+
+    def _open_parents(self):
+        """写出尚未输出首行的祖先容器"""
+        for depth, frame in enumerate(self._stack):
+            if frame.opened:
+                continue
+            frame.opened = True
+            if depth == 0:
+                continue
+            parent = self._stack[depth - 1]
+            if parent.kind == "array":
+                # 数组项容器不单独占一行，"- " 并入它的第一行
+                self._pending_dashes += 1
+            else:
+                self._write(depth - 1, f"{self._key(frame.key)}:")
+
+    def _begin(self, kind: str, key: Optional[str]):
+        self._stack.append(_Frame(kind, key))
+
+    def _end(self, kind: str):
+        frame = self._stack.pop()
+        if not frame.opened:
+            # 空容器：一行写成 key: {} / - []
+            self._open_parents()
+            self._write(len(self._stack) - 1, self._lead(frame.key) + ("{}" if kind == "object" else "[]"))
+
+    def _write_scalar(self, value: Any, key: Optional[str]):
+        self._open_parents()
+        self._write(len(self._stack) - 1, self._lead(key) + self._scalar(value))
+
+    def _write(self, depth: int, text: str):
+        indent = "  " * max(depth, 0)
+        if self._pending_dashes:
+            n = self._pending_dashes
+            indent = indent[:len(indent) - 2 * n] + "- " * n
+            self._pending_dashes = 0
+        self.fp.write(indent + text + "\n")
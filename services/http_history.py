@@ -0,0 +1,188 @@
+"""HTTP 请求/响应历史持久化服务。
+
+Api.http_request 每发出一次调试请求就在这里落一条记录：请求与响应的元信息明文存储，
+请求体、响应体先截断到上限再用 zlib 压缩为 BLOB，避免大 JSON 响应撑大数据库。
+列表接口只返回元信息（分页），响应体仅在查看单条详情时解压，桥接层不必搬运大字段。
+记录按条数与保存天数定期淘汰。
+"""
+
+import json
+import logging
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from services.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class HttpHistoryService:
+    """HTTP 集合页“请求历史”的服务端存储"""
+    # 单条记录保存的响应体/请求体上限（压缩前的字节数），超出部分截断
+    MAX_BODY_BYTES = 2 * 1024 * 1024
+    MAX_REQUEST_BODY_BYTES = 256 * 1024
+    # 淘汰策略：最多保留条数与天数；每写入 PRUNE_EVERY 条检查一次
+    MAX_ENTRIES = 500
+    MAX_AGE_DAYS = 30
+    PRUNE_EVERY = 20
+    COMPRESS_LEVEL = 6
+    MAX_PAGE_SIZE = 200
+    # 列表接口返回的列（不含 BLOB 字段）
+    LIST_COLUMNS = ("id, method, url, success, status, status_text, error, duration, "
+                    "body_encoding, body_size, stored_size, truncated, meta, created_at")
+
+    def __init__(self, db: DatabaseManager):
+        if db is None:
+            raise ValueError("数据库未就绪")
+        self.db = db
+        self._writes = 0
+        try:
+            self.prune()
+        except Exception as e:
+            logger.warning(f"清理 HTTP 历史失败: {e}")
+
+    # ========== 压缩与截断 ==========
+    @staticmethod
+    def _truncate(text: str, limit: int, encoding: str = "text") -> Tuple[bytes, bool]:
+        """按 UTF-8 字节数截断；base64 内容截到 4 的整数倍，保证仍可解码"""
+        data = (text or "").encode("utf-8")
+        if len(data) <= limit:
+            return data, False
+        if encoding == "base64":
+            return data[:limit - limit % 4], True
+        # 去掉被截断在半个字符中间的尾部字节
+        return data[:limit].decode("utf-8", errors="ignore").encode("utf-8"), True
+
+    def _compress(self, data: bytes) -> Optional[bytes]:
+        return zlib.compress(data, self.COMPRESS_LEVEL) if data else None
+
+    @staticmethod
+    def _decompress(blob: Optional[bytes]) -> str:
+        return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+    # ========== 写入 ==========
+    def record(self, method: str, url: str, headers: Optional[Dict], body: Optional[str],
+               result: Dict[str, Any]) -> Optional[str]:
+        """记录一次请求及其结果，返回历史记录 id；写入失败只记日志，不影响请求本身"""
+        try:
+            encoding = result.get("bodyEncoding", "text")
+            response_body, truncated = self._truncate(result.get("body") or "", self.MAX_BODY_BYTES, encoding)
+            # 落盘的大响应体只有预览进入历史
+            truncated = truncated or bool(result.get("streamed"))
+            request_body, _ = self._truncate(body or "", self.MAX_REQUEST_BODY_BYTES)
+            compressed = self._compress(response_body)
+            entry_id = str(uuid.uuid4())
+            inserted = self.db.insert("http_history", {
+                "id": entry_id,
+                "method": (method or "GET").upper(),
+                "url": url,
+                "success": 1 if result.get("success") else 0,
+                "status": result.get("status"),
+                "status_text": result.get("statusText"),
+                "error": result.get("error"),
+                "duration": result.get("duration"),
+                "request_headers": json.dumps(headers or {}, ensure_ascii=False),
+                "request_body": self._compress(request_body),
+                "response_headers": json.dumps(result.get("headers") or {}, ensure_ascii=False),
+                "body": compressed,
+                "body_encoding": encoding,
+                "body_size": result.get("size", len(response_body)),
+                "stored_size": len(compressed or b""),
+                "truncated": 1 if truncated else 0,
+                "meta": {
+                    "timings": result.get("timings"),
+                    "bytes": result.get("bytes"),
+                    "httpVersion": result.get("httpVersion"),
+                    "error_type": result.get("error_type"),
+                },
+                "created_at": datetime.now().isoformat(),
+            })
+        except Exception as e:
+            logger.error(f"记录 HTTP 历史失败: {e}")
+            return None
+        if not inserted:
+            # db.insert 已记录失败原因；没有落库就不能把 id 交给前端
+            return None
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            try:
+                self.prune()
+            except Exception as e:
+                logger.warning(f"清理 HTTP 历史失败: {e}")
+        return entry_id
+
+    def prune(self, max_entries: int = None, max_age_days: int = None) -> int:
+        """按保存天数与条数上限淘汰旧记录，返回删除条数"""
+        max_entries = self.MAX_ENTRIES if max_entries is None else max_entries
+        max_age_days = self.MAX_AGE_DAYS if max_age_days is None else max_age_days
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        with self.db.transaction():
+            deleted = self.db.execute_update("DELETE FROM http_history WHERE created_at < ?", (cutoff,))
+            deleted += self.db.execute_update("""
+                DELETE FROM http_history WHERE id NOT IN (
+                    SELECT id FROM http_history ORDER BY created_at DESC LIMIT ?
+                )
+            """, (max_entries,))
+        if deleted:
+            logger.info(f"清理了 {deleted} 条 HTTP 历史")
+        return deleted
+
+    # ========== 查询 ==========
+    def list_entries(self, page: int = 1, page_size: int = 50, keyword: str = None) -> Dict[str, Any]:
+        """分页获取历史列表（不含请求体/响应体），按时间倒序"""
+        page = max(1, int(page or 1))
+        page_size = max(1, min(int(page_size or 50), self.MAX_PAGE_SIZE))
+        where, params = "", []
+        if keyword:
+            where = " WHERE url LIKE ?"
+            params.append(f"%{keyword}%")
+        total = self.db.execute_query(f"SELECT COUNT(*) AS n FROM http_history{where}", tuple(params))[0]["n"]
+        rows = self.db.execute_query(
+            f"SELECT {self.LIST_COLUMNS} FROM http_history{where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            tuple(params + [page_size, (page - 1) * page_size]),
+        )
+        return {
+            "success": True,
+            "items": [self._format_row(r) for r in rows],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+        }
+
+    def get_entry(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """获取单条历史的完整内容（解压请求体与响应体）"""
+        rows = self.db.execute_query("SELECT * FROM http_history WHERE id = ?", (entry_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        entry = self._format_row(row)
+        entry.update({
+            "request_headers": json.loads(row["request_headers"] or "{}"),
+            "request_body": self._decompress(row["request_body"]),
+            "response_headers": json.loads(row["response_headers"] or "{}"),
+            "body": self._decompress(row["body"]),
+        })
+        return entry
+
+    def _format_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = self.db._deserialize_json_fields(row)
+        entry = {k: row.get(k) for k in (
+            "id", "method", "url", "status", "status_text", "error", "duration",
+            "body_encoding", "body_size", "stored_size", "created_at",
+        )}
+        entry["success"] = bool(row.get("success"))
+        entry["truncated"] = bool(row.get("truncated"))
+        entry.update(row.get("meta") or {})
+        return entry
+
+    # ========== 删除 ==========
+    def delete_entry(self, entry_id: str) -> Dict[str, Any]:
+        deleted = self.db.execute_update("DELETE FROM http_history WHERE id = ?", (entry_id,))
+        return {"success": deleted > 0, "deleted": deleted}
+
+    def clear(self) -> Dict[str, Any]:
+        deleted = self.db.execute_update("DELETE FROM http_history")
+        return {"success": True, "deleted": deleted}
@@ -0,0 +1,240 @@
+"""HTTP 集合批量运行 / 压测。
+
+对应 HTTP 集合页的“运行集合”：把某个集合或文件夹下的全部请求按迭代次数展开，
+在线程池中并发发出（共用 HttpClientService 的连接池），逐条上报进度，
+结束后按请求汇总 p50/p95/p99 延迟、吞吐量与错误率。
+由 Api.run_http_collection 以后台任务方式调用。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from services.http_client import HttpClientService
+from services.http_collections import HttpCollectionsService
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """线性插值百分位（sorted_values 需已升序）"""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    value = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+    return round(value, 2)
+
+
+def _latency_stats(latencies: List[float]) -> Dict:
+    values = sorted(latencies)
+    return {
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "min": round(values[0], 2) if values else None,
+        "max": round(values[-1], 2) if values else None,
+        "mean": round(sum(values) / len(values), 2) if values else None,
+    }
+
+
+class HttpCollectionRunner:
+    """并发运行集合中的请求并汇总统计"""
+    DEFAULT_CONCURRENCY = 5
+    MAX_CONCURRENCY = 64
+    MAX_ITERATIONS = 10000
+    REQUEST_TIMEOUT = 30
+    # 每个工作线程最多排队的待发请求数（在途任务上限 = 并发数 × 该值）
+    QUEUE_DEPTH_PER_WORKER = 4
+    # 进度事件合并：每完成 PROGRESS_EVERY 次或距上次上报超过 PROGRESS_INTERVAL 秒才上报一次
+    PROGRESS_EVERY = 50
+    PROGRESS_INTERVAL = 0.25
+
+    def __init__(self, collections: HttpCollectionsService, client: HttpClientService):
+        self.collections = collections
+        self.client = client
+
+    # ========== 请求展开 ==========
+    @staticmethod
+    def _iter_requests(node: Dict, path: List[str]):
+        """按集合树中的展示顺序（文件夹在前、请求在后）深度优先列出请求"""
+        for folder in node.get("folders") or []:
+            yield from HttpCollectionRunner._iter_requests(folder, path + [folder.get("name", "")])
+        for request in node.get("requests") or []:
+            yield request, path
+
+    @staticmethod
+    def _enabled_items(items) -> List[Dict]:
+        return [i for i in (items or []) if i.get("key") and i.get("enabled", True)]
+
+    def _prepare(self, request: Dict, values: Dict[str, str]) -> Dict:
+        """套用环境变量（已展开的变量表），拼出可直接交给 HttpClientService.request 的参数"""
+        def replace(text: str) -> str:
+            return self.collections.substitute_variables(text, values)
+
+        method = (request.get("method") or "GET").upper()
+        url = replace(request.get("url") or "")
+
+        params = [(replace(p["key"]), replace(p.get("value", "")))
+                  for p in self._enabled_items(request.get("params"))]
+        if params:
+            parts = urlsplit(url)
+            query = "&".join(q for q in (parts.query, urlencode(params)) if q)
+            url = urlunsplit((parts.scheme, parts.netloc, parts.path, query, parts.fragment))
+
+        headers = {replace(h["key"]): replace(h.get("value", ""))
+                   for h in self._enabled_items(request.get("headers"))}
+
+        # 与编辑器的单次发送一致：只有 POST/PUT/PATCH 携带请求体
+        body = None
+        body_data = request.get("body") or {}
+        if (method in HttpClientService.BODY_METHODS
+                and body_data.get("type", "none") != "none" and body_data.get("content")):
+            body = replace(body_data["content"])
+
+        return {"method": method, "url": url, "headers": headers, "body": body}
+
+    # ========== 运行 ==========
+    def run(self, collection_id: str, concurrency: int = None, iterations: int = 1, env_id: str = None,
+            verify_ssl: bool = True, progress_callback: Callable[[Dict], None] | None = None) -> Dict:
+        """
+        运行集合或文件夹下的全部请求
+
+        Args:
+            collection_id: 集合或文件夹 id
+            concurrency: 同时在途的请求数
+            iterations: 每个请求重复的次数
+            env_id: 使用的环境（为空时使用当前活跃环境）
+            progress_callback: 完成请求时按批合并回调（见 PROGRESS_EVERY / PROGRESS_INTERVAL，最后一次必定上报）
+                {completed, total, errors, request_id, name, iteration, status, duration, success, error}，
+                completed/errors 为累计值，其余字段描述最近完成的那次请求
+
+        Returns:
+            dict: {success, total, completed, errors, error_rate, elapsed, throughput,
+                   latency: {p50, p95, p99, min, max, mean}, requests: [每个请求的同类统计 + status_codes]}
+        """
+        tree = self.collections.get_subtree(collection_id)
+        if tree is None:
+            return {"success": False, "error": "集合或文件夹不存在"}
+        if tree.get("type") == "request":
+            entries = [(tree, [])]
+        else:
+            entries = list(self._iter_requests(tree, []))
+        if not entries:
+            return {"success": False, "error": "集合中没有请求"}
+
+        concurrency = max(1, min(int(concurrency or self.DEFAULT_CONCURRENCY), self.MAX_CONCURRENCY))
+        iterations = max(1, min(int(iterations or 1), self.MAX_ITERATIONS))
+        # 环境变量取自缓存快照，运行期间不再访问数据库
+        values = self.collections.get_variable_map(env_id)
+        prepared = [(request, path, self._prepare(request, values)) for request, path in entries]
+
+        stats = {
+            request["id"]: {
+                "request_id": request["id"],
+                "name": request.get("name", ""),
+                "path": path,
+                "method": spec["method"],
+                "url": spec["url"],
+                "count": 0,
+                "errors": 0,
+                "status_codes": {},
+                "latencies": [],
+            }
+            for request, path, spec in prepared
+        }
+        total = len(prepared) * iterations
+        completed = 0
+        total_errors = 0
+        last_report = time.monotonic()
+        lock = threading.Lock()
+
+        def run_one(request: Dict, spec: Dict, iteration: int):
+            nonlocal completed, total_errors, last_report
+            result = self.client.request(
+                spec["method"], spec["url"], headers=spec["headers"], body=spec["body"],
+                timeout=self.REQUEST_TIMEOUT, verify_ssl=verify_ssl,
+            )
+            if result.get("bodyHandle"):
+                # 运行统计不需要响应体，落盘的大响应体立即删除
+                self.client.release_body(result["bodyHandle"])
+            ok = bool(result.get("success")) and result.get("status", 0) < 400
+            latency = (result.get("timings") or {}).get("total")
+            status = result.get("status") if result.get("success") else result.get("error_type", "Error")
+            with lock:
+                entry = stats[request["id"]]
+                entry["count"] += 1
+                if not ok:
+                    entry["errors"] += 1
+                    total_errors += 1
+                entry["status_codes"][str(status)] = entry["status_codes"].get(str(status), 0) + 1
+                if latency is not None:
+                    entry["latencies"].append(latency)
+                completed += 1
+                now = time.monotonic()
+                report = progress_callback is not None and (
+                    completed == total
+                    or completed % self.PROGRESS_EVERY == 0
+                    or now - last_report >= self.PROGRESS_INTERVAL
+                )
+                if report:
+                    last_report = now
+                    done, errors = completed, total_errors
+            if report:
+                progress_callback({
+                    "completed": done,
+                    "total": total,
+                    "errors": errors,
+                    "request_id": request["id"],
+                    "name": request.get("name", ""),
+                    "iteration": iteration,
+                    "status": status,
+                    "duration": latency,
+                    "success": ok,
+                    "error": None if result.get("success") else result.get("error"),
+                })
+
+        # 在途任务数受信号量限制，按需逐个提交，不会一次性为全部“请求 × 迭代”创建 future
+        slots = threading.BoundedSemaphore(concurrency * self.QUEUE_DEPTH_PER_WORKER)
+
+        def on_done(future):
+            slots.release()
+            error = future.exception()
+            if error is not None:
+                logger.error(f"集合运行中的请求异常: {error}")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="http-runner") as pool:
+            # 按迭代轮次提交，同一轮内的请求依次排队，保证各请求的采样均匀分布在整个运行期间
+            for iteration in range(1, iterations + 1):
+                for request, _, spec in prepared:
+                    slots.acquire()
+                    pool.submit(run_one, request, spec, iteration).add_done_callback(on_done)
+        elapsed = time.perf_counter() - start
+
+        requests_summary = []
+        all_latencies: List[float] = []
+        for entry in stats.values():
+            latencies = entry.pop("latencies")
+            all_latencies.extend(latencies)
+            entry["error_rate"] = round(entry["errors"] / entry["count"], 4) if entry["count"] else 0.0
+            entry["latency"] = _latency_stats(latencies)
+            requests_summary.append(entry)
+
+        return {
+            "success": True,
+            "total": total,
+            "completed": completed,
+            "errors": total_errors,
+            "error_rate": round(total_errors / completed, 4) if completed else 0.0,
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(completed / elapsed, 2) if elapsed > 0 else None,
+            "latency": _latency_stats(all_latencies),
+            "requests": requests_summary,
+        }
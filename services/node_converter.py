@@ -7,13 +7,49 @@
 from __future__ import annotations
 
 import base64
+import binascii
+import codecs
+import hashlib
+import itertools
+import json
+import logging
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from urllib.parse import parse_qs, unquote, urlparse
+import urllib.error
 import urllib.request
 import ssl
+from datetime import datetime
+
+from services.db_manager import DatabaseManager
+from services.node_probe import UDP_NODE_TYPES, ProbeResult, ProbeTarget, probe_many_sync
+
+logger = logging.getLogger(__name__)
+
+# 按节点名称识别地区（用于生成地区 url-test 分组），顺序即分组顺序
+REGION_KEYWORDS = [
+    ("🇭🇰 香港", ("香港", "HK", "Hong Kong", "HongKong", "🇭🇰")),
+    ("🇹🇼 台湾", ("台湾", "TW", "Taiwan", "🇹🇼")),
+    ("🇯🇵 日本", ("日本", "JP", "Japan", "东京", "大阪", "🇯🇵")),
+    ("🇸🇬 新加坡", ("新加坡", "SG", "Singapore", "狮城", "🇸🇬")),
+    ("🇰🇷 韩国", ("韩国", "KR", "Korea", "首尔", "🇰🇷")),
+    ("🇺🇸 美国", ("美国", "US", "United States", "USA", "洛杉矶", "硅谷", "🇺🇸")),
+    ("🇬🇧 英国", ("英国", "UK", "GB", "United Kingdom", "伦敦", "🇬🇧")),
+    ("🇩🇪 德国", ("德国", "DE", "Germany", "法兰克福", "🇩🇪")),
+]
+
+# 默认规则：局域网与国内直连，其余走“节点选择”
+DEFAULT_PROFILE_RULES = [
+    "GEOIP,LAN,DIRECT,no-resolve",
+    "GEOSITE,CN,DIRECT",
+    "GEOIP,CN,DIRECT",
+]
 
 
 # ========== 节点数据结构 ==========
@@ -38,14 +74,58 @@ class NodeConverterService:
     """节点转换业务服务。
 
     输入可能是订阅链接或代理分享链接，输出既包括页面显示结果，也包括可保存的节点配置。"""
-    def __init__(self, data_dir: Path, nodes_file: Path | None = None):
+    # db_metadata 中记录“nodes.md 已导入数据库”的标记
+    NODES_MD_IMPORTED_KEY = "nodes_md_imported"
+    # 订阅拉取：单个请求超时、批量并发上限、同一主机并发上限、批量总时限（秒）
+    SUBSCRIPTION_TIMEOUT = 15
+    SUBSCRIPTION_CONCURRENCY = 6
+    SUBSCRIPTION_PER_HOST_LIMIT = 2
+    SUBSCRIPTION_DEADLINE = 60
+    SUBSCRIPTION_USER_AGENT = "ClashForAndroid/2.5.12"
+    # 流式读取订阅的块大小（字节），以及下载过程中向前端推送节点的批大小
+    SUBSCRIPTION_CHUNK_SIZE = 64 * 1024
+    SUBSCRIPTION_NODE_BATCH = 50
+    # 判定订阅是明文还是 base64 时至少查看的字节数
+    SUBSCRIPTION_SNIFF_SIZE = 4096
+    # 节点探测：并发数、单次连接超时（秒）、每个节点的采样次数
+    PROBE_CONCURRENCY = 50
+    PROBE_TIMEOUT = 3.0
+    PROBE_ATTEMPTS = 3
+
+    def __init__(self, data_dir: Path, nodes_file: Path | None = None, db: DatabaseManager | None = None):
         self.data_dir = data_dir
+        # nodes.md 只用于首次导入旧数据和可选的 Markdown 导出
         self.nodes_file = nodes_file or (data_dir / "nodes.md")
-        self._ensure_files()
 
-    def _ensure_files(self):
-        """已废弃：迁移到数据库后不再创建 nodes.md 文件"""
-        pass
+        # 数据库支持（优先使用传入的 db，否则创建新实例）
+        if db is not None:
+            self.db = db
+            logger.info("NodeConverterService 使用共享数据库实例")
+        else:
+            self.db_path = data_dir / "doggy_toolbox.db"
+            self.db = DatabaseManager(self.db_path)
+            logger.info(f"NodeConverterService 使用独立数据库: {self.db_path}")
+
+        # Clash 配置生成用的单节点片段缓存：node_id -> (渲染输入指纹, 不含 name 行的片段行)
+        self._fragment_cache: Dict[str, Tuple[str, List[str]]] = {}
+        self._fragment_lock = threading.Lock()
+
+        self._import_legacy_nodes_md()
+        self._backfill_fingerprints()
+
+    def _import_legacy_nodes_md(self):
+        """一次性把旧版 nodes.md 中的节点导入 conversion_nodes 表"""
+        if self.db.get_by_id("db_metadata", self.NODES_MD_IMPORTED_KEY, "key"):
+            return
+        try:
+            nodes = self._parse_nodes_md() if self.count_nodes() == 0 else []
+            with self.db.transaction():
+                if nodes:
+                    self._insert_nodes(nodes)
+                    logger.info(f"已从 {self.nodes_file} 导入 {len(nodes)} 个节点")
+                self.db.insert("db_metadata", {"key": self.NODES_MD_IMPORTED_KEY, "value": "true"})
+        except Exception as e:
+            logger.error(f"导入 nodes.md 失败: {e}")
 
     # ========== 链接解析 ==========
     @staticmethod
@@ -200,34 +280,84 @@ class NodeConverterService:
             "    udp: true",
         ]
 
-    def render_yaml(self, nodes: List[Dict]) -> str:
-        if not nodes:
-            return "proxies: []\n"
-        lines = ["proxies:"]
+    def _render_node(self, node: Dict) -> List[str]:
+        if node["type"] == "vless":
+            return self._render_vless(node)
+        if node["type"] == "hysteria2":
+            return self._render_hysteria2(node)
+        if node["type"] == "ss":
+            return self._render_ss(node)
+        return []
+
+    def iter_proxy_yaml(self, nodes: Iterable[Dict]) -> Iterator[str]:
+        """逐个节点产出 proxies 下的 YAML 片段（不含 "proxies:" 头），便于边解析边输出"""
         for node in nodes:
-            if node["type"] == "vless":
-                lines.extend(self._render_vless(node))
-            elif node["type"] == "hysteria2":
-                lines.extend(self._render_hysteria2(node))
-            elif node["type"] == "ss":
-                lines.extend(self._render_ss(node))
-        return "\n".join(lines) + "\n"
+            lines = self._render_node(node)
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+    def iter_yaml(self, nodes: Iterable[Dict]) -> Iterator[str]:
+        """以生成器形式渲染完整 YAML，内容与 render_yaml 一致"""
+        fragments = self.iter_proxy_yaml(nodes)
+        first = next(fragments, None)
+        if first is None:
+            yield "proxies: []\n"
+            return
+        yield "proxies:\n"
+        yield first
+        yield from fragments
+
+    def render_yaml(self, nodes: List[Dict]) -> str:
+        return "".join(self.iter_yaml(nodes))
 
     # ========== 转换功能 ==========
     def convert_links(self, links_text: str) -> Dict:
-        links = [l.strip() for l in links_text.splitlines() if l.strip()]
-        nodes = []
-        errors = []
-        for idx, link in enumerate(links, 1):
+        return self._collect_links(links_text.splitlines())
+
+    def iter_links(self, lines: Iterable[str]) -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
+        """逐行解析节点链接，产出 (node, None) 或 (None, 错误信息)；空行不计序号"""
+        idx = 0
+        for line in lines:
+            link = line.strip()
+            if not link:
+                continue
+            idx += 1
             node = self.parse_link(link, idx)
             if node:
-                nodes.append(node)
+                yield node, None
             else:
-                errors.append(f"无法解析: {link[:50]}...")
-        yaml_output = self.render_yaml(nodes)
-        return {"nodes": nodes, "yaml": yaml_output, "errors": errors}
+                yield None, f"无法解析: {link[:50]}..."
+
+    def _collect_links(self, lines: Iterable[str],
+                       on_nodes: Callable[[List[Dict]], None] | None = None) -> Dict:
+        """消费逐行链接并汇总为 {nodes, yaml, errors}
 
-    def fetch_subscription(self, url: str) -> Dict:
+        on_nodes 非空时每解析出 SUBSCRIPTION_NODE_BATCH 个节点回调一次，
+        让前端在下载尚未结束时就能先展示部分节点。
+        """
+        nodes = []
+        errors = []
+        batch = []
+        for node, error in self.iter_links(lines):
+            if error:
+                errors.append(error)
+                continue
+            nodes.append(node)
+            if on_nodes is not None:
+                batch.append(node)
+                if len(batch) >= self.SUBSCRIPTION_NODE_BATCH:
+                    on_nodes(batch)
+                    batch = []
+        if on_nodes is not None and batch:
+            on_nodes(batch)
+        return {"nodes": nodes, "yaml": self.render_yaml(nodes), "errors": errors}
+
+    def fetch_subscription(self, url: str, timeout: float | None = None, use_cache: bool = True,
+                           on_nodes: Callable[[List[Dict]], None] | None = None) -> Dict:
+        """拉取并解析订阅
+
+        HTTP 订阅按块流式读取、增量 base64 解码、逐行解析；on_nodes 会在下载过程中分批收到已解析的节点。
+        """
         def maybe_decode_subscription_content(text: str) -> str:
             """尝试将订阅内容进行 base64 解码（兼容 urlsafe），失败则原样返回。"""
             raw = (text or "").strip()
@@ -272,20 +402,183 @@ class NodeConverterService:
             content = maybe_decode_subscription_content(url)
             return self.convert_links(content)
 
+        cached = self._get_subscription_cache(url) if use_cache else None
+        digest = hashlib.sha256()
         try:
-            ctx = ssl.create_default_context()
-            ctx.check_hostname = False
-            ctx.verify_mode = ssl.CERT_NONE
-            req = urllib.request.Request(url, headers={"User-Agent": "ClashForAndroid/2.5.12"})
-            with urllib.request.urlopen(req, timeout=15, context=ctx) as resp:
-                content = resp.read().decode("utf-8", errors="replace")
-            content = maybe_decode_subscription_content(content)
-            return self.convert_links(content)
+            with self._open_subscription(url, timeout=timeout, cached=cached) as resp:
+                # 304：直接复用上次解析结果，不再下载和解析
+                if cached and resp["status"] == 304:
+                    self._touch_subscription_cache(url, resp)
+                    return cached["data"]
+                chunks = self._hash_chunks(resp["chunks"], digest)
+                result = self._collect_links(self._iter_subscription_lines(chunks), on_nodes=on_nodes)
         except Exception as e:
             return {"nodes": [], "yaml": "", "errors": [str(e)]}
 
+        # 内容哈希未变：沿用缓存结果，省去缓存回写
+        content_hash = digest.hexdigest()
+        if cached and cached.get("content_hash") == content_hash:
+            self._touch_subscription_cache(url, resp)
+            return cached["data"]
+        if use_cache:
+            self._save_subscription_cache(url, resp, content_hash, result)
+        return result
+
+    @contextmanager
+    def _open_subscription(self, url: str, timeout: float | None = None,
+                           cached: Dict | None = None) -> Iterator[Dict]:
+        """打开订阅连接（不做解码/解析），供单个拉取和批量并发拉取共用
+
+        有缓存时带上 If-None-Match / If-Modified-Since 发起条件请求。
+
+        Yields:
+            {status, chunks, etag, last_modified}；chunks 为按块读取响应体的迭代器，304 时为空
+        """
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        headers = {"User-Agent": self.SUBSCRIPTION_USER_AGENT}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        req = urllib.request.Request(url, headers=headers)
+        try:
+            resp = urllib.request.urlopen(req, timeout=timeout or self.SUBSCRIPTION_TIMEOUT, context=ctx)
+        except urllib.error.HTTPError as e:
+            # urllib 把 304 当作异常抛出
+            if e.code == 304 and cached:
+                yield {
+                    "status": 304,
+                    "chunks": iter(()),
+                    "etag": e.headers.get("ETag") or cached.get("etag"),
+                    "last_modified": e.headers.get("Last-Modified") or cached.get("last_modified"),
+                }
+                return
+            raise
+        with resp:
+            yield {
+                "status": resp.status,
+                "chunks": iter(lambda: resp.read(self.SUBSCRIPTION_CHUNK_SIZE), b""),
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+
+    @staticmethod
+    def _hash_chunks(chunks: Iterable[bytes], digest) -> Iterator[bytes]:
+        for chunk in chunks:
+            digest.update(chunk)
+            yield chunk
+
+    # ========== 订阅内容流式解码 ==========
+    _BASE64_BYTES = re.compile(rb"[A-Za-z0-9+/=_-]+")
+    _WHITESPACE_BYTES = re.compile(rb"\s+")
+    # urlsafe 字母表统一转成标准字母表，两种编码可以用同一个解码器
+    _URLSAFE_TO_STD = bytes.maketrans(b"-_", b"+/")
+
+    @staticmethod
+    def _iter_text_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+        """UTF-8 字节块 -> 逐行文本（跨块的多字节字符和半行都会正确拼接）"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if "\n" not in text:
+                pending += text
+                continue
+            *lines, tail = (pending + text).split("\n")
+            pending = tail
+            yield from lines
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield from pending.split("\n")
+
+    def _iter_base64_bytes(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """base64 字节块 -> 解码后的字节块；每次只解码 4 的整数倍长度，余数留到下一块"""
+        rest = b""
+        for chunk in chunks:
+            data = rest + self._WHITESPACE_BYTES.sub(b"", chunk).translate(self._URLSAFE_TO_STD)
+            usable = len(data) // 4 * 4
+            rest = data[usable:]
+            if usable:
+                yield base64.b64decode(data[:usable])
+        rest = rest.rstrip(b"=")
+        if rest:
+            yield base64.b64decode(self._add_padding(rest.decode("ascii")))
+
+    def _iter_subscription_lines(self, chunks: Iterable[bytes]) -> Iterator[str]:
+        """订阅原始字节流 -> 逐行文本，兼容明文与（urlsafe）base64 订阅
+
+        判定规则与 maybe_decode_subscription_content 一致，但只看开头（至少 SUBSCRIPTION_SNIFF_SIZE 字节）：
+        开头含协议或换行、或不像 base64 时按明文处理；
+        开头解码结果不像节点列表时同样退回明文，避免误判导致乱码。
+        """
+        chunks = iter(chunks)
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if len(head.strip()) >= self.SUBSCRIPTION_SNIFF_SIZE:
+                break
+        raw = head.strip()
+        if not raw:
+            return
+        replay = itertools.chain([head], chunks)
+        if b"://" in raw or b"\n" in raw or b"\r" in raw or not self._BASE64_BYTES.fullmatch(raw):
+            yield from self._iter_text_lines(replay)
+            return
+
+        decoded = self._iter_base64_bytes(replay)
+        try:
+            first = next(decoded, b"")
+        except (binascii.Error, ValueError):
+            first = b""
+        if b"://" not in first and b"\n" not in first and b"\r" not in first:
+            # 首段解码失败或不像节点列表：按明文处理（已读取的部分需要重放）
+            yield from self._iter_text_lines(itertools.chain([head], chunks))
+            return
+        yield from self._iter_text_lines(itertools.chain([first], decoded))
+
+    # ========== 订阅缓存（条件请求 + 内容哈希） ==========
+    def _get_subscription_cache(self, url: str) -> Optional[Dict]:
+        try:
+            cached = self.db.get_by_id("subscription_cache", url, "url")
+        except Exception as e:
+            logger.warning(f"读取订阅缓存失败: {e}")
+            return None
+        if not cached or not isinstance(cached.get("data"), dict):
+            return None
+        return cached
+
+    def _save_subscription_cache(self, url: str, resp: Dict, content_hash: str, result: Dict):
+        try:
+            self.db.upsert_many("subscription_cache", [{
+                "url": url,
+                "etag": resp.get("etag"),
+                "last_modified": resp.get("last_modified"),
+                "content_hash": content_hash,
+                "data": result,
+                "fetched_at": datetime.now().isoformat(),
+            }], conflict_columns=("url",))
+        except Exception as e:
+            logger.warning(f"写入订阅缓存失败: {e}")
+
+    def _touch_subscription_cache(self, url: str, resp: Dict):
+        """内容未变时只刷新校验头和拉取时间"""
+        self.db.update("subscription_cache", {
+            "etag": resp.get("etag"),
+            "last_modified": resp.get("last_modified"),
+            "fetched_at": datetime.now().isoformat(),
+        }, "url = ?", (url,))
+
+    def clear_subscription_cache(self, url: str | None = None) -> bool:
+        """清空订阅缓存；传入 url 时只清除该订阅"""
+        if url:
+            return self.db.delete("subscription_cache", "url = ?", (url.strip(),))
+        return self.db.delete("subscription_cache", "1 = 1")
+
     # ========== 节点管理 ==========
-    # ========== 节点存储与标签管理 ==========
+    # ========== nodes.md 兼容（旧数据导入与可选导出） ==========
     def _parse_nodes_md(self) -> List[ProxyNode]:
         if not self.nodes_file.exists():
             return []
@@ -341,8 +634,9 @@ class NodeConverterService:
 
         return nodes
 
-    def _save_nodes_md(self, nodes: List[ProxyNode]):
-        self.nodes_file.parent.mkdir(parents=True, exist_ok=True)
+    def _save_nodes_md(self, nodes: List[ProxyNode], path: Path | None = None):
+        target = path or self.nodes_file
+        target.parent.mkdir(parents=True, exist_ok=True)
         lines = ["# 代理节点", ""]
         for node in nodes:
             lines.append(f"## {node.name}")
@@ -360,87 +654,592 @@ class NodeConverterService:
                 lines.append(node.config["yaml"])
                 lines.append("```")
             lines.append("")
-        self.nodes_file.write_text("\n".join(lines), encoding="utf-8")
+        target.write_text("\n".join(lines), encoding="utf-8")
+
+    def export_nodes_md(self, path: Path | None = None) -> Dict:
+        """把数据库中的节点导出为 Markdown（默认写到 nodes_file）"""
+        target = Path(path) if path else self.nodes_file
+        try:
+            nodes = [self._row_to_node(r) for r in self._query_nodes()]
+            self._save_nodes_md(nodes, target)
+            return {"success": True, "path": str(target), "count": len(nodes)}
+        except Exception as e:
+            logger.error(f"导出 nodes.md 失败: {e}")
+            return {"success": False, "error": str(e)}
+
+    # ========== 节点表读写 ==========
+    # 节点行以 node_type 非空区分；旧版迁移写入的 Markdown 片段（node_type 为空）不参与节点列表
+    _NODE_FILTER = "node_type IS NOT NULL"
+
+    def _query_nodes(self, where: str = "", params: tuple = ()) -> List[Dict]:
+        condition = self._NODE_FILTER + (f" AND {where}" if where else "")
+        return self.db.get_all("conversion_nodes", where=condition, params=params,
+                               order_by="order_index ASC")
+
+    @staticmethod
+    def _row_to_node(row: Dict) -> ProxyNode:
+        tags = row.get("tags")
+        return ProxyNode(
+            id=row.get("id", ""),
+            name=row.get("title", ""),
+            type=row.get("node_type", "") or "",
+            server=row.get("server", "") or "",
+            port=row.get("port", 0) or 0,
+            raw_link=row.get("raw_link", "") or "",
+            config={"yaml": row.get("content", "") or ""},
+            tags=tags if isinstance(tags, list) else [],
+        )
+
+    @staticmethod
+    def _clean_tags(tags: List[str] | None) -> List[str]:
+        """去空白、去重并保持原顺序"""
+        seen = []
+        for tag in tags or []:
+            tag = str(tag).strip()
+            if tag and tag not in seen:
+                seen.append(tag)
+        return seen
+
+    def _next_node_id(self) -> str:
+        rows = self.db.execute_query(
+            f"SELECT MAX(CAST(id AS INTEGER)) AS max_id FROM conversion_nodes WHERE {self._NODE_FILTER}"
+        )
+        max_id = rows[0]["max_id"] if rows else None
+        return str((max_id if max_id is not None else -1) + 1)
+
+    def _next_node_order(self) -> int:
+        rows = self.db.execute_query(
+            f"SELECT MAX(order_index) AS max_order FROM conversion_nodes WHERE {self._NODE_FILTER}"
+        )
+        max_order = rows[0]["max_order"] if rows else None
+        return (max_order if max_order is not None else -1) + 1
+
+    def _insert_nodes(self, nodes: List[ProxyNode], start_order: int | None = None):
+        """批量写入节点及其标签索引（调用方负责事务）"""
+        order = self._next_node_order() if start_order is None else start_order
+        node_rows = []
+        tag_rows = []
+        for offset, node in enumerate(nodes):
+            node.tags = self._clean_tags(node.tags)
+            node_rows.append({
+                "id": node.id,
+                "title": node.name,
+                "content": (node.config or {}).get("yaml", "") or "",
+                "category": node.type,
+                "node_type": node.type or "",
+                "server": node.server,
+                "port": node.port,
+                "raw_link": node.raw_link,
+                "fingerprint": self._node_fingerprint(node),
+                "tags": node.tags,
+                "order_index": order + offset,
+            })
+            tag_rows.extend({"node_id": node.id, "tag": tag} for tag in node.tags)
+        self.db.insert_many("conversion_nodes", node_rows)
+        if tag_rows:
+            self.db.insert_many("conversion_node_tags", tag_rows)
+
+    def count_nodes(self) -> int:
+        rows = self.db.execute_query(
+            f"SELECT COUNT(*) AS total FROM conversion_nodes WHERE {self._NODE_FILTER}"
+        )
+        return rows[0]["total"] if rows else 0
 
     def get_nodes(self) -> List[Dict]:
-        return [asdict(n) for n in self._parse_nodes_md()]
+        return [asdict(self._row_to_node(r)) for r in self._query_nodes()]
 
     def save_node(self, name: str, node_type: str, server: str, port: int, raw_link: str, yaml_config: str, tags: List[str] = None) -> Dict:
-        all_nodes = self._parse_nodes_md()
-        new_id = str(max((int(n.id) for n in all_nodes), default=-1) + 1)
-        new_node = ProxyNode(
-            id=new_id, name=name, type=node_type, server=server,
-            port=port, raw_link=raw_link, config={"yaml": yaml_config}, tags=tags or []
-        )
-        all_nodes.append(new_node)
-        self._save_nodes_md(all_nodes)
+        """保存单个节点；与已有节点指纹相同时不新增，只把标签合并到已有节点
+
+        Returns:
+            节点字典；命中重复时为已有节点，并带 deduplicated=True
+        """
+        with self.db.transaction():
+            new_node = ProxyNode(
+                id="", name=name, type=node_type, server=server,
+                port=port, raw_link=raw_link, config={"yaml": yaml_config}, tags=tags or []
+            )
+            rows = self._query_nodes("fingerprint = ?", (self._node_fingerprint(new_node),))
+            if rows:
+                existing = self._merge_duplicate(rows[0], new_node.tags)
+                return {**asdict(existing), "deduplicated": True}
+            new_node.id = self._next_node_id()
+            self._insert_nodes([new_node])
         return asdict(new_node)
 
+    def save_nodes(self, nodes: List[Dict], tags: List[str] = None) -> Dict:
+        """批量保存转换结果中的节点（单事务），按指纹跳过重复节点
+
+        Args:
+            nodes: parse_link 产出的节点字典列表
+            tags: 给新节点统一附加的标签；命中重复时合并到已有节点
+
+        Returns:
+            {success, saved, deduplicated: [{name, existing_id}]}
+        """
+        extra_tags = self._clean_tags(tags)
+        deduplicated = []
+        to_insert: List[ProxyNode] = []
+        with self.db.transaction():
+            # 一次取出全部指纹，之后每个节点 O(1) 判重（同批内的重复也会被跳过）
+            known = self._fingerprint_index()
+            next_id = int(self._next_node_id())
+            for node in nodes or []:
+                candidate = ProxyNode(
+                    id="", name=node.get("name", ""), type=node.get("type", ""),
+                    server=node.get("server", ""), port=node.get("port", 0), raw_link="",
+                    config={"yaml": json.dumps(node, ensure_ascii=False, indent=2)},
+                    tags=list(extra_tags),
+                )
+                fingerprint = self._node_fingerprint(candidate)
+                existing_id = known.get(fingerprint)
+                if existing_id is not None:
+                    deduplicated.append({"name": candidate.name, "existing_id": existing_id})
+                    if extra_tags:
+                        rows = self._query_nodes("id = ?", (existing_id,))
+                        if rows:
+                            self._merge_duplicate(rows[0], extra_tags)
+                    continue
+                candidate.id = str(next_id)
+                next_id += 1
+                known[fingerprint] = candidate.id
+                to_insert.append(candidate)
+            if to_insert:
+                self._insert_nodes(to_insert)
+        return {
+            "success": True,
+            "saved": len(to_insert),
+            "deduplicated": deduplicated,
+        }
+
     def delete_node(self, id: str) -> bool:
-        all_nodes = self._parse_nodes_md()
-        new_nodes = [n for n in all_nodes if n.id != id]
-        if len(new_nodes) < len(all_nodes):
-            self._save_nodes_md(new_nodes)
-            return True
-        return False
+        # conversion_node_tags 通过外键 ON DELETE CASCADE 一并删除
+        return self.db.execute_update(
+            f"DELETE FROM conversion_nodes WHERE id = ? AND {self._NODE_FILTER}", (id,)
+        ) > 0
+
+    # ========== 节点去重（协议指纹） ==========
+    def _node_fingerprint(self, node: ProxyNode) -> str:
+        """(type, server, port, uuid/password, sni) -> 指纹
+
+        uuid/password/sni 优先从分享链接解析，否则从保存时的 JSON 配置里取；
+        两者都没有时只按 type/server/port 判重。
+        """
+        detail = self.parse_link(node.raw_link) if node.raw_link else None
+        if not detail:
+            try:
+                detail = json.loads((node.config or {}).get("yaml") or "")
+            except (ValueError, TypeError):
+                detail = None
+        if not isinstance(detail, dict):
+            detail = {}
+        secret = detail.get("uuid") or detail.get("password") or ""
+        sni = detail.get("servername") or detail.get("sni") or ""
+        key = "|".join([
+            (node.type or "").lower(),
+            (node.server or "").strip().lower(),
+            str(node.port or ""),
+            str(secret),
+            str(sni).lower(),
+        ])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _fingerprint_index(self) -> Dict[str, str]:
+        """fingerprint -> 最早保存的节点 ID"""
+        rows = self.db.execute_query(
+            f"SELECT id, fingerprint FROM conversion_nodes WHERE {self._NODE_FILTER} "
+            "AND fingerprint IS NOT NULL ORDER BY order_index DESC"
+        )
+        return {r["fingerprint"]: r["id"] for r in rows}
+
+    def _merge_duplicate(self, row: Dict, tags: List[str]) -> ProxyNode:
+        """重复节点不新增，只把新标签并入已有节点"""
+        existing = self._row_to_node(row)
+        merged = self._clean_tags(existing.tags + self._clean_tags(tags))
+        if merged != existing.tags:
+            self.update_node_tags(existing.id, merged)
+            existing.tags = merged
+        return existing
+
+    def _backfill_fingerprints(self):
+        """为升级前保存的节点补算指纹"""
+        try:
+            rows = self._query_nodes("fingerprint IS NULL")
+            if rows:
+                self.db.execute_many(
+                    "UPDATE conversion_nodes SET fingerprint = ? WHERE id = ?",
+                    [(self._node_fingerprint(self._row_to_node(r)), r["id"]) for r in rows],
+                )
+        except Exception as e:
+            logger.error(f"补算节点指纹失败: {e}")
+
+    def find_duplicate_nodes(self) -> List[Dict]:
+        """列出已保存节点中指纹重复的分组（保留第一个，其余为重复项）"""
+        rows = self.db.execute_query(f"""
+            SELECT fingerprint, GROUP_CONCAT(id) AS ids, COUNT(*) AS total
+            FROM conversion_nodes
+            WHERE {self._NODE_FILTER} AND fingerprint IS NOT NULL
+            GROUP BY fingerprint HAVING COUNT(*) > 1
+        """)
+        return [{"fingerprint": r["fingerprint"], "ids": r["ids"].split(","), "count": r["total"]} for r in rows]
 
     # ========== 标签管理 ==========
     def update_node_tags(self, node_id: str, tags: List[str]) -> Optional[Dict]:
         """更新节点标签"""
-        all_nodes = self._parse_nodes_md()
-        for node in all_nodes:
-            if node.id == node_id:
-                node.tags = [t.strip() for t in tags if t.strip()]
-                self._save_nodes_md(all_nodes)
-                return asdict(node)
-        return None
+        clean = self._clean_tags(tags)
+        with self.db.transaction():
+            rows = self._query_nodes("id = ?", (node_id,))
+            if not rows:
+                return None
+            self.db.update("conversion_nodes", {"tags": clean}, "id = ?", (node_id,))
+            self.db.execute_update("DELETE FROM conversion_node_tags WHERE node_id = ?", (node_id,))
+            if clean:
+                self.db.insert_many("conversion_node_tags", [{"node_id": node_id, "tag": t} for t in clean])
+        node = self._row_to_node(rows[0])
+        node.tags = clean
+        return asdict(node)
 
     def get_nodes_by_tag(self, tag: str) -> List[Dict]:
         """根据标签筛选节点"""
-        all_nodes = self._parse_nodes_md()
-        filtered = [n for n in all_nodes if tag in (n.tags or [])]
-        return [asdict(n) for n in filtered]
+        rows = self.db.execute_query(f"""
+            SELECT n.* FROM conversion_nodes n
+            JOIN conversion_node_tags t ON t.node_id = n.id
+            WHERE t.tag = ? AND n.{self._NODE_FILTER}
+            ORDER BY n.order_index ASC
+        """, (tag,))
+        return [asdict(self._row_to_node(self.db._deserialize_json_fields(r))) for r in rows]
 
     def get_all_tags(self) -> List[str]:
         """获取所有标签"""
-        all_nodes = self._parse_nodes_md()
-        tags_set = set()
-        for node in all_nodes:
-            if node.tags:
-                tags_set.update(node.tags)
-        return sorted(list(tags_set))
+        rows = self.db.execute_query("SELECT DISTINCT tag FROM conversion_node_tags ORDER BY tag ASC")
+        return [r["tag"] for r in rows]
+
+    # ========== Clash 完整配置生成 ==========
+    PROFILE_GROUP_SELECT = "🚀 节点选择"
+    PROFILE_GROUP_AUTO = "♻️ 自动选择"
+    PROFILE_TEST_URL = "http://www.gstatic.com/generate_204"
+    PROFILE_TEST_INTERVAL = 300
+
+    @staticmethod
+    def _yaml_str(value: str) -> str:
+        # JSON 字符串同时是合法的 YAML 双引号标量，可安全容纳 : # [ 等特殊字符
+        return json.dumps(str(value), ensure_ascii=False)
+
+    def _node_fragment(self, node: ProxyNode) -> Optional[List[str]]:
+        """单个已保存节点 -> proxies 下的片段行（不含 name 行），按渲染输入指纹缓存
+
+        标签、排序等变化不影响渲染输入，重新生成配置时直接复用缓存。
+        """
+        source = "\x00".join([node.type, node.server, str(node.port), node.raw_link,
+                              (node.config or {}).get("yaml", "")])
+        source_key = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        with self._fragment_lock:
+            cached = self._fragment_cache.get(node.id)
+        if cached and cached[0] == source_key:
+            return cached[1]
+
+        body = self._render_fragment(node)
+        with self._fragment_lock:
+            self._fragment_cache[node.id] = (source_key, body)
+        return body
+
+    def _render_fragment(self, node: ProxyNode) -> Optional[List[str]]:
+        detail = self.parse_link(node.raw_link) if node.raw_link else None
+        content = (node.config or {}).get("yaml", "") or ""
+        if not detail:
+            try:
+                detail = json.loads(content)
+            except (ValueError, TypeError):
+                detail = None
+        if isinstance(detail, dict) and detail.get("type"):
+            try:
+                lines = self._render_node(detail)
+            except KeyError:
+                lines = []
+            return lines[1:] if lines else None
+
+        # 旧版 nodes.md 中直接保存的 YAML 片段（"- name: ..." 形式）：去掉 name 行后统一缩进到 proxies 下
+        lines = [l.rstrip() for l in content.splitlines() if l.strip()]
+        if not lines or not lines[0].lstrip().startswith("- "):
+            return None
+        base = len(lines[0]) - len(lines[0].lstrip()) + 2
+        entries = [(0, lines[0].lstrip()[2:])]
+        entries += [(len(l) - len(l.lstrip()) - base, l.lstrip()) for l in lines[1:]]
+        return [
+            "    " + " " * max(depth, 0) + text
+            for depth, text in entries
+            if not (depth <= 0 and text.startswith("name:"))
+        ]
+
+    @staticmethod
+    def _detect_region(name: str) -> Optional[str]:
+        upper = name.upper()
+        for region, keywords in REGION_KEYWORDS:
+            for keyword in keywords:
+                # 英文缩写按单词边界匹配，避免 "US" 命中 "Russia" 之类
+                if keyword.isascii() and keyword.isalpha():
+                    if re.search(rf"(?<![A-Z]){re.escape(keyword.upper())}(?![A-Z])", upper):
+                        return region
+                elif keyword in name:
+                    return region
+        return None
+
+    def iter_profile(
+        self,
+        node_ids: List[str] | None = None,
+        group_by: List[str] | None = None,
+        rules: List[str] | None = None,
+        test_url: str | None = None,
+        interval: int | None = None,
+        stats: Dict | None = None,
+    ) -> Iterator[str]:
+        """以生成器形式产出完整 Clash 配置
+
+        Args:
+            node_ids: 只包含这些节点，为空时包含全部已保存节点
+            group_by: 额外分组方式，可选 "region"（地区 url-test 组）、"tag"（标签 select 组）
+            rules: 自定义规则（不含最后的 MATCH），为空时使用 DEFAULT_PROFILE_RULES
+            test_url / interval: url-test 分组的测速地址与间隔（秒）
+            stats: 传入字典时写回 {proxies, rendered, skipped}，便于观察缓存命中情况
+        """
+        group_by = ["region", "tag"] if group_by is None else list(group_by)
+        test_url = test_url or self.PROFILE_TEST_URL
+        interval = int(interval or self.PROFILE_TEST_INTERVAL)
+        if node_ids:
+            placeholders = ", ".join("?" for _ in node_ids)
+            rows = self._query_nodes(f"id IN ({placeholders})", tuple(str(i) for i in node_ids))
+        else:
+            rows = self._query_nodes()
+
+        with self._fragment_lock:
+            cached_before = dict(self._fragment_cache)
+        names: List[str] = []
+        used = set()
+        proxies: List[Tuple[str, List[str]]] = []
+        by_region: Dict[str, List[str]] = {}
+        by_tag: Dict[str, List[str]] = {}
+        skipped = 0
+        for row in rows:
+            node = self._row_to_node(row)
+            body = self._node_fragment(node)
+            if not body:
+                skipped += 1
+                continue
+            # Clash 要求代理名唯一，重名时追加序号
+            base = node.name.strip() or f"{node.type}-{node.id}"
+            name, suffix = base, 2
+            while name in used:
+                name, suffix = f"{base} {suffix}", suffix + 1
+            used.add(name)
+            names.append(name)
+            proxies.append((name, body))
+            region = self._detect_region(node.name) if "region" in group_by else None
+            if region:
+                by_region.setdefault(region, []).append(name)
+            if "tag" in group_by:
+                for tag in node.tags:
+                    by_tag.setdefault(tag, []).append(name)
+
+        if stats is not None:
+            stats.update({
+                "proxies": len(proxies),
+                "rendered": sum(1 for r in rows if cached_before.get(r["id"]) != self._fragment_cache.get(r["id"])),
+                "skipped": skipped,
+            })
+        with self._fragment_lock:
+            # 清理已删除节点的缓存（仅在全量生成时，避免子集生成误删）
+            if not node_ids:
+                live = {r["id"] for r in rows}
+                for stale in [k for k in self._fragment_cache if k not in live]:
+                    del self._fragment_cache[stale]
+
+        yield "mixed-port: 7890\nallow-lan: false\nmode: rule\nlog-level: info\n"
+        if not proxies:
+            yield "proxies: []\n"
+        else:
+            yield "proxies:\n"
+            for name, body in proxies:
+                yield "\n".join([f"  - name: {self._yaml_str(name)}"] + body) + "\n"
+
+        region_groups = [region for region, _ in REGION_KEYWORDS if region in by_region]
+        # 分组名与代理名共用命名空间，和已有名称冲突的标签不单独成组
+        reserved = used | set(region_groups) | {self.PROFILE_GROUP_SELECT, self.PROFILE_GROUP_AUTO}
+        tag_groups = sorted(t for t in by_tag if t not in reserved)
+        members = lambda items: "".join(f"      - {self._yaml_str(i)}\n" for i in items)
+
+        yield "proxy-groups:\n"
+        select_members = ([self.PROFILE_GROUP_AUTO] if names else []) + region_groups \
+            + tag_groups + names + ["DIRECT"]
+        yield (f"  - name: {self._yaml_str(self.PROFILE_GROUP_SELECT)}\n    type: select\n    proxies:\n"
+               + members(select_members))
+        if names:
+            yield self._url_test_group(self.PROFILE_GROUP_AUTO, names, test_url, interval, members)
+        for region in region_groups:
+            yield self._url_test_group(region, by_region[region], test_url, interval, members)
+        for tag in tag_groups:
+            yield f"  - name: {self._yaml_str(tag)}\n    type: select\n    proxies:\n" + members(by_tag[tag])
+
+        yield "rules:\n"
+        for rule in (DEFAULT_PROFILE_RULES if rules is None else rules):
+            rule = str(rule).strip()
+            if rule and not rule.upper().startswith("MATCH,"):
+                yield f"  - {rule}\n"
+        yield f"  - MATCH,{self.PROFILE_GROUP_SELECT}\n"
+
+    def _url_test_group(self, name: str, proxies: List[str], test_url: str, interval: int, members) -> str:
+        return (
+            f"  - name: {self._yaml_str(name)}\n"
+            "    type: url-test\n"
+            f"    url: {test_url}\n"
+            f"    interval: {interval}\n"
+            "    tolerance: 50\n"
+            "    proxies:\n" + members(proxies)
+        )
+
+    def build_profile(self, node_ids: List[str] | None = None, group_by: List[str] | None = None,
+                      rules: List[str] | None = None) -> Dict:
+        """生成完整 Clash 配置文本（proxies + proxy-groups + rules）"""
+        stats: Dict = {}
+        try:
+            yaml_text = "".join(self.iter_profile(node_ids, group_by=group_by, rules=rules, stats=stats))
+        except Exception as e:
+            logger.error(f"生成 Clash 配置失败: {e}")
+            return {"success": False, "error": str(e)}
+        return {"success": True, "yaml": yaml_text, **stats}
 
-    # ========== 批量导入 ==========
     # ========== 批量导入、校验与分享链接 ==========
-    def batch_import_subscriptions(self, urls: List[str]) -> Dict:
-        """批量导入多个订阅链接"""
+    def batch_import_subscriptions(
+        self,
+        urls: List[str],
+        concurrency: int | None = None,
+        per_host_limit: int | None = None,
+        deadline: float | None = None,
+        progress_callback: Callable[[Dict], None] | None = None,
+        save: bool = False,
+    ) -> Dict:
+        """批量导入多个订阅链接（并发拉取）
+
+        Args:
+            urls: 订阅链接列表，空行会被忽略
+            concurrency: 同时拉取的链接数上限
+            per_host_limit: 同一主机同时拉取的链接数上限，避免同一机场被并发打满
+            deadline: 整批的总时限（秒），超时未完成的链接记为错误
+            progress_callback: 每个链接完成时回调一次，参数见 _report_progress
+            save: 是否把拉取到的节点保存到节点列表（按指纹去重）
+
+        Returns:
+            与串行版本相同的结构：results（按输入顺序）、total_nodes、total_errors；
+            save=True 时额外包含 saved_nodes 与 deduplicated（见 save_nodes）
+        """
+        items = [u.strip() for u in urls or [] if u and u.strip()]
+        concurrency = max(1, int(concurrency or self.SUBSCRIPTION_CONCURRENCY))
+        per_host_limit = max(1, int(per_host_limit or self.SUBSCRIPTION_PER_HOST_LIMIT))
+        deadline_at = time.monotonic() + float(deadline or self.SUBSCRIPTION_DEADLINE)
+
+        host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        host_lock = threading.Lock()
+        progress_lock = threading.Lock()
+        outcomes: List[Optional[Dict]] = [None] * len(items)
+        completed = 0
+
+        def host_slot(url: str) -> threading.BoundedSemaphore:
+            host = (urlparse(url).hostname or "").lower()
+            with host_lock:
+                if host not in host_slots:
+                    host_slots[host] = threading.BoundedSemaphore(per_host_limit)
+                return host_slots[host]
+
+        def record(index: int, result: Dict, status: str):
+            nonlocal completed
+            with progress_lock:
+                if outcomes[index] is not None:
+                    return
+                outcomes[index] = result
+                completed += 1
+                done = completed
+            self._report_progress(progress_callback, index, items[index], result, status, done, len(items))
+
+        def fetch_one(index: int):
+            url = items[index]
+            slot = host_slot(url)
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0 or not slot.acquire(timeout=remaining):
+                record(index, {"nodes": [], "errors": ["超出批量导入总时限"]}, "timeout")
+                return
+            try:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    record(index, {"nodes": [], "errors": ["超出批量导入总时限"]}, "timeout")
+                    return
+                result = self.fetch_subscription(url, timeout=min(self.SUBSCRIPTION_TIMEOUT, remaining))
+            except Exception as e:
+                result = {"nodes": [], "errors": [str(e)]}
+            finally:
+                slot.release()
+            record(index, result, "error" if result.get("errors") and not result.get("nodes") else "done")
+
+        if items:
+            executor = ThreadPoolExecutor(max_workers=min(concurrency, len(items)), thread_name_prefix="subscription")
+            try:
+                pending = {executor.submit(fetch_one, i) for i in range(len(items))}
+                while pending:
+                    remaining = deadline_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    _, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            finally:
+                # 不等待仍在阻塞读取的线程，它们会在各自的 socket 超时后自然结束
+                executor.shutdown(wait=False, cancel_futures=True)
+            for index, outcome in enumerate(outcomes):
+                if outcome is None:
+                    record(index, {"nodes": [], "errors": ["超出批量导入总时限"]}, "timeout")
+
         results = []
         total_nodes = 0
         total_errors = []
-
-        for url in urls:
-            url = url.strip()
-            if not url:
-                continue
-
-            result = self.fetch_subscription(url)
+        for url, result in zip(items, outcomes):
             nodes_count = len(result.get('nodes', []))
             total_nodes += nodes_count
-
             results.append({
-                'url': url[:50] + '...' if len(url) > 50 else url,
+                'url': self._short_url(url),
                 'nodes_count': nodes_count,
                 'errors': result.get('errors', [])
             })
-
             if result.get('errors'):
                 total_errors.extend(result['errors'])
 
-        return {
+        summary = {
             'results': results,
             'total_nodes': total_nodes,
             'total_errors': total_errors
         }
+        if save:
+            saved = self.save_nodes([n for r in outcomes for n in r.get('nodes', [])])
+            summary['saved_nodes'] = saved['saved']
+            summary['deduplicated'] = saved['deduplicated']
+        return summary
+
+    @staticmethod
+    def _short_url(url: str) -> str:
+        return url[:50] + '...' if len(url) > 50 else url
+
+    def _report_progress(self, callback: Callable[[Dict], None] | None, index: int, url: str,
+                         result: Dict, status: str, completed: int, total: int):
+        """单个订阅完成后的进度回调；回调异常只记日志，不影响整批导入"""
+        if callback is None:
+            return
+        try:
+            callback({
+                'index': index,
+                'url': self._short_url(url),
+                'status': status,
+                'nodes_count': len(result.get('nodes', [])),
+                'errors': result.get('errors', []),
+                'completed': completed,
+                'total': total,
+            })
+        except Exception as e:
+            logger.warning(f"订阅导入进度回调失败: {e}")
 
     # ========== 节点验证 ==========
     def validate_node(self, node: Dict) -> Dict:
@@ -505,6 +1304,138 @@ class NodeConverterService:
             })
         return results
 
+    # ========== 连通性与延迟探测 ==========
+    def _build_probe_target(self, node: Dict, tls: bool) -> Optional[ProbeTarget]:
+        """节点行 -> 探测目标；UDP 协议节点返回 None"""
+        node_type = (node.get("node_type") or "").lower()
+        if node_type in UDP_NODE_TYPES:
+            return None
+        sni = ""
+        use_tls = False
+        if tls and node_type == "vless":
+            # 本项目渲染的 VLESS 节点一律 tls: true，SNI 取分享链接里的 sni 参数
+            use_tls = True
+            parsed = self.parse_link(node.get("raw_link") or "") or {}
+            sni = parsed.get("servername") or ""
+        return ProbeTarget(
+            node_id=node["id"], server=node.get("server") or "",
+            port=int(node.get("port") or 0), tls=use_tls, sni=sni,
+        )
+
+    def probe_nodes(
+        self,
+        node_ids: List[str] | None = None,
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        attempts: int | None = None,
+        tls: bool = True,
+        progress_callback: Callable[[Dict], None] | None = None,
+    ) -> Dict:
+        """并发探测节点的 TCP 连通性（VLESS 额外做 TLS 握手）与延迟
+
+        Args:
+            node_ids: 要探测的节点 ID，为空时探测全部节点
+            concurrency: 同时探测的节点数
+            timeout: 单次连接超时（秒）
+            attempts: 每个节点采样次数，用于计算中位数与抖动
+            tls: 是否对 TLS 节点做握手计时
+            progress_callback: 每个节点探测完成时回调一次
+
+        Returns:
+            {success, results, total, reachable}；results 按延迟中位数升序，不可达的排在最后
+        """
+        if node_ids:
+            placeholders = ", ".join("?" for _ in node_ids)
+            rows = self._query_nodes(f"id IN ({placeholders})", tuple(str(i) for i in node_ids))
+        else:
+            rows = self._query_nodes()
+        names = {r["id"]: r.get("title", "") for r in rows}
+
+        targets = []
+        skipped = []
+        for row in rows:
+            target = self._build_probe_target(row, tls)
+            if target is None or not target.server or not (1 <= target.port <= 65535):
+                skipped.append(ProbeResult(
+                    node_id=row["id"], reachable=False,
+                    error="UDP 协议暂不支持 TCP 探测" if target is None else "服务器地址或端口无效",
+                ))
+            else:
+                targets.append(target)
+
+        total = len(rows)
+        completed = 0
+        lock = threading.Lock()
+
+        def on_result(result: ProbeResult):
+            nonlocal completed
+            with lock:
+                completed += 1
+                done = completed
+            if progress_callback is None:
+                return
+            try:
+                progress_callback({
+                    **result.to_dict(),
+                    "name": names.get(result.node_id, ""),
+                    "completed": done,
+                    "total": total,
+                })
+            except Exception as e:
+                logger.warning(f"节点探测进度回调失败: {e}")
+
+        for result in skipped:
+            on_result(result)
+        try:
+            probed = probe_many_sync(
+                targets,
+                concurrency=int(concurrency or self.PROBE_CONCURRENCY),
+                timeout=float(timeout or self.PROBE_TIMEOUT),
+                attempts=int(attempts or self.PROBE_ATTEMPTS),
+                on_result=on_result,
+            ) if targets else []
+        except Exception as e:
+            logger.error(f"节点探测失败: {e}")
+            return {"success": False, "error": str(e)}
+
+        results = probed + skipped
+        self._save_probe_results(results)
+        results.sort(key=lambda r: (not r.reachable, r.median_ms if r.median_ms is not None else 0))
+        return {
+            "success": True,
+            "results": [{**r.to_dict(), "name": names.get(r.node_id, "")} for r in results],
+            "total": total,
+            "reachable": sum(1 for r in results if r.reachable),
+        }
+
+    def _save_probe_results(self, results: List[ProbeResult]):
+        probed_at = datetime.now().isoformat()
+        try:
+            self.db.upsert_many("node_probe_results", [{
+                "node_id": r.node_id,
+                "reachable": 1 if r.reachable else 0,
+                "median_ms": r.median_ms,
+                "jitter_ms": r.jitter_ms,
+                "min_ms": r.min_ms,
+                "failures": r.failures,
+                "attempts": r.attempts,
+                "tls": 1 if r.tls else 0,
+                "error": r.error,
+                "probed_at": probed_at,
+            } for r in results], conflict_columns=("node_id",))
+        except Exception as e:
+            logger.warning(f"保存节点探测结果失败: {e}")
+
+    def get_probe_results(self) -> List[Dict]:
+        """最近一次探测结果（按节点），reachable/tls 转为布尔值"""
+        rows = self.db.execute_query(
+            "SELECT * FROM node_probe_results ORDER BY reachable DESC, median_ms ASC"
+        )
+        for row in rows:
+            row["reachable"] = bool(row["reachable"])
+            row["tls"] = bool(row["tls"])
+        return rows
+
     # ========== 分享链接生成 ==========
     def generate_share_link(self, node: Dict) -> Optional[str]:
         """生成节点分享链接"""
@@ -0,0 +1,143 @@
+"""节点连通性与延迟探测。
+
+对节点的 server:port 做 TCP 连接（可选再做一次 TLS 握手）并计时，
+用 asyncio 在单线程内并发探测大量节点；每个节点多次采样后给出中位数、抖动和失败次数。
+由 NodeConverterService.probe_nodes 调用，结果落库到 node_probe_results 表。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ssl
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# 基于 UDP/QUIC 的协议无法用 TCP 连接探测
+UDP_NODE_TYPES = {"hysteria2", "hysteria", "tuic"}
+
+
+@dataclass
+class ProbeTarget:
+    node_id: str
+    server: str
+    port: int
+    tls: bool = False
+    sni: str = ""
+
+
+@dataclass
+class ProbeResult:
+    node_id: str
+    reachable: bool
+    median_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    min_ms: Optional[float] = None
+    failures: int = 0
+    attempts: int = 0
+    tls: bool = False
+    error: str = ""
+    samples: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "node_id": self.node_id,
+            "reachable": self.reachable,
+            "median_ms": self.median_ms,
+            "jitter_ms": self.jitter_ms,
+            "min_ms": self.min_ms,
+            "failures": self.failures,
+            "attempts": self.attempts,
+            "tls": self.tls,
+            "error": self.error,
+        }
+
+
+def _tls_context() -> ssl.SSLContext:
+    # 只关心握手耗时与可达性，不校验证书（很多节点使用自签或伪装证书）
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+async def _measure_once(target: ProbeTarget, timeout: float, ctx: Optional[ssl.SSLContext]) -> float:
+    """单次采样：TCP 连接（+ TLS 握手）耗时，单位毫秒"""
+    start = time.perf_counter()
+    kwargs = {}
+    if target.tls and ctx is not None:
+        kwargs = {"ssl": ctx, "server_hostname": target.sni or target.server}
+    _, writer = await asyncio.wait_for(
+        asyncio.open_connection(target.server, target.port, **kwargs), timeout=timeout
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    writer.close()
+    try:
+        await asyncio.wait_for(writer.wait_closed(), timeout=1)
+    except Exception:
+        pass
+    return elapsed
+
+
+async def probe_target(target: ProbeTarget, timeout: float = 3.0, attempts: int = 3,
+                       ctx: Optional[ssl.SSLContext] = None) -> ProbeResult:
+    """对单个节点多次采样并汇总"""
+    samples: List[float] = []
+    last_error = ""
+    if target.tls and ctx is None:
+        ctx = _tls_context()
+    for _ in range(max(1, attempts)):
+        try:
+            samples.append(await _measure_once(target, timeout, ctx))
+        except asyncio.TimeoutError:
+            last_error = f"超时 ({timeout}s)"
+        except (OSError, ssl.SSLError) as e:
+            last_error = str(e) or type(e).__name__
+        except ValueError as e:
+            # 主机名非法（如 "a..b"、标签超过 63 字符）时 IDNA 编码抛 UnicodeError，重试也不会成功
+            last_error = f"无效的地址: {e}"
+            break
+
+    result = ProbeResult(
+        node_id=target.node_id,
+        reachable=bool(samples),
+        failures=max(1, attempts) - len(samples),
+        attempts=max(1, attempts),
+        tls=target.tls,
+        error="" if samples else last_error,
+        samples=samples,
+    )
+    if samples:
+        result.median_ms = round(statistics.median(samples), 2)
+        result.min_ms = round(min(samples), 2)
+        # 抖动：相邻两次采样差值的平均绝对值
+        diffs = [abs(b - a) for a, b in zip(samples, samples[1:])]
+        result.jitter_ms = round(sum(diffs) / len(diffs), 2) if diffs else 0.0
+    return result
+
+
+async def probe_many(targets: List[ProbeTarget], concurrency: int = 50, timeout: float = 3.0,
+                     attempts: int = 3,
+                     on_result: Callable[[ProbeResult], None] | None = None) -> List[ProbeResult]:
+    """并发探测多个节点，结果顺序与 targets 一致"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    ctx = _tls_context()
+
+    async def run(target: ProbeTarget) -> ProbeResult:
+        async with semaphore:
+            result = await probe_target(target, timeout=timeout, attempts=attempts, ctx=ctx)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(run(t) for t in targets)))
+
+
+def probe_many_sync(targets: List[ProbeTarget], **kwargs) -> List[ProbeResult]:
+    """同步入口：在独立事件循环中执行 probe_many（供后台线程调用）"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(probe_many(targets, **kwargs))
+    finally:
+        loop.close()
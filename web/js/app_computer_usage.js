@@ -694,22 +694,41 @@ async function reorderCommands(draggedId, targetId) {
 }
 
 // 命令搜索过滤：对应命令页顶部搜索框。
-// 搜索范围不是整站，而是“先按当前页签收窄，再按标题/描述/命令正文关键字过滤”。
+// 搜索范围不是整站，而是“先按当前页签收窄，再按标题/描述/命令正文/标签关键字过滤”。
+// 有关键字时走后端全文索引（search_commands，按相关度排序），后端不可用时退回本地过滤。
 // 所以用户觉得“明明有这条命令却搜不到”时，要同时确认当前页签和搜索词两个条件。
-function filterCommands() {
-    const keyword = document.getElementById('command-search').value.toLowerCase();
+let commandSearchSeq = 0;
+
+function filterCommandsLocally(commands, keyword) {
+    return commands.filter(c =>
+        c.title.toLowerCase().includes(keyword) ||
+        c.description.toLowerCase().includes(keyword) ||
+        c.commands.some(cmd => cmd.toLowerCase().includes(keyword)) ||
+        (c.tags || []).some(tag => tag.toLowerCase().includes(keyword))
+    );
+}
+
+async function filterCommands() {
+    const keyword = document.getElementById('command-search').value.trim().toLowerCase();
     let commands = currentTabId
         ? allCommands.filter(c => c.tab_id === currentTabId)
         : allCommands;
 
-    if (keyword) {
-        commands = commands.filter(c =>
-            c.title.toLowerCase().includes(keyword) ||
-            c.description.toLowerCase().includes(keyword) ||
-            c.commands.some(cmd => cmd.toLowerCase().includes(keyword))
-        );
+    if (!keyword) {
+        renderCommands(commands);
+        return;
+    }
+
+    // 输入过快时只渲染最后一次搜索的结果
+    const seq = ++commandSearchSeq;
+    try {
+        const results = await pywebview.api.search_commands(keyword, 200, currentTabId || null);
+        if (seq !== commandSearchSeq) return;
+        renderCommands(Array.isArray(results) ? results : filterCommandsLocally(commands, keyword));
+    } catch (e) {
+        if (seq !== commandSearchSeq) return;
+        renderCommands(filterCommandsLocally(commands, keyword));
     }
-    renderCommands(commands);
 }
 
 // 打开命令编辑弹窗：既服务“新增命令”，也服务“编辑已有命令”。
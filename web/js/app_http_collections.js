@@ -76,7 +76,10 @@ async function loadHttpCollections() {
     if (!window.pywebview || !window.pywebview.api) return;
     if (!document.getElementById('collections-list')) return;
 
-    allCollections = await pywebview.api.get_http_collections();
+    // 优先只拉集合骨架（请求只含 id/名称/方法），请求详情在点开时再按需获取
+    allCollections = typeof pywebview.api.get_http_collections_skeleton === 'function'
+        ? await pywebview.api.get_http_collections_skeleton()
+        : await pywebview.api.get_http_collections();
     renderCollectionsList();
 
     // 加载环境变量
@@ -103,6 +106,7 @@ function renderCollectionsList() {
                 <div class="collection-header" onclick="toggleCollection('${collection.id}')">
                     <span class="collection-icon">📁</span>
                     <span class="collection-name">${escapeHtml(collection.name)}</span>
+                    <button class="btn-icon" onclick="event.stopPropagation(); runHttpCollection('${collection.id}')" title="运行集合">▶️</button>
                     <button class="btn-icon" onclick="event.stopPropagation(); deleteCollection('${collection.id}')" title="删除集合">🗑️</button>
                 </div>
                 <div class="collection-content" id="collection-${collection.id}" style="display: none;">
@@ -129,6 +133,7 @@ function renderFolders(folders, collectionId, path) {
                 <div class="folder-header" onclick="toggleFolder('${folder.id}')">
                     <span class="folder-icon">📂</span>
                     <span class="folder-name">${escapeHtml(folder.name)}</span>
+                    <button class="btn-icon-sm" onclick="event.stopPropagation(); runHttpCollection('${folder.id}')" title="运行文件夹">▶️</button>
                 </div>
                 <div class="folder-content" id="folder-${folder.id}" style="display: none;">
                     ${renderFolders(folder.folders, collectionId, folderPath)}
@@ -188,23 +193,11 @@ function toggleFolder(folderId) {
 // - 先在集合树里递归找到目标请求；
 // - 再把方法、URL、参数、Header、Body 依次回填到右侧编辑区；
 // - 这是“左侧点一项 -> 右侧出现详情”的核心桥接函数。
-function loadRequest(collectionId, requestId) {
+async function loadRequest(collectionId, requestId) {
     const collection = allCollections.find(c => c.id === collectionId);
     if (!collection) return;
 
-    // 递归查找请求
-    function findRequest(container) {
-        for (const req of container.requests || []) {
-            if (req.id === requestId) return req;
-        }
-        for (const folder of container.folders || []) {
-            const found = findRequest(folder);
-            if (found) return found;
-        }
-        return null;
-    }
-
-    const request = findRequest(collection);
+    const request = await loadRequestDetail(collection, requestId);
     if (!request) return;
 
     currentCollection = collection;
@@ -255,6 +248,32 @@ function loadRequest(collectionId, requestId) {
     if (responseMetaEl) responseMetaEl.innerHTML = '';
 }
 
+// 在集合树中递归查找请求节点所在的容器与下标。
+function findRequestSlot(container, requestId) {
+    const requests = container.requests || [];
+    const index = requests.findIndex(req => req.id === requestId);
+    if (index !== -1) return { container, index };
+    for (const folder of container.folders || []) {
+        const found = findRequestSlot(folder, requestId);
+        if (found) return found;
+    }
+    return null;
+}
+
+// 取请求完整数据：骨架树里的请求节点只有 id/名称/方法（没有 url 字段），
+// 首次打开时调用 get_http_request 拉详情并替换回树中，之后直接复用。
+async function loadRequestDetail(collection, requestId) {
+    const slot = findRequestSlot(collection, requestId);
+    if (!slot) return null;
+    const request = slot.container.requests[slot.index];
+    if ('url' in request || typeof pywebview.api.get_http_request !== 'function') return request;
+
+    const detail = await pywebview.api.get_http_request(requestId);
+    if (!detail) return null;
+    slot.container.requests[slot.index] = detail;
+    return detail;
+}
+
 // 渲染键值对编辑器：
 // 页面位置：右侧请求编辑器中的 Params / Headers / FormData 行编辑区。
 // - Params / Headers / FormData 这几类编辑器都复用这套 DOM 模板；
@@ -486,19 +505,7 @@ async function cloneRequest(collectionId, requestId) {
     const collection = allCollections.find(c => c.id === collectionId);
     if (!collection) return;
 
-    // 递归查找请求
-    function findRequest(container) {
-        for (const req of container.requests || []) {
-            if (req.id === requestId) return req;
-        }
-        for (const folder of container.folders || []) {
-            const found = findRequest(folder);
-            if (found) return found;
-        }
-        return null;
-    }
-
-    const request = findRequest(collection);
+    const request = await loadRequestDetail(collection, requestId);
     if (!request) return;
 
     // 创建副本
@@ -573,6 +580,10 @@ async function createNewRequest() {
  * @param {string} collectionId - 集合 ID，为空则导出所有
  */
 async function exportCollectionOpenAPI(collectionId = null) {
+    if (window.pywebview?.api?.start_export_http_collection) {
+        await exportCollectionToFile('openapi', collectionId, '已导出 OpenAPI 文档');
+        return;
+    }
     if (!window.pywebview?.api?.export_openapi_collection) {
         showToast('导出功能不可用', 'error');
         return;
@@ -600,6 +611,10 @@ async function exportCollectionOpenAPI(collectionId = null) {
  * @param {string} collectionId - 集合 ID，为空则导出所有
  */
 async function exportCollectionPostman(collectionId = null) {
+    if (window.pywebview?.api?.start_export_http_collection) {
+        await exportCollectionToFile('postman', collectionId, '已导出 Postman Collection');
+        return;
+    }
     if (!window.pywebview?.api?.export_postman_collection) {
         showToast('导出功能不可用', 'error');
         return;
@@ -622,6 +637,123 @@ async function exportCollectionPostman(collectionId = null) {
     }
 }
 
+// 流式导出到文件：
+// - 后端 start_export_http_collection 弹出保存对话框，在后台从数据库分批读取请求边转换边写盘；
+// - 保存为 .yaml/.yml 时输出 YAML，否则输出 JSON；这里轮询 get_task_progress 用 toast 显示进度。
+async function exportCollectionToFile(format, collectionId, successMessage) {
+    const baseName = collectionId ? (allCollections.find(c => c.id === collectionId)?.name || 'api') : 'api';
+    try {
+        const started = await pywebview.api.start_export_http_collection(format, collectionId, `${baseName}_${format}.json`);
+        if (!started?.success) {
+            if (started?.error !== '用户取消了保存') showToast(started?.error || '导出失败', 'error');
+            return;
+        }
+
+        while (true) {
+            const progress = await pywebview.api.get_task_progress(started.task_id);
+            if (!progress?.success) {
+                showToast(progress?.error || '导出失败', 'error');
+                return;
+            }
+            const events = Array.isArray(progress.events) ? progress.events : [];
+            const last = events[events.length - 1];
+            if (last && !progress.done && last.total) {
+                showToast(`正在导出 ${last.done}/${last.total}`, 'info');
+            }
+            if (progress.done) {
+                const result = progress.error ? { success: false, error: progress.error } : progress.result;
+                if (result?.success) {
+                    showToast(`${successMessage}（${result.requests} 个请求）`, 'success');
+                } else {
+                    showToast(result?.error || '导出失败', 'error');
+                }
+                return;
+            }
+            await new Promise(resolve => setTimeout(resolve, 300));
+        }
+    } catch (e) {
+        console.error('导出集合失败:', e);
+        showToast('导出失败', 'error');
+    }
+}
+
+// 运行集合/文件夹（批量测试 / 压测）：
+// 页面触发：集合或文件夹标题栏上的 ▶️ 按钮。
+// - 后端 run_http_collection 在后台并发发出全部请求，这里轮询 get_task_progress 显示进度；
+// - 完成后把整体与逐请求的 p50/p95/p99、吞吐量、错误率写到响应体区域。
+async function runHttpCollection(itemId) {
+    if (!window.pywebview?.api?.run_http_collection) {
+        showToast('运行功能不可用', 'error');
+        return;
+    }
+    const concurrency = parseInt(prompt('并发数', '5'), 10);
+    if (!concurrency) return;
+    const iterations = parseInt(prompt('每个请求的迭代次数', '1'), 10);
+    if (!iterations) return;
+
+    const metaEl = document.getElementById('http-response-meta');
+    const bodyEl = document.getElementById('http-response-body');
+    const verifySsl = document.getElementById('http-verify-ssl')?.checked ?? true;
+    const started = await pywebview.api.run_http_collection(itemId, concurrency, iterations, null, verifySsl);
+    if (!started?.success) {
+        showToast(started?.error || '启动失败', 'error');
+        return;
+    }
+
+    while (true) {
+        const progress = await pywebview.api.get_task_progress(started.task_id);
+        if (!progress?.success) {
+            showToast(progress?.error || '运行失败', 'error');
+            return;
+        }
+        // 进度事件按批合并，completed / errors 都是累计值，只看最后一个即可
+        const events = Array.isArray(progress.events) ? progress.events : [];
+        const last = events[events.length - 1];
+        if (last && metaEl) {
+            metaEl.innerHTML = `<span style="color: #666;">运行中 ${last.completed}/${last.total}，失败 ${last.errors}</span>`;
+        }
+        if (progress.done) {
+            const result = progress.error ? { success: false, error: progress.error } : progress.result;
+            if (!result?.success) {
+                showToast(result?.error || '运行失败', 'error');
+                if (metaEl) metaEl.innerHTML = '<span style="color: #ef4444;">运行失败</span>';
+                return;
+            }
+            if (metaEl) {
+                metaEl.innerHTML = `
+                    <span style="font-weight: bold;">完成 ${result.completed} 次请求</span>
+                    <span style="margin-left: 16px;">耗时 ${result.elapsed}s</span>
+                    <span style="margin-left: 16px;">吞吐 ${result.throughput ?? '-'} req/s</span>
+                    <span style="margin-left: 16px; color: ${result.errors ? '#ef4444' : '#10b981'};">错误率 ${(result.error_rate * 100).toFixed(1)}%</span>
+                `;
+            }
+            if (bodyEl) {
+                bodyEl.value = formatHttpRunSummary(result);
+                bodyEl.dispatchEvent(new Event('input'));
+            }
+            return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 300));
+    }
+}
+
+function formatHttpRunSummary(result) {
+    const ms = (v) => (typeof v === 'number' ? `${v.toFixed(1)}ms` : '-');
+    const lat = (l) => `p50 ${ms(l.p50)}  p95 ${ms(l.p95)}  p99 ${ms(l.p99)}  max ${ms(l.max)}`;
+    const lines = [
+        `并发 ${result.concurrency} × 迭代 ${result.iterations}，共 ${result.completed} 次，错误 ${result.errors}`,
+        `整体: ${lat(result.latency)}`,
+        ''
+    ];
+    result.requests.forEach(r => {
+        const name = [...(r.path || []), r.name].join(' / ');
+        const codes = Object.entries(r.status_codes).map(([k, v]) => `${k}×${v}`).join(' ');
+        lines.push(`${r.method} ${name}`);
+        lines.push(`    ${lat(r.latency)}  错误率 ${(r.error_rate * 100).toFixed(1)}%  [${codes}]`);
+    });
+    return lines.join('\n');
+}
+
 /**
  * 下载数据为文件
  * @param {object} data - 要下载的数据
@@ -921,28 +1053,45 @@ async function deleteEnvironment(envId) {
 // 在文本里执行环境变量替换：
 // 典型调用方：sendHttpRequest()、URL 输入框、Header/Body 发送前处理。
 // - 典型输入是 URL、Header、Body 中的 {{baseUrl}} 这类占位符；
-// - 只会替换当前活跃环境中启用的变量。
+// - 只会替换当前活跃环境中启用的变量；
+// - 变量值可以引用其它变量（与后端 replace_variables 一致），展开结果按环境对象缓存；
+// - 占位符与后端 VARIABLE_PATTERN 使用同一字符类：变量名为除花括号外的任意字符。
+const HTTP_VARIABLE_MAX_DEPTH = 10;
+const HTTP_VARIABLE_PATTERN = /\{\{([^{}]+)\}\}/g;
+const httpResolvedVariables = new WeakMap();
+
+function resolveHttpEnvironmentValues(env) {
+    const cached = httpResolvedVariables.get(env);
+    if (cached && cached.source === env.variables) return cached.values;
+
+    const raw = new Map();
+    (env.variables || []).forEach(v => {
+        if (v.enabled !== false && v.key) raw.set(v.key, String(v.value ?? ''));
+    });
+    const values = new Map();
+    const resolve = (key, stack) => {
+        if (values.has(key)) return values.get(key);
+        if (stack.includes(key) || stack.length >= HTTP_VARIABLE_MAX_DEPTH) return `{{${key}}}`;
+        stack.push(key);
+        const value = raw.get(key).replace(HTTP_VARIABLE_PATTERN, (m, name) => (raw.has(name) ? resolve(name, stack) : m));
+        stack.pop();
+        values.set(key, value);
+        return value;
+    };
+    raw.forEach((_, key) => resolve(key, []));
+    httpResolvedVariables.set(env, { source: env.variables, values });
+    return values;
+}
+
 function replaceVariablesInText(text) {
     if (!text || !activeEnvironmentId) return text;
 
     const env = httpEnvironments.find(e => e.id === activeEnvironmentId);
     if (!env?.variables) return text;
 
-    let result = String(text);
-    env.variables.forEach(v => {
-        if (v.enabled !== false && v.key) {
-            try {
-                // 转义正则特殊字符
-                const escapedKey = v.key.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
-                const regex = new RegExp(`\\{\\{${escapedKey}\\}\\}`, 'g');
-                // 使用函数形式避免 $1 等被当作分组引用
-                result = result.replace(regex, () => v.value || '');
-            } catch (e) {
-                // 忽略单个变量替换失败
-            }
-        }
-    });
-    return result;
+    const values = resolveHttpEnvironmentValues(env);
+    // 使用函数形式避免 $1 等被当作分组引用
+    return String(text).replace(HTTP_VARIABLE_PATTERN, (m, name) => (values.has(name) ? values.get(name) : m));
 }
 
 // ==================== JSON 树形视图：把响应 JSON 以树形方式展开查看 ====================
@@ -1001,6 +1150,9 @@ function saveHttpRequestHistory(method, url, headers, body, response) {
             responseStatus: response?.status,
             responseBody: response?.body?.slice(0, 2000),
             duration: response?.duration,
+            timings: response?.timings || null,
+            bytes: response?.bytes || null,
+            historyId: response?.history_id || null,
             timestamp: Date.now()
         };
 
@@ -1014,6 +1166,19 @@ function saveHttpRequestHistory(method, url, headers, body, response) {
     } catch (e) { /* ignore */ }
 }
 
+// 历史条目的分阶段耗时，作为耗时字段的悬浮提示（旧条目没有 timings 时返回空串）
+function formatHttpHistoryTimings(entry) {
+    const t = entry.timings;
+    if (!t) return '';
+    const fmt = (v) => (typeof v === 'number' ? `${v.toFixed(1)}ms` : '-');
+    const lines = t.reused
+        ? ['连接复用']
+        : [`DNS ${fmt(t.dns)}`, `Connect ${fmt(t.connect)}`, `TLS ${fmt(t.tls)}`];
+    lines.push(`TTFB ${fmt(t.ttfb)}`, `Download ${fmt(t.download)}`);
+    if (entry.bytes) lines.push(`Sent ${entry.bytes.sent || 0} B / Received ${entry.bytes.received || 0} B`);
+    return lines.join('\n');
+}
+
 function loadHttpRequestHistory() {
     try {
         const raw = localStorage.getItem(HTTP_HISTORY_KEY);
@@ -1051,7 +1216,7 @@ function renderHttpRequestHistory() {
                 </div>
                 <div class="http-history-meta">
                     <span class="http-history-status ${statusClass}">${e.responseStatus || '-'}</span>
-                    <span class="http-history-duration">${e.duration ? e.duration + 'ms' : '-'}</span>
+                    <span class="http-history-duration" title="${escapeAttr(formatHttpHistoryTimings(e))}">${e.duration ? e.duration + 'ms' : '-'}</span>
                     <span class="http-history-time">${formatHttpHistoryTime(e.timestamp)}</span>
                 </div>
             </div>
@@ -1102,11 +1267,41 @@ function replayHttpRequest(historyId) {
         if (bodyEl) bodyEl.value = entry.body;
     }
 
+    // 服务端保存了完整（压缩）响应时，把当时的响应也恢复到响应区，无需重新发送
+    if (entry.historyId) loadHttpHistoryResponse(entry.historyId);
+
     showToast?.('已加载历史请求', 'info');
 }
 
+async function loadHttpHistoryResponse(historyId) {
+    if (!window.pywebview?.api?.get_http_history_entry) return;
+    const result = await pywebview.api.get_http_history_entry(historyId);
+    if (!result?.success) return;
+    const record = result.entry;
+    const bodyEl = document.getElementById('http-response-body');
+    const headersEl = document.getElementById('http-response-headers-text');
+    const metaEl = document.getElementById('http-response-meta');
+    if (bodyEl) {
+        bodyEl.value = record.body_encoding === 'base64'
+            ? `[二进制响应，${record.body_size} 字节，base64 编码]\n${record.body}`
+            : record.body;
+        if (record.truncated) bodyEl.value += `\n\n[响应体过大，历史中只保存了前 ${record.body.length} 个字符]`;
+        bodyEl.dispatchEvent(new Event('input'));
+    }
+    if (headersEl) {
+        headersEl.value = Object.entries(record.response_headers || {}).map(([k, v]) => `${k}: ${v}`).join('\n');
+    }
+    if (metaEl) {
+        metaEl.innerHTML = record.success
+            ? `<span style="font-weight: bold;">历史响应 ${record.status} ${escapeHtml(record.status_text || '')}</span>
+               <span style="margin-left: 16px;">${escapeHtml(new Date(record.created_at).toLocaleString())}</span>`
+            : `<span style="color: #ef4444;">历史请求失败: ${escapeHtml(record.error || '')}</span>`;
+    }
+}
+
 function clearHttpRequestHistory() {
     localStorage.removeItem(HTTP_HISTORY_KEY);
+    window.pywebview?.api?.clear_http_history?.();
     renderHttpRequestHistory();
     showToast?.('历史记录已清空', 'info');
 }
@@ -105,8 +105,44 @@ async function fetchSubscription() {
         return;
     }
 
-    const result = await pywebview.api.fetch_subscription(url);
-    applyConvertResult(result);
+    const api = pywebview.api;
+    if (typeof api.start_fetch_subscription !== 'function' || typeof api.get_task_progress !== 'function') {
+        applyConvertResult(await api.fetch_subscription(url));
+        return;
+    }
+
+    const started = await api.start_fetch_subscription(url);
+    if (!started?.success) {
+        applyConvertResult(await api.fetch_subscription(url));
+        return;
+    }
+    applyConvertResult(await pollSubscriptionTask(started.task_id));
+}
+
+// 轮询后台订阅拉取任务：下载过程中先把已解析的节点逐批渲染到输出框，完成后用最终结果整体替换。
+// 每个进度事件形如 { nodes: [...], yaml: '该批节点的 proxies 片段' }。
+async function pollSubscriptionTask(taskId) {
+    const partialNodes = [];
+    const yamlParts = [];
+    while (true) {
+        const progress = await pywebview.api.get_task_progress(taskId);
+        if (!progress?.success) {
+            return { nodes: [], yaml: '', errors: [progress?.error || '订阅拉取失败'] };
+        }
+        const events = Array.isArray(progress.events) ? progress.events : [];
+        if (events.length) {
+            for (const event of events) {
+                partialNodes.push(...(event.nodes || []));
+                yamlParts.push(event.yaml || '');
+            }
+            applyConvertResult({ nodes: partialNodes, yaml: 'proxies:\n' + yamlParts.join(''), errors: [] });
+        }
+        if (progress.done) {
+            if (progress.error) return { nodes: [], yaml: '', errors: [progress.error] };
+            return progress.result || { nodes: [], yaml: '', errors: [] };
+        }
+        await new Promise(resolve => setTimeout(resolve, 150));
+    }
 }
 
 // 渲染转换错误提示区：对应结果区附近的错误列表。
@@ -140,6 +176,17 @@ async function saveConvertedNodes() {
         return;
     }
 
+    // 新版后端单事务批量保存并按协议指纹去重；旧接口逐个保存
+    if (typeof pywebview.api.save_nodes === 'function') {
+        const result = await pywebview.api.save_nodes(convertedNodes);
+        const skipped = Array.isArray(result?.deduplicated) ? result.deduplicated.length : 0;
+        alert(skipped
+            ? `已保存 ${result.saved} 个节点，跳过 ${skipped} 个重复节点`
+            : `已保存 ${result?.saved || 0} 个节点`);
+        loadNodes();
+        return;
+    }
+
     for (const node of convertedNodes) {
         await pywebview.api.save_node(
             node.name,
@@ -2040,6 +2040,68 @@ function getHttpHeaders() {
     return headers;
 }
 
+// 大响应体分段加载：
+// - 响应体超过后端阈值（默认 1MB）时落盘，http_request 只返回预览和 bodyHandle；
+// - 点击“加载更多”用 read_http_response_body 按字节区间续读并追加到响应区，读完后释放临时文件；
+// - 发出新请求时释放上一次的句柄。
+const HTTP_STREAMED_BODY_CHUNK = 512 * 1024;
+let httpStreamedBody = null;
+
+function resetHttpStreamedBody(result) {
+    if (httpStreamedBody?.handle) {
+        window.pywebview?.api?.release_http_response_body?.(httpStreamedBody.handle);
+    }
+    httpStreamedBody = result?.streamed && result.bodyHandle
+        ? { handle: result.bodyHandle, offset: result.previewBytes || 0, size: result.size || 0 }
+        : null;
+}
+
+function renderHttpStreamedBodyMore() {
+    const el = document.getElementById('http-streamed-body-more');
+    if (!el) return;
+    if (!httpStreamedBody) {
+        el.innerHTML = '';
+        return;
+    }
+    const loaded = DogToolboxM24Utils.formatResponseSize(httpStreamedBody.offset);
+    const total = DogToolboxM24Utils.formatResponseSize(httpStreamedBody.size);
+    el.innerHTML = `已显示 ${loaded} / ${total} <a href="#" onclick="loadMoreHttpResponseBody(); return false;">加载更多</a>`;
+}
+
+async function loadMoreHttpResponseBody() {
+    if (!httpStreamedBody || !window.pywebview?.api?.read_http_response_body) return;
+    const state = httpStreamedBody;
+    const chunk = await pywebview.api.read_http_response_body(state.handle, state.offset, HTTP_STREAMED_BODY_CHUNK);
+    if (!chunk?.success) {
+        showToast?.(chunk?.error || '读取响应体失败', 'error');
+        httpStreamedBody = null;
+        renderHttpStreamedBodyMore();
+        return;
+    }
+    const responseBodyEl = document.getElementById('http-response-body');
+    responseBodyEl.value += chunk.data;
+    responseBodyEl.dispatchEvent(new Event('input'));
+    state.offset = chunk.offset + chunk.length;
+    if (chunk.eof) resetHttpStreamedBody(null);
+    renderHttpStreamedBodyMore();
+}
+
+// 渲染后端返回的分阶段耗时：
+// - timings 各字段单位为毫秒，复用 keep-alive 连接时 dns/connect/tls 为 null；
+// - bytes 为请求体发送字节数与响应体接收字节数（压缩前的线上字节）。
+function formatHttpTimingBreakdown(timings, bytes) {
+    if (!timings) return '';
+    const fmt = (v) => (typeof v === 'number' ? `${v.toFixed(1)}ms` : '-');
+    const parts = timings.reused
+        ? ['连接复用']
+        : [`DNS ${fmt(timings.dns)}`, `Connect ${fmt(timings.connect)}`, `TLS ${fmt(timings.tls)}`];
+    parts.push(`TTFB ${fmt(timings.ttfb)}`, `Download ${fmt(timings.download)}`);
+    if (bytes) {
+        parts.push(`↑${DogToolboxM24Utils.formatResponseSize(bytes.sent || 0)} ↓${DogToolboxM24Utils.formatResponseSize(bytes.received || 0)}`);
+    }
+    return `<span class="http-timing-breakdown" style="margin-left: 16px; color: #888;">${escapeHtml(parts.join(' · '))}</span>`;
+}
+
 // 发送 HTTP 请求：
 // 页面触发：tool-http 页里的“发送”按钮。
 // - 这是 HTTP 工具最核心的执行入口；
@@ -2113,7 +2175,10 @@ async function sendHttpRequest() {
             }
 
             // 显示响应
-            responseBodyEl.value = result.body || '';
+            responseBodyEl.value = result.bodyEncoding === 'base64'
+                ? `[二进制响应，以 base64 显示]\n${result.body || ''}`
+                : (result.body || '');
+            resetHttpStreamedBody(result);
 
             // 格式化响应头
             if (result.headers) {
@@ -2124,12 +2189,16 @@ async function sendHttpRequest() {
 
             // 显示元信息
             const statusColor = result.status >= 200 && result.status < 400 ? '#10b981' : '#ef4444';
-            const size = new Blob([result.body || '']).size;
+            // 后端按字节返回响应大小；二进制响应体以 base64 传输，不能用文本长度计算
+            const size = typeof result.size === 'number' ? result.size : new Blob([result.body || '']).size;
             responseMetaEl.innerHTML = `
                 <span style="color: ${statusColor}; font-weight: bold;">Status: ${result.status} ${result.statusText || ''}</span>
                 <span style="margin-left: 16px;">Time: ${DogToolboxM24Utils.formatResponseTime(result.duration || 0)}</span>
                 <span style="margin-left: 16px;">Size: ${DogToolboxM24Utils.formatResponseSize(size)}</span>
+                ${formatHttpTimingBreakdown(result.timings, result.bytes)}
+                <span id="http-streamed-body-more" style="margin-left: 16px;"></span>
             `;
+            renderHttpStreamedBodyMore();
 
             // 强制刷新 UI（解决 pywebview 异步更新问题）
             responseBodyEl.dispatchEvent(new Event('input'));
@@ -2151,7 +2220,10 @@ async function sendHttpRequest() {
                 saveHttpRequestHistory(method, fullUrl, headers, body, {
                     status: result.status,
                     body: result.body,
-                    duration: result.duration
+                    duration: result.duration,
+                    timings: result.timings,
+                    bytes: result.bytes,
+                    history_id: result.history_id
                 });
             }
 